@@ -25,6 +25,13 @@ if config.config_file_name is not None:
 
 target_metadata = Base.metadata
 
+# Objetos mantenidos fuera del ORM (búsqueda full-text): autogenerate no debe tocarlos
+UNMANAGED_OBJECTS = {"search_vector", "ix_products_search_vector", "products_fts"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    return name not in UNMANAGED_OBJECTS
+
 
 def get_url() -> str:
     """
@@ -47,6 +54,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -55,7 +63,11 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection):
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+    )
     with context.begin_transaction():
         context.run_migrations()
 
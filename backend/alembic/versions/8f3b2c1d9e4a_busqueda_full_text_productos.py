@@ -0,0 +1,59 @@
+"""busqueda full-text de productos
+
+Revision ID: 8f3b2c1d9e4a
+Revises: 57c4a551a50d
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3b2c1d9e4a'
+down_revision: Union[str, None] = '57c4a551a50d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Columna tsvector mantenida por trigger + índice GIN (ver app/services/search.py)
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    # unaccent() es STABLE: el wrapper IMMUTABLE permite usarlo en triggers e índices
+    op.execute("""
+    CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """)
+    op.execute("ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector")
+    op.execute("""
+    CREATE OR REPLACE FUNCTION products_search_vector_update() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('spanish', immutable_unaccent(coalesce(NEW.code, ''))), 'A') ||
+            setweight(to_tsvector('spanish', immutable_unaccent(coalesce(NEW.name, ''))), 'A') ||
+            setweight(to_tsvector('spanish', immutable_unaccent(coalesce(NEW.brand, ''))), 'B') ||
+            setweight(to_tsvector('spanish', immutable_unaccent(coalesce(NEW.description, ''))), 'C');
+        RETURN NEW;
+    END
+    $$
+    """)
+    op.execute("DROP TRIGGER IF EXISTS products_search_vector_trigger ON products")
+    op.execute("""
+    CREATE TRIGGER products_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF code, name, brand, description ON products
+    FOR EACH ROW EXECUTE FUNCTION products_search_vector_update()
+    """)
+    # Backfill de filas existentes (dispara el trigger)
+    op.execute("UPDATE products SET name = name WHERE search_vector IS NULL")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING GIN (search_vector)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_products_search_vector")
+    op.execute("DROP TRIGGER IF EXISTS products_search_vector_trigger ON products")
+    op.execute("DROP FUNCTION IF EXISTS products_search_vector_update()")
+    op.execute("ALTER TABLE products DROP COLUMN IF EXISTS search_vector")
+    op.execute("DROP FUNCTION IF EXISTS immutable_unaccent(text)")
@@ -0,0 +1,42 @@
+"""blobs de imágenes por contenido
+
+Revision ID: a8e2d6b4c913
+Revises: f1c4a7e9b203
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8e2d6b4c913'
+down_revision: Union[str, None] = 'f1c4a7e9b203'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('image_blobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('storage', sa.String(length=20), nullable=False),
+        sa.Column('url', sa.String(length=500), nullable=False),
+        sa.Column('public_id', sa.String(length=200), nullable=True),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('ext', sa.String(length=10), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('sha256', 'storage', name='uq_image_blobs_sha256_storage'),
+    )
+    op.create_index(op.f('ix_image_blobs_id'), 'image_blobs', ['id'], unique=False)
+    op.create_index('ix_image_blobs_refs', 'image_blobs', ['storage', 'ref_count'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_image_blobs_refs', table_name='image_blobs')
+    op.drop_index(op.f('ix_image_blobs_id'), table_name='image_blobs')
+    op.drop_table('image_blobs')
@@ -0,0 +1,32 @@
+"""indices para paginacion por cursor
+
+Revision ID: b41e7a9c2d10
+Revises: 8f3b2c1d9e4a
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41e7a9c2d10'
+down_revision: Union[str, None] = '8f3b2c1d9e4a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_orders_created', 'orders', ['created_at', 'id'], unique=False)
+    op.create_index('ix_orders_status_created', 'orders', ['status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_quotes_created', 'quotes', ['created_at', 'id'], unique=False)
+    op.create_index('ix_quotes_status_created', 'quotes', ['status', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_quotes_status_created', table_name='quotes')
+    op.drop_index('ix_quotes_created', table_name='quotes')
+    op.drop_index('ix_orders_status_created', table_name='orders')
+    op.drop_index('ix_orders_created', table_name='orders')
@@ -0,0 +1,26 @@
+"""último uso de los blobs de imágenes
+
+Revision ID: c5b9e1f27d40
+Revises: a8e2d6b4c913
+Create Date: 2026-10-17 23:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5b9e1f27d40'
+down_revision: Union[str, None] = 'a8e2d6b4c913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('image_blobs', sa.Column('last_used_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('image_blobs', 'last_used_at')
@@ -0,0 +1,26 @@
+"""indice de imagenes por producto
+
+Revision ID: c7d2e5f8a3b6
+Revises: b41e7a9c2d10
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d2e5f8a3b6'
+down_revision: Union[str, None] = 'b41e7a9c2d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_product_images_product', 'product_images', ['product_id', 'display_order'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_product_images_product', table_name='product_images')
@@ -0,0 +1,47 @@
+"""inbox de webhooks de pagos
+
+Revision ID: d3a9f1c6b852
+Revises: c7d2e5f8a3b6
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a9f1c6b852'
+down_revision: Union[str, None] = 'c7d2e5f8a3b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+webhookstatus = sa.Enum('PENDING', 'PROCESSING', 'DONE', 'FAILED', name='webhookstatus')
+
+
+def upgrade() -> None:
+    op.create_table('payment_webhooks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('payment_id', sa.String(length=100), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=True),
+        sa.Column('notifications', sa.Integer(), nullable=False),
+        sa.Column('status', webhookstatus, nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('received_at', sa.DateTime(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('payment_id'),
+    )
+    op.create_index(op.f('ix_payment_webhooks_id'), 'payment_webhooks', ['id'], unique=False)
+    op.create_index('ix_payment_webhooks_queue', 'payment_webhooks', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payment_webhooks_queue', table_name='payment_webhooks')
+    op.drop_index(op.f('ix_payment_webhooks_id'), table_name='payment_webhooks')
+    op.drop_table('payment_webhooks')
+    webhookstatus.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,56 @@
+"""sha256 de la imagen en las filas que la usan
+
+Revision ID: d6e1a3c8f920
+Revises: c5b9e1f27d40
+Create Date: 2026-10-18 10:00:00.000000
+
+products, product_images, banners y categories guardan el sha256 de su
+image_url cuando es un blob (image_sha256, indexada): las referencias se
+cuentan por igualdad. image_blobs.ref_count (recalculado con LIKE en cada
+escritura) deja de existir.
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6e1a3c8f920'
+down_revision: Union[str, None] = 'c5b9e1f27d40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('products', 'product_images', 'banners', 'categories')
+
+# <sha256>.<ext> al final de la URL (como blob_key en app/utils/image_urls.py)
+BLOB_URL = re.compile(r"(?:^|/)([0-9a-f]{64})(?:\.[A-Za-z0-9]+)?$")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    for name in TABLES:
+        op.add_column(name, sa.Column('image_sha256', sa.String(length=64), nullable=True))
+        op.create_index(f'ix_{name}_image_sha256', name, ['image_sha256'], unique=False)
+
+        table = sa.table(name, sa.column('id', sa.Integer), sa.column('image_url', sa.String),
+                         sa.column('image_sha256', sa.String))
+        rows = bind.execute(sa.select(table.c.id, table.c.image_url).where(table.c.image_url.is_not(None)))
+        for row_id, url in rows.all():
+            match = BLOB_URL.search(url.split("?", 1)[0])
+            if match:
+                bind.execute(
+                    table.update().where(table.c.id == row_id).values(image_sha256=match.group(1))
+                )
+
+    op.drop_index('ix_image_blobs_refs', table_name='image_blobs')
+    op.drop_column('image_blobs', 'ref_count')
+
+
+def downgrade() -> None:
+    op.add_column('image_blobs', sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0'))
+    op.create_index('ix_image_blobs_refs', 'image_blobs', ['storage', 'ref_count'], unique=False)
+    for name in TABLES:
+        op.drop_index(f'ix_{name}_image_sha256', table_name=name)
+        op.drop_column(name, 'image_sha256')
@@ -0,0 +1,41 @@
+"""carrito: una linea por producto
+
+Revision ID: e5b8c2d4f716
+Revises: d3a9f1c6b852
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b8c2d4f716'
+down_revision: Union[str, None] = 'd3a9f1c6b852'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Unificar líneas duplicadas (sumando cantidades) antes de agregar la restricción
+    op.execute(sa.text("""
+        UPDATE cart_items SET quantity = (
+            SELECT SUM(c2.quantity) FROM cart_items c2
+            WHERE c2.user_id = cart_items.user_id AND c2.product_id = cart_items.product_id
+        )
+        WHERE id IN (
+            SELECT MIN(id) FROM cart_items GROUP BY user_id, product_id HAVING COUNT(*) > 1
+        )
+    """))
+    op.execute(sa.text("""
+        DELETE FROM cart_items WHERE id NOT IN (
+            SELECT MIN(id) FROM cart_items GROUP BY user_id, product_id
+        )
+    """))
+    op.create_unique_constraint('uq_cart_items_user_product', 'cart_items', ['user_id', 'product_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_cart_items_user_product', 'cart_items', type_='unique')
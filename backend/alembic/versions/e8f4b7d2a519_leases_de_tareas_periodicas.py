@@ -0,0 +1,31 @@
+"""leases de tareas periódicas
+
+Revision ID: e8f4b7d2a519
+Revises: d6e1a3c8f920
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8f4b7d2a519'
+down_revision: Union[str, None] = 'd6e1a3c8f920'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('job_leases',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('locked_until', sa.DateTime(), nullable=False),
+        sa.Column('owner', sa.String(length=100), nullable=True),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('job_leases')
@@ -0,0 +1,47 @@
+"""outbox de emails
+
+Revision ID: f1c4a7e9b203
+Revises: e5b8c2d4f716
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c4a7e9b203'
+down_revision: Union[str, None] = 'e5b8c2d4f716'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+emailstatus = sa.Enum('PENDING', 'SENDING', 'SENT', 'FAILED', name='emailstatus')
+
+
+def upgrade() -> None:
+    op.create_table('email_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('to_email', sa.String(length=255), nullable=False),
+        sa.Column('subject', sa.String(length=255), nullable=False),
+        sa.Column('html_content', sa.Text(), nullable=False),
+        sa.Column('text_content', sa.Text(), nullable=True),
+        sa.Column('status', emailstatus, nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_email_outbox_id'), 'email_outbox', ['id'], unique=False)
+    op.create_index('ix_email_outbox_queue', 'email_outbox', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_email_outbox_queue', table_name='email_outbox')
+    op.drop_index(op.f('ix_email_outbox_id'), table_name='email_outbox')
+    op.drop_table('email_outbox')
+    emailstatus.drop(op.get_bind(), checkfirst=True)
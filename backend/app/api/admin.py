@@ -15,11 +15,24 @@ from app.models.product_image import ProductImage
 from app.models.order import Order, OrderStatus
 from app.models.quote import Quote, QuoteStatus
 from app.schemas.category import CategoryCreate, CategoryUpdate, CategoryResponse
-from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse, ProductListResponse, ProductImageResponse
+from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse, ProductListResponse
 from app.schemas.order import OrderResponse, OrderListResponse, OrderStatusUpdate, OrderItemResponse
 from app.schemas.quote import QuoteUpdate, QuoteResponse, QuoteListResponse
 from app.schemas.user import UserResponse, UserAdminUpdate
+from app.services.cart_summary import cart_summary
+from app.services.code_index import code_index
+from app.services.dashboard import dashboard_stats
+from app.services.email_outbox import email_outbox
+from app.services.image_gc import image_gc
+from app.services.image_store import image_store
+from app.services.payment_inbox import payment_inbox
+from app.services.product_count import product_counter, categories_with_counts
+from app.services.response_cache import response_cache, CATALOG_PRODUCTS, CATALOG_CATEGORIES
+from app.services.stock import stock_service, shortage_message
+from app.services.user_cache import Principal, user_cache
 from app.utils.dependencies import get_admin_user
+from app.utils.pagination import decode_cursor, apply_keyset, split_page
+from app.utils.serialization import dump_product, dump_product_list, json_response
 
 router = APIRouter()
 
@@ -39,85 +52,69 @@ class DashboardStats(BaseModel):
 
 @router.get("/stats", response_model=DashboardStats)
 async def get_dashboard_stats(
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get dashboard statistics"""
-    # Products count
-    products_result = await db.execute(select(func.count(Product.id)))
-    total_products = products_result.scalar() or 0
-    
-    # Orders count
-    orders_result = await db.execute(select(func.count(Order.id)))
-    total_orders = orders_result.scalar() or 0
-    
-    # Users count
-    users_result = await db.execute(select(func.count(User.id)))
-    total_users = users_result.scalar() or 0
-    
-    # Quotes count
-    quotes_result = await db.execute(select(func.count(Quote.id)))
-    total_quotes = quotes_result.scalar() or 0
-    
-    # Pending orders
-    pending_orders_result = await db.execute(
-        select(func.count(Order.id))
-        .where(Order.status.in_([OrderStatus.PENDING, OrderStatus.PAYMENT_PENDING, OrderStatus.PAID]))
-    )
-    pending_orders = pending_orders_result.scalar() or 0
-    
-    # Pending quotes
-    pending_quotes_result = await db.execute(
-        select(func.count(Quote.id)).where(Quote.status == QuoteStatus.PENDING)
-    )
-    pending_quotes = pending_quotes_result.scalar() or 0
-    
-    # Total revenue (from paid orders)
-    revenue_result = await db.execute(
-        select(func.sum(Order.total)).where(Order.status == OrderStatus.PAID)
-    )
-    total_revenue = float(revenue_result.scalar() or 0)
-    
-    # Orders today
-    today = datetime.utcnow().date()
-    orders_today_result = await db.execute(
-        select(func.count(Order.id))
-        .where(func.date(Order.created_at) == today)
-    )
-    orders_today = orders_today_result.scalar() or 0
-    
-    return DashboardStats(
-        total_products=total_products,
-        total_orders=total_orders,
-        total_users=total_users,
-        total_quotes=total_quotes,
-        pending_orders=pending_orders,
-        pending_quotes=pending_quotes,
-        total_revenue=total_revenue,
-        orders_today=orders_today,
-    )
+    """Get dashboard statistics (una sola query, con snapshot de pocos segundos)"""
+    return DashboardStats(**await dashboard_stats.get(db))
+
+
+@router.get("/cache/stats")
+async def get_cache_stats(admin: Principal = Depends(get_admin_user)):
+    """Hits/misses de la cache de respuestas del catálogo (del worker que atiende)"""
+    return response_cache.stats()
+
+
+@router.get("/webhooks/stats")
+async def get_webhook_stats(
+    admin: Principal = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Cola de webhooks de pago: profundidad, antigüedad y lag de procesamiento"""
+    return await payment_inbox.stats(db)
+
+
+@router.get("/emails/stats")
+async def get_email_stats(
+    admin: Principal = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Outbox de emails: pendientes, fallidos y envíos del worker"""
+    return await email_outbox.stats(db)
+
+
+@router.post("/images/gc")
+async def collect_orphan_images(
+    dry_run: bool = Query(True, description="Solo informar, sin borrar"),
+    min_age_hours: float | None = Query(None, ge=0, description="Edad mínima (default IMAGE_GC_MIN_AGE_HOURS)"),
+    admin: Principal = Depends(get_admin_user)
+):
+    """Imágenes subidas que ya no usa nadie (local y Cloudinary); con dry_run=false las borra"""
+    return await image_gc.collect(dry_run=dry_run, min_age_hours=min_age_hours)
+
+
+@router.get("/images/stats")
+async def get_image_stats(admin: Principal = Depends(get_admin_user)):
+    """Deduplicación de subidas y último reporte del GC (del worker que atiende)"""
+    return {"store": image_store.stats(), "gc": image_gc.stats()}
 
 
 # --- Categories Management ---
 
 @router.get("/categories", response_model=list[CategoryResponse])
 async def admin_list_categories(
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """List all categories (including inactive)"""
+    # Cuenta todos los productos (activos e inactivos) en un solo GROUP BY
     result = await db.execute(
-        select(Category).order_by(Category.display_order, Category.name)
+        categories_with_counts(active_products_only=False)
+        .order_by(Category.display_order, Category.name)
     )
-    categories = result.scalars().all()
     
     response = []
-    for cat in categories:
-        count_result = await db.execute(
-            select(func.count(Product.id)).where(Product.category_id == cat.id)
-        )
-        count = count_result.scalar() or 0
-        
+    for cat, count in result.all():
         response.append(CategoryResponse(
             id=cat.id,
             name=cat.name,
@@ -137,7 +134,7 @@ async def admin_list_categories(
 @router.post("/categories", response_model=CategoryResponse, status_code=status.HTTP_201_CREATED)
 async def create_category(
     category_data: CategoryCreate,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Create a new category"""
@@ -155,6 +152,7 @@ async def create_category(
     db.add(category)
     await db.commit()
     await db.refresh(category)
+    await response_cache.invalidate(CATALOG_CATEGORIES)
     
     return CategoryResponse(
         id=category.id,
@@ -174,7 +172,7 @@ async def create_category(
 async def update_category(
     category_id: int,
     category_data: CategoryUpdate,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Update a category"""
@@ -205,12 +203,17 @@ async def update_category(
         setattr(category, field, value)
     
     await db.commit()
-    await db.refresh(category)
+    product_counter.invalidate()  # Los totales por category_slug pueden cambiar
+    # Los productos embeben nombre y slug de su categoría
+    await response_cache.invalidate(CATALOG_CATEGORIES, CATALOG_PRODUCTS)
     
-    count_result = await db.execute(
-        select(func.count(Product.id)).where(Product.category_id == category.id)
+    # Recarga + cantidad de productos en una sola query
+    result = await db.execute(
+        categories_with_counts(active_products_only=False)
+        .where(Category.id == category_id)
+        .execution_options(populate_existing=True)
     )
-    count = count_result.scalar() or 0
+    category, count = result.one()
     
     return CategoryResponse(
         id=category.id,
@@ -229,7 +232,7 @@ async def update_category(
 @router.delete("/categories/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_category(
     category_id: int,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Delete a category"""
@@ -256,45 +259,19 @@ async def delete_category(
     
     await db.delete(category)
     await db.commit()
+    await response_cache.invalidate(CATALOG_CATEGORIES)
 
 
 # --- Products Management ---
 
-def product_to_response(p: Product) -> ProductResponse:
-    """Helper para convertir Product model a ProductResponse"""
-    return ProductResponse(
-        id=p.id,
-        category_id=p.category_id,
-        category=p.category,
-        name=p.name,
-        code=p.code,
-        brand=p.brand,
-        description=p.description,
-        price=p.price,
-        original_price=p.original_price,
-        stock=p.stock,
-        image_url=p.image_url,
-        images=[ProductImageResponse.model_validate(img) for img in (p.images or [])],
-        is_active=p.is_active,
-        is_featured=p.is_featured,
-        is_new=p.is_new,
-        is_on_promotion=p.is_on_promotion,
-        rating=p.rating,
-        reviews_count=p.reviews_count,
-        in_stock=p.in_stock,
-        discount_percent=p.discount_percent,
-        created_at=p.created_at,
-        updated_at=p.updated_at,
-    )
-
-
 @router.get("/products", response_model=ProductListResponse)
 async def admin_list_products(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     category_id: int | None = None,
     search: str | None = None,
-    admin: User = Depends(get_admin_user),
+    cursor: str | None = Query(None, description="Paginación por cursor (vacío = primera página)"),
+    admin: Principal = Depends(get_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """List all products (including inactive)"""
@@ -311,16 +288,19 @@ async def admin_list_products(
             Product.brand.ilike(search_term)
         )
     
-    query = query.order_by(Product.created_at.desc())
-    
     # Count
     count_query = select(func.count()).select_from(query.subquery())
     total_result = await db.execute(count_query)
     total = total_result.scalar() or 0
     
-    # Pagination
-    offset = (page - 1) * page_size
-    query = query.offset(offset).limit(page_size).options(
+    # Pagination (offset o cursor)
+    if cursor is not None:
+        position = decode_cursor(cursor, "created_at", "desc")
+        query = apply_keyset(query, Product.created_at, Product.id, True, position, page_size)
+    else:
+        offset = (page - 1) * page_size
+        query = query.order_by(Product.created_at.desc()).offset(offset).limit(page_size)
+    query = query.options(
         selectinload(Product.category),
         selectinload(Product.images)
     )
@@ -328,21 +308,24 @@ async def admin_list_products(
     result = await db.execute(query)
     products = result.scalars().all()
     
-    items = [product_to_response(p) for p in products]
+    next_cursor = None
+    if cursor is not None:
+        products, next_cursor = split_page(products, page_size, "created_at", "desc")
     
-    return ProductListResponse(
-        items=items,
+    return json_response(dump_product_list(
+        products,
         total=total,
         page=page,
         page_size=page_size,
         total_pages=(total + page_size - 1) // page_size,
-    )
+        next_cursor=next_cursor,
+    ))
 
 
 @router.post("/products", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
 async def create_product(
     product_data: ProductCreate,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Create a new product"""
@@ -395,15 +378,19 @@ async def create_product(
         .options(selectinload(Product.category), selectinload(Product.images))
     )
     product = result.scalar_one()
+    code_index.upsert(product.id, product.code, product.name, product.is_active)
+    product_counter.invalidate()
+    dashboard_stats.invalidate()  # total_products
+    await response_cache.invalidate(CATALOG_PRODUCTS, CATALOG_CATEGORIES)
     
-    return product_to_response(product)
+    return json_response(dump_product(product), status_code=status.HTTP_201_CREATED)
 
 
 @router.put("/products/{product_id}", response_model=ProductResponse)
 async def update_product(
     product_id: int,
     product_data: ProductUpdate,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Update a product"""
@@ -465,14 +452,17 @@ async def update_product(
         .options(selectinload(Product.category), selectinload(Product.images))
     )
     product = result.scalar_one()
+    code_index.upsert(product.id, product.code, product.name, product.is_active)
+    product_counter.invalidate()
+    await response_cache.invalidate(CATALOG_PRODUCTS, CATALOG_CATEGORIES)
     
-    return product_to_response(product)
+    return json_response(dump_product(product))
 
 
 @router.delete("/products/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_product(
     product_id: int,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Delete a product"""
@@ -491,11 +481,12 @@ async def delete_product(
         delete(ProductImage).where(ProductImage.product_id == product_id)
     )
     
-    # Eliminar items del carrito relacionados
+    # Eliminar items del carrito relacionados (y recordar de quién eran)
     from app.models.cart import CartItem
-    await db.execute(
-        delete(CartItem).where(CartItem.product_id == product_id)
+    cart_result = await db.execute(
+        delete(CartItem).where(CartItem.product_id == product_id).returning(CartItem.user_id)
     )
+    cart_user_ids = set(cart_result.scalars())
     
     # Poner NULL en order_items y quote_items (mantiene historial)
     from app.models.order import OrderItem
@@ -515,6 +506,12 @@ async def delete_product(
     )
     
     await db.commit()
+    code_index.remove(product_id)
+    for user_id in cart_user_ids:
+        cart_summary.invalidate(user_id)
+    product_counter.invalidate()
+    dashboard_stats.invalidate()  # total_products
+    await response_cache.invalidate(CATALOG_PRODUCTS, CATALOG_CATEGORIES)
 
 
 # --- Orders Management ---
@@ -524,7 +521,8 @@ async def admin_list_orders(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     status_filter: OrderStatus | None = None,
-    admin: User = Depends(get_admin_user),
+    cursor: str | None = Query(None, description="Paginación por cursor (vacío = primera página)"),
+    admin: Principal = Depends(get_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """List all orders"""
@@ -533,8 +531,6 @@ async def admin_list_orders(
     if status_filter:
         query = query.where(Order.status == status_filter)
     
-    query = query.order_by(Order.created_at.desc())
-    
     # Count
     count_query = select(func.count(Order.id))
     if status_filter:
@@ -542,13 +538,22 @@ async def admin_list_orders(
     total_result = await db.execute(count_query)
     total = total_result.scalar() or 0
     
-    # Pagination
-    offset = (page - 1) * page_size
-    query = query.offset(offset).limit(page_size).options(selectinload(Order.items))
+    # Pagination (offset o cursor)
+    if cursor is not None:
+        position = decode_cursor(cursor, "created_at", "desc")
+        query = apply_keyset(query, Order.created_at, Order.id, True, position, page_size)
+    else:
+        offset = (page - 1) * page_size
+        query = query.order_by(Order.created_at.desc()).offset(offset).limit(page_size)
+    query = query.options(selectinload(Order.items))
     
     result = await db.execute(query)
     orders = result.scalars().all()
     
+    next_cursor = None
+    if cursor is not None:
+        orders, next_cursor = split_page(orders, page_size, "created_at", "desc")
+    
     items = [
         OrderResponse(
             id=o.id,
@@ -581,6 +586,7 @@ async def admin_list_orders(
         total=total,
         page=page,
         page_size=page_size,
+        next_cursor=next_cursor,
     )
 
 
@@ -588,7 +594,7 @@ async def admin_list_orders(
 async def update_order_status(
     order_id: int,
     status_data: OrderStatusUpdate,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Update order status"""
@@ -603,7 +609,14 @@ async def update_order_status(
             detail="Pedido no encontrado"
         )
     
-    order.status = status_data.status
+    # Cancelar libera el stock; reactivar un cancelado lo vuelve a reservar
+    stock_changed = (order.status == OrderStatus.CANCELLED) != (status_data.status == OrderStatus.CANCELLED)
+    shortages = await stock_service.set_order_status(db, order, status_data.status)
+    if shortages:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=shortage_message(shortages)
+        )
     if status_data.notes:
         order.notes = (order.notes or "") + f"\n[Admin] {status_data.notes}"
     
@@ -611,6 +624,10 @@ async def update_order_status(
         order.shipped_at = datetime.utcnow()
     
     await db.commit()
+    if stock_changed:
+        product_counter.invalidate()
+        await response_cache.invalidate(CATALOG_PRODUCTS)
+    dashboard_stats.invalidate()
     await db.refresh(order)
     
     return OrderResponse(
@@ -645,7 +662,8 @@ async def admin_list_quotes(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     status_filter: QuoteStatus | None = None,
-    admin: User = Depends(get_admin_user),
+    cursor: str | None = Query(None, description="Paginación por cursor (vacío = primera página)"),
+    admin: Principal = Depends(get_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """List all quotes"""
@@ -654,8 +672,6 @@ async def admin_list_quotes(
     if status_filter:
         query = query.where(Quote.status == status_filter)
     
-    query = query.order_by(Quote.created_at.desc())
-    
     # Count
     count_query = select(func.count(Quote.id))
     if status_filter:
@@ -663,18 +679,27 @@ async def admin_list_quotes(
     total_result = await db.execute(count_query)
     total = total_result.scalar() or 0
     
-    # Pagination
-    offset = (page - 1) * page_size
-    query = query.offset(offset).limit(page_size)
+    # Pagination (offset o cursor)
+    if cursor is not None:
+        position = decode_cursor(cursor, "created_at", "desc")
+        query = apply_keyset(query, Quote.created_at, Quote.id, True, position, page_size)
+    else:
+        offset = (page - 1) * page_size
+        query = query.order_by(Quote.created_at.desc()).offset(offset).limit(page_size)
     
     result = await db.execute(query)
     quotes = result.scalars().all()
     
+    next_cursor = None
+    if cursor is not None:
+        quotes, next_cursor = split_page(quotes, page_size, "created_at", "desc")
+    
     return QuoteListResponse(
         items=[QuoteResponse.model_validate(q) for q in quotes],
         total=total,
         page=page,
         page_size=page_size,
+        next_cursor=next_cursor,
     )
 
 
@@ -682,7 +707,7 @@ async def admin_list_quotes(
 async def update_quote(
     quote_id: int,
     quote_data: QuoteUpdate,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Update quote status"""
@@ -706,6 +731,7 @@ async def update_quote(
         quote.admin_notes = quote_data.admin_notes
     
     await db.commit()
+    dashboard_stats.invalidate()
     await db.refresh(quote)
     
     return QuoteResponse.model_validate(quote)
@@ -715,7 +741,7 @@ async def update_quote(
 
 @router.get("/users", response_model=list[UserResponse])
 async def admin_list_users(
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """List all users"""
@@ -730,7 +756,7 @@ async def admin_list_users(
 async def admin_update_user(
     user_id: int,
     user_data: UserAdminUpdate,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Update a user (admin)"""
@@ -751,6 +777,7 @@ async def admin_update_user(
     
     await db.commit()
     await db.refresh(user)
+    user_cache.invalidate(user.id)
     
     return UserResponse.model_validate(user)
 
@@ -8,12 +8,24 @@ from sqlalchemy import select
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse, Token, UserUpdate, LoginResponse
-from app.utils.security import verify_password, get_password_hash, create_access_token
+from app.utils.security import create_access_token
 from app.utils.dependencies import get_current_active_user
+from app.services.dashboard import dashboard_stats
+from app.services.passwords import password_service, PasswordServiceBusy
+from app.services.user_cache import Principal, user_cache
 
 router = APIRouter()
 
 
+def service_busy() -> HTTPException:
+    """bcrypt saturado en este worker (ver services/passwords.py)"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servidor ocupado, intentá nuevamente en unos segundos",
+        headers={"Retry-After": "5"},
+    )
+
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(
     user_data: UserCreate,
@@ -30,16 +42,22 @@ async def register(
             detail="El email ya está registrado"
         )
     
+    try:
+        password_hash = await password_service.hash(user_data.password)
+    except PasswordServiceBusy:
+        raise service_busy()
+    
     # Create user
     user = User(
         email=user_data.email,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=password_hash,
         name=user_data.name,
         phone=user_data.phone,
     )
     db.add(user)
     await db.commit()
     await db.refresh(user)
+    dashboard_stats.invalidate()  # total_users
     
     return user
 
@@ -56,7 +74,12 @@ async def login(
     )
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(form_data.password, user.password_hash):
+    try:
+        valid = user is not None and await password_service.verify(form_data.password, user.password_hash)
+    except PasswordServiceBusy:
+        raise service_busy()
+    
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email o contraseña incorrectos",
@@ -69,6 +92,15 @@ async def login(
             detail="Usuario inactivo"
         )
     
+    # Subió BCRYPT_ROUNDS: se aprovecha que tenemos la password para actualizar el hash
+    if password_service.needs_rehash(user.password_hash):
+        try:
+            user.password_hash = await password_service.hash(form_data.password)
+            await db.commit()
+            user_cache.invalidate(user.id)
+        except PasswordServiceBusy:
+            pass  # Se actualiza en el próximo login
+    
     # Create access token (sub debe ser string según JWT spec)
     access_token = create_access_token(
         data={
@@ -88,26 +120,30 @@ async def login(
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get current user info"""
-    return current_user
+    # La cache solo tiene el principal: la fila completa se carga acá
+    return await db.get(User, current_user.id)
 
 
 @router.put("/me", response_model=UserResponse)
 async def update_current_user(
     user_data: UserUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Update current user info"""
+    user = await db.get(User, current_user.id)
     if user_data.name is not None:
-        current_user.name = user_data.name
+        user.name = user_data.name
     if user_data.phone is not None:
-        current_user.phone = user_data.phone
+        user.phone = user_data.phone
     
     await db.commit()
-    await db.refresh(current_user)
+    await db.refresh(user)
+    user_cache.invalidate(user.id)
     
-    return current_user
+    return user
 
@@ -2,25 +2,37 @@
 Banner API Routes
 """
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request
+from pydantic import TypeAdapter
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models.banner import Banner
-from app.models.user import User
+from app.services.user_cache import Principal
 from app.schemas.banner import BannerCreate, BannerUpdate, BannerResponse
 from app.utils.dependencies import get_current_user
+from app.services.response_cache import response_cache, CATALOG_BANNERS
 
 router = APIRouter(prefix="/banners", tags=["banners"])
 
+# TTL corto: los banners tienen fechas de vigencia
+CACHE_SECONDS = 60
+
+_banner_list = TypeAdapter(list[BannerResponse])
+
 
 @router.get("", response_model=list[BannerResponse])
 async def get_banners(
+    request: Request,
     active_only: bool = True,
     db: AsyncSession = Depends(get_db)
 ):
     """Get all banners (públicos - solo activos y vigentes)"""
+    cached = await response_cache.get(CATALOG_BANNERS, request, CACHE_SECONDS)
+    if cached is not None:
+        return cached
+    
     query = select(Banner).order_by(Banner.order, Banner.created_at.desc())
     
     if active_only:
@@ -34,12 +46,13 @@ async def get_banners(
         )
     
     result = await db.execute(query)
-    return result.scalars().all()
+    body = _banner_list.dump_json(result.scalars().all())
+    return await response_cache.store(CATALOG_BANNERS, request, body, CACHE_SECONDS)
 
 
 @router.get("/all", response_model=list[BannerResponse])
 async def get_all_banners(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get all banners including inactive (admin only)"""
@@ -70,7 +83,7 @@ async def get_banner(banner_id: int, db: AsyncSession = Depends(get_db)):
 @router.post("", response_model=BannerResponse, status_code=status.HTTP_201_CREATED)
 async def create_banner(
     banner_data: BannerCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Create a new banner (admin only)"""
@@ -84,6 +97,7 @@ async def create_banner(
     db.add(banner)
     await db.commit()
     await db.refresh(banner)
+    await response_cache.invalidate(CATALOG_BANNERS)
     
     return banner
 
@@ -92,7 +106,7 @@ async def create_banner(
 async def update_banner(
     banner_id: int,
     banner_data: BannerUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Update a banner (admin only)"""
@@ -114,6 +128,7 @@ async def update_banner(
     
     await db.commit()
     await db.refresh(banner)
+    await response_cache.invalidate(CATALOG_BANNERS)
     
     return banner
 
@@ -121,7 +136,7 @@ async def update_banner(
 @router.delete("/{banner_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_banner(
     banner_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Delete a banner (admin only)"""
@@ -139,4 +154,5 @@ async def delete_banner(
     
     await db.delete(banner)
     await db.commit()
+    await response_cache.invalidate(CATALOG_BANNERS)
 
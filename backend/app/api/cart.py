@@ -1,158 +1,177 @@
 """
 Cart API Routes
 """
+from datetime import datetime
 from decimal import Decimal
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, func
 from sqlalchemy.orm import selectinload
 from app.database import get_db
-from app.models.user import User
+from app.services.user_cache import Principal
 from app.models.product import Product
 from app.models.cart import CartItem
-from app.schemas.cart import CartItemCreate, CartItemUpdate, CartItemResponse, CartResponse, ProductInCart
+from app.schemas.cart import (
+    CartItemCreate, CartBulkAdd, CartItemUpdate, CartItemResponse, CartResponse, CartSummary, ProductInCart
+)
+from app.services.cart_summary import cart_summary, shipping_estimate
 from app.utils.dependencies import get_current_active_user
+from app.utils.upsert import insert_for
 
 router = APIRouter()
 
 
-@router.get("", response_model=CartResponse)
-async def get_cart(
-    current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
-):
-    """Get current user's cart"""
+def _item_response(item, product: Product) -> CartItemResponse:
+    """Línea del carrito (item: CartItem o fila con id, product_id, quantity, created_at)"""
+    return CartItemResponse(
+        id=item.id,
+        product_id=item.product_id,
+        product=ProductInCart(
+            id=product.id,
+            name=product.name,
+            code=product.code,
+            brand=product.brand,
+            price=product.price,
+            original_price=product.original_price,
+            stock=product.stock,
+            image_url=product.image_url,
+            in_stock=product.in_stock,
+        ),
+        quantity=item.quantity,
+        subtotal=product.price * item.quantity,
+        created_at=item.created_at,
+    )
+
+
+async def _cart_response(db: AsyncSession, user_id: int) -> CartResponse:
     result = await db.execute(
         select(CartItem)
-        .where(CartItem.user_id == current_user.id)
+        .where(CartItem.user_id == user_id)
         .options(selectinload(CartItem.product))
         .order_by(CartItem.created_at.desc())
     )
-    cart_items = result.scalars().all()
-    
-    items = []
-    subtotal = Decimal("0.00")
-    
-    for item in cart_items:
-        product = item.product
-        item_subtotal = product.price * item.quantity
-        subtotal += item_subtotal
-        
-        items.append(CartItemResponse(
-            id=item.id,
-            product_id=item.product_id,
-            product=ProductInCart(
-                id=product.id,
-                name=product.name,
-                code=product.code,
-                brand=product.brand,
-                price=product.price,
-                original_price=product.original_price,
-                stock=product.stock,
-                image_url=product.image_url,
-                in_stock=product.in_stock,
-            ),
-            quantity=item.quantity,
-            subtotal=item_subtotal,
-            created_at=item.created_at,
-        ))
-    
-    # Simple shipping estimate (free over 100,000 ARS)
-    shipping_estimate = Decimal("0.00") if subtotal >= 100000 else Decimal("5000.00")
-    total = subtotal + shipping_estimate
-    
+    items = [_item_response(item, item.product) for item in result.scalars().all()]
+    subtotal = sum((item.subtotal for item in items), Decimal("0.00"))
+    shipping = shipping_estimate(subtotal)
+
     return CartResponse(
         items=items,
         items_count=len(items),
         subtotal=subtotal,
-        shipping_estimate=shipping_estimate,
-        total=total,
+        shipping_estimate=shipping,
+        total=subtotal + shipping,
     )
 
 
-@router.post("/add", response_model=CartItemResponse)
-async def add_to_cart(
-    item_data: CartItemCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
-):
-    """Add a product to cart"""
-    # Check if product exists and is active
-    product_result = await db.execute(
-        select(Product).where(Product.id == item_data.product_id)
+async def _check_lines(db: AsyncSession, user_id: int, lines: dict[int, int]) -> dict[int, Product]:
+    """
+    Valida existencia y stock de todas las líneas en una sola consulta
+    (cantidad a agregar + la que ya está en el carrito). Devuelve product_id -> Product.
+    """
+    result = await db.execute(
+        select(Product, func.coalesce(CartItem.quantity, 0))
+        .outerjoin(
+            CartItem,
+            (CartItem.product_id == Product.id) & (CartItem.user_id == user_id)
+        )
+        .where(Product.id.in_(lines))
     )
-    product = product_result.scalar_one_or_none()
-    
-    if not product or not product.is_active:
+    found = {product.id: (product, in_cart) for product, in_cart in result.all()}
+
+    missing = [pid for pid in lines if pid not in found or not found[pid][0].is_active]
+    if missing:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Producto no encontrado"
+            detail="Producto no encontrado" if len(lines) == 1
+            else f"Productos no encontrados: {', '.join(map(str, missing))}"
         )
-    
-    # Check stock
-    if product.stock < item_data.quantity:
+
+    short = [found[pid][0] for pid, quantity in lines.items() if found[pid][0].stock < found[pid][1] + quantity]
+    if short:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Stock insuficiente. Disponible: {product.stock}"
+            detail=f"Stock insuficiente. Disponible: {short[0].stock}" if len(lines) == 1
+            else "Stock insuficiente. " + "; ".join(f"{p.code}: disponible {p.stock}" for p in short)
         )
-    
-    # Check if already in cart
-    existing_result = await db.execute(
-        select(CartItem)
-        .where(CartItem.user_id == current_user.id)
-        .where(CartItem.product_id == item_data.product_id)
-    )
-    existing_item = existing_result.scalar_one_or_none()
-    
-    if existing_item:
-        # Update quantity
-        new_quantity = existing_item.quantity + item_data.quantity
-        if product.stock < new_quantity:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Stock insuficiente. Disponible: {product.stock}"
-            )
-        existing_item.quantity = new_quantity
-        cart_item = existing_item
-    else:
-        # Create new cart item
-        cart_item = CartItem(
-            user_id=current_user.id,
-            product_id=item_data.product_id,
-            quantity=item_data.quantity,
-        )
-        db.add(cart_item)
-    
+    return {pid: product for pid, (product, _) in found.items()}
+
+
+async def _upsert_lines(db: AsyncSession, user_id: int, lines: dict[int, int]) -> list:
+    """
+    INSERT ... ON CONFLICT (user_id, product_id) DO UPDATE sumando cantidades,
+    todas las líneas en un solo statement. Devuelve las filas resultantes.
+    """
+    now = datetime.utcnow()
+    stmt = insert_for(db, CartItem).values([
+        {"user_id": user_id, "product_id": pid, "quantity": quantity, "created_at": now, "updated_at": now}
+        for pid, quantity in lines.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CartItem.user_id, CartItem.product_id],
+        set_={"quantity": CartItem.quantity + stmt.excluded.quantity, "updated_at": now},
+    ).returning(CartItem.id, CartItem.product_id, CartItem.quantity, CartItem.created_at)
+    result = await db.execute(stmt)
+    return result.all()
+
+
+@router.get("", response_model=CartResponse)
+async def get_cart(
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get current user's cart"""
+    return await _cart_response(db, current_user.id)
+
+
+@router.get("/summary", response_model=CartSummary)
+async def get_cart_summary(
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Totales del carrito sin las líneas (para el badge del navbar)"""
+    return await cart_summary.get(db, current_user.id)
+
+
+@router.post("/add", response_model=CartItemResponse)
+async def add_to_cart(
+    item_data: CartItemCreate,
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Add a product to cart"""
+    lines = {item_data.product_id: item_data.quantity}
+    products = await _check_lines(db, current_user.id, lines)
+    (row,) = await _upsert_lines(db, current_user.id, lines)
     await db.commit()
-    await db.refresh(cart_item)
-    
-    item_subtotal = product.price * cart_item.quantity
-    
-    return CartItemResponse(
-        id=cart_item.id,
-        product_id=cart_item.product_id,
-        product=ProductInCart(
-            id=product.id,
-            name=product.name,
-            code=product.code,
-            brand=product.brand,
-            price=product.price,
-            original_price=product.original_price,
-            stock=product.stock,
-            image_url=product.image_url,
-            in_stock=product.in_stock,
-        ),
-        quantity=cart_item.quantity,
-        subtotal=item_subtotal,
-        created_at=cart_item.created_at,
-    )
+    cart_summary.invalidate(current_user.id)
+
+    return _item_response(row, products[row.product_id])
+
+
+@router.post("/bulk", response_model=CartResponse)
+async def bulk_add_to_cart(
+    data: CartBulkAdd,
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Agrega varios productos al carrito (todo o nada) y devuelve el carrito completo"""
+    lines: dict[int, int] = {}
+    for item in data.items:
+        lines[item.product_id] = lines.get(item.product_id, 0) + item.quantity
+
+    await _check_lines(db, current_user.id, lines)
+    await _upsert_lines(db, current_user.id, lines)
+    await db.commit()
+    cart_summary.invalidate(current_user.id)
+
+    return await _cart_response(db, current_user.id)
 
 
 @router.put("/{item_id}", response_model=CartItemResponse)
 async def update_cart_item(
     item_id: int,
     item_data: CartItemUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Update cart item quantity"""
@@ -181,34 +200,16 @@ async def update_cart_item(
     
     cart_item.quantity = item_data.quantity
     await db.commit()
+    cart_summary.invalidate(current_user.id)
     await db.refresh(cart_item)
-    
-    item_subtotal = product.price * cart_item.quantity
-    
-    return CartItemResponse(
-        id=cart_item.id,
-        product_id=cart_item.product_id,
-        product=ProductInCart(
-            id=product.id,
-            name=product.name,
-            code=product.code,
-            brand=product.brand,
-            price=product.price,
-            original_price=product.original_price,
-            stock=product.stock,
-            image_url=product.image_url,
-            in_stock=product.in_stock,
-        ),
-        quantity=cart_item.quantity,
-        subtotal=item_subtotal,
-        created_at=cart_item.created_at,
-    )
+
+    return _item_response(cart_item, product)
 
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def remove_cart_item(
     item_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Remove an item from cart"""
@@ -227,11 +228,12 @@ async def remove_cart_item(
     
     await db.delete(cart_item)
     await db.commit()
+    cart_summary.invalidate(current_user.id)
 
 
 @router.delete("", status_code=status.HTTP_204_NO_CONTENT)
 async def clear_cart(
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Clear entire cart"""
@@ -239,4 +241,5 @@ async def clear_cart(
         delete(CartItem).where(CartItem.user_id == current_user.id)
     )
     await db.commit()
+    cart_summary.invalidate(current_user.id)
 
@@ -2,28 +2,37 @@
 Categories API Routes (Public)
 Optimizado con cache headers para mejor rendimiento
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, status, Request
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
 from app.database import get_db
 from app.models.category import Category
-from app.models.product import Product
 from app.schemas.category import CategoryResponse
+from app.services.product_count import categories_with_counts
+from app.services.response_cache import response_cache, CATALOG_CATEGORIES
 
 router = APIRouter()
 
+# Cache por 5 minutos (datos que cambian poco)
+CACHE_SECONDS = 300
+CACHE_HEADERS = {"Cache-Control": f"public, max-age={CACHE_SECONDS}"}
+
+_category_list = TypeAdapter(list[CategoryResponse])
+
 
 @router.get("", response_model=list[CategoryResponse])
 async def list_categories(
-    response: Response,
+    request: Request,
     active_only: bool = True,
     db: AsyncSession = Depends(get_db)
 ):
     """List all categories with product count"""
-    # Cache por 5 minutos (datos que cambian poco)
-    response.headers["Cache-Control"] = "public, max-age=300"
+    cached = await response_cache.get(CATALOG_CATEGORIES, request, CACHE_SECONDS, CACHE_HEADERS)
+    if cached is not None:
+        return cached
     
-    query = select(Category)
+    # Categorías + cantidad de productos activos en un solo GROUP BY
+    query = categories_with_counts()
     
     if active_only:
         query = query.where(Category.is_active == True)
@@ -31,18 +40,9 @@ async def list_categories(
     query = query.order_by(Category.display_order, Category.name)
     
     result = await db.execute(query)
-    categories = result.scalars().all()
     
-    # Get product counts
     response = []
-    for cat in categories:
-        count_result = await db.execute(
-            select(func.count(Product.id))
-            .where(Product.category_id == cat.id)
-            .where(Product.is_active == True)
-        )
-        count = count_result.scalar() or 0
-        
+    for cat, count in result.all():
         response.append(CategoryResponse(
             id=cat.id,
             name=cat.name,
@@ -56,7 +56,8 @@ async def list_categories(
             products_count=count,
         ))
     
-    return response
+    body = _category_list.dump_json(response)
+    return await response_cache.store(CATALOG_CATEGORIES, request, body, CACHE_SECONDS, CACHE_HEADERS)
 
 
 @router.get("/{slug}", response_model=CategoryResponse)
@@ -66,23 +67,17 @@ async def get_category(
 ):
     """Get a category by slug"""
     result = await db.execute(
-        select(Category).where(Category.slug == slug)
+        categories_with_counts().where(Category.slug == slug)
     )
-    category = result.scalar_one_or_none()
+    row = result.one_or_none()
     
-    if not category:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Categoría no encontrada"
         )
     
-    # Get product count
-    count_result = await db.execute(
-        select(func.count(Product.id))
-        .where(Product.category_id == category.id)
-        .where(Product.is_active == True)
-    )
-    count = count_result.scalar() or 0
+    category, count = row
     
     return CategoryResponse(
         id=category.id,
@@ -6,14 +6,19 @@ from datetime import datetime
 from decimal import Decimal
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete, func
+from sqlalchemy import select, insert, delete, func
 from sqlalchemy.orm import selectinload
 from app.database import get_db
-from app.models.user import User
+from app.services.user_cache import Principal
 from app.models.product import Product
 from app.models.cart import CartItem
 from app.models.order import Order, OrderItem, OrderStatus
 from app.schemas.order import OrderCreate, OrderResponse, OrderItemResponse, OrderListResponse
+from app.services.cart_summary import cart_summary, shipping_estimate
+from app.services.dashboard import dashboard_stats
+from app.services.product_count import product_counter
+from app.services.response_cache import response_cache, CATALOG_PRODUCTS
+from app.services.stock import stock_service, shortage_message
 from app.utils.dependencies import get_current_active_user
 
 router = APIRouter()
@@ -27,44 +32,42 @@ def generate_order_number() -> str:
 @router.post("", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
 async def create_order(
     order_data: OrderCreate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Create an order from current cart"""
-    # Get cart items
+    """
+    Create an order from current cart
+    Una sola transacción: carrito + productos en un SELECT, reserva de stock,
+    INSERT del pedido, un INSERT multi-fila de los items con RETURNING y
+    borrado del carrito. La respuesta se arma con los datos insertados.
+    """
+    # Get cart items (con su producto, en un solo SELECT)
     result = await db.execute(
-        select(CartItem)
+        select(CartItem.quantity, Product)
+        .join(Product, Product.id == CartItem.product_id)
         .where(CartItem.user_id == current_user.id)
-        .options(selectinload(CartItem.product))
+        .order_by(CartItem.id)
     )
-    cart_items = result.scalars().all()
+    cart_lines = result.all()
     
-    if not cart_items:
+    if not cart_lines:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="El carrito está vacío"
         )
     
-    # Validate stock and calculate totals
+    # Validate products and calculate totals
     subtotal = Decimal("0.00")
     order_items_data = []
     
-    for cart_item in cart_items:
-        product = cart_item.product
-        
+    for quantity, product in cart_lines:
         if not product.is_active:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"El producto '{product.name}' ya no está disponible"
             )
         
-        if product.stock < cart_item.quantity:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Stock insuficiente para '{product.name}'. Disponible: {product.stock}"
-            )
-        
-        item_total = product.price * cart_item.quantity
+        item_total = product.price * quantity
         subtotal += item_total
         
         order_items_data.append({
@@ -72,13 +75,23 @@ async def create_order(
             "product_name": product.name,
             "product_code": product.code,
             "product_brand": product.brand,
-            "quantity": cart_item.quantity,
+            "quantity": quantity,
             "unit_price": product.price,
             "total_price": item_total,
         })
     
+    # Reserve stock (UPDATE condicional: no sobrevende con checkouts simultáneos)
+    shortages = await stock_service.reserve(
+        db, {item["product_id"]: item["quantity"] for item in order_items_data}
+    )
+    if shortages:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=shortage_message(shortages)
+        )
+    
     # Calculate shipping (free over 100,000 ARS)
-    shipping_cost = Decimal("0.00") if subtotal >= 100000 else Decimal("5000.00")
+    shipping_cost = shipping_estimate(subtotal)
     total = subtotal + shipping_cost
     
     # Create order
@@ -100,17 +113,15 @@ async def create_order(
     db.add(order)
     await db.flush()  # Get order ID
     
-    # Create order items
+    # Create order items: un INSERT multi-fila (una línea por producto en el carrito)
     for item_data in order_items_data:
-        order_item = OrderItem(
-            order_id=order.id,
-            **item_data
-        )
-        db.add(order_item)
-    
-    # Update product stock
-    for cart_item in cart_items:
-        cart_item.product.stock -= cart_item.quantity
+        item_data["order_id"] = order.id
+    result = await db.execute(
+        insert(OrderItem)
+        .values(order_items_data)
+        .returning(OrderItem.id, OrderItem.product_id)
+    )
+    item_ids = {product_id: item_id for item_id, product_id in result.all()}
     
     # Clear cart
     await db.execute(
@@ -118,13 +129,10 @@ async def create_order(
     )
     
     await db.commit()
-    await db.refresh(order)
-    
-    # Load items
-    result = await db.execute(
-        select(OrderItem).where(OrderItem.order_id == order.id)
-    )
-    items = result.scalars().all()
+    product_counter.invalidate()  # Cambió el stock (filtro in_stock)
+    await response_cache.invalidate(CATALOG_PRODUCTS)
+    dashboard_stats.invalidate()
+    cart_summary.invalidate(current_user.id)
     
     return OrderResponse(
         id=order.id,
@@ -143,7 +151,10 @@ async def create_order(
         shipping_zip=order.shipping_zip,
         shipping_phone=order.shipping_phone,
         notes=order.notes,
-        items=[OrderItemResponse.model_validate(i) for i in items],
+        items=[
+            OrderItemResponse(id=item_ids[item["product_id"]], **item)
+            for item in order_items_data
+        ],
         created_at=order.created_at,
         updated_at=order.updated_at,
         paid_at=order.paid_at,
@@ -155,7 +166,7 @@ async def create_order(
 async def list_orders(
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=50),
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
     """List user's orders"""
@@ -215,7 +226,7 @@ async def list_orders(
 @router.get("/{order_id}", response_model=OrderResponse)
 async def get_order(
     order_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get order details"""
@@ -1,16 +1,17 @@
 """
 Payments API Routes (MercadoPago)
 """
-from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from pydantic import BaseModel
 from app.database import get_db
-from app.models.user import User
+from app.services.user_cache import Principal
 from app.models.order import Order, OrderStatus
+from app.services.dashboard import dashboard_stats
 from app.services.mercadopago import mercadopago_service
+from app.services.payment_inbox import payment_inbox, payment_id_from_webhook
 from app.utils.dependencies import get_current_active_user
 
 router = APIRouter()
@@ -31,7 +32,7 @@ class WebhookPayload(BaseModel):
 @router.post("/create-preference/{order_id}", response_model=PaymentPreferenceResponse)
 async def create_payment_preference(
     order_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Create MercadoPago payment preference for an order"""
@@ -70,11 +71,12 @@ async def create_payment_preference(
     ]
     
     try:
-        preference = mercadopago_service.create_preference(order, items)
+        preference = await mercadopago_service.create_preference(order, items)
         
         # Update order status
         order.status = OrderStatus.PAYMENT_PENDING
         await db.commit()
+        dashboard_stats.invalidate()
         
         return PaymentPreferenceResponse(
             preference_id=preference["id"],
@@ -93,50 +95,25 @@ async def payment_webhook(
     request: Request,
     db: AsyncSession = Depends(get_db)
 ):
-    """Handle MercadoPago webhook notifications"""
+    """Handle MercadoPago webhook notifications (se procesan en background)"""
     try:
         data = await request.json()
-        
-        payment = mercadopago_service.process_webhook(data)
-        
-        if payment:
-            external_reference = payment.get("external_reference")
-            payment_status = payment.get("status")
-            payment_id = str(payment.get("id"))
-            
-            if external_reference:
-                # Find order by order_number
-                result = await db.execute(
-                    select(Order).where(Order.order_number == external_reference)
-                )
-                order = result.scalar_one_or_none()
-                
-                if order:
-                    order.payment_id = payment_id
-                    order.payment_status = payment_status
-                    
-                    # Update order status based on payment status
-                    if payment_status == "approved":
-                        order.status = OrderStatus.PAID
-                        order.paid_at = datetime.utcnow()
-                    elif payment_status in ["rejected", "cancelled"]:
-                        order.status = OrderStatus.CANCELLED
-                    elif payment_status == "pending":
-                        order.status = OrderStatus.PAYMENT_PENDING
-                    
-                    await db.commit()
-        
-        return {"status": "ok"}
-    except Exception as e:
-        # Log error but return 200 to avoid MercadoPago retries
-        print(f"Webhook error: {e}")
-        return {"status": "error", "message": str(e)}
+    except ValueError:
+        return {"status": "ignored"}
+
+    payment_id = payment_id_from_webhook(data)
+    if not payment_id:
+        return {"status": "ignored"}
+
+    # Solo se confirma una vez guardado: si falla, MercadoPago reintenta
+    await payment_inbox.enqueue(db, payment_id, data)
+    return {"status": "ok"}
 
 
 @router.get("/status/{order_id}")
 async def get_payment_status(
     order_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get payment status for an order"""
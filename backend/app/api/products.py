@@ -2,49 +2,70 @@
 Products API Routes (Public)
 Optimizado con cache headers para mejor rendimiento
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_
+from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
 from app.database import get_db
 from app.models.product import Product
 from app.models.category import Category
-from app.schemas.product import ProductResponse, ProductListResponse, ProductImageResponse
+from app.models.product_image import ProductImage
+from app.schemas.product import ProductResponse, ProductListResponse, ProductCardListResponse, CodeSuggestion
+from app.services.code_index import code_index, MATCH_EXACT
+from app.services.product_count import product_counter, filters_key, COUNT_NONE
+from app.utils.pagination import decode_cursor, apply_keyset, split_page
+from app.utils.serialization import dump_product, dump_product_list, dump_product_cards, json_response
+from app.services.search import product_search
+from app.services.response_cache import response_cache, CATALOG_PRODUCTS
 
 router = APIRouter()
 
+CURSOR_DESCRIPTION = (
+    "Paginación por cursor: enviar vacío para la primera página y luego "
+    "el next_cursor de la respuesta. Ignora page."
+)
+COUNT_DESCRIPTION = (
+    "Total del listado: exact (cacheado por filtros), estimate (estadísticas "
+    "del planner) o false (sin total, para scroll infinito)."
+)
 
-def product_to_response(p: Product) -> ProductResponse:
-    """Helper para convertir Product model a ProductResponse"""
-    return ProductResponse(
-        id=p.id,
-        category_id=p.category_id,
-        category=p.category,
-        name=p.name,
-        code=p.code,
-        brand=p.brand,
-        description=p.description,
-        price=p.price,
-        original_price=p.original_price,
-        stock=p.stock,
-        image_url=p.image_url,
-        images=[ProductImageResponse.model_validate(img) for img in (p.images or [])],
-        is_active=p.is_active,
-        is_featured=p.is_featured,
-        is_new=p.is_new,
-        is_on_promotion=p.is_on_promotion,
-        rating=p.rating,
-        reviews_count=p.reviews_count,
-        in_stock=p.in_stock,
-        discount_percent=p.discount_percent,
-        created_at=p.created_at,
-        updated_at=p.updated_at,
-    )
+# Cache por 1 minuto (datos que pueden cambiar)
+CACHE_SECONDS = 60
+CACHE_HEADERS = {"Cache-Control": f"public, max-age={CACHE_SECONDS}"}
+
+# Imagen principal: la marcada is_primary o, si no hay, la primera por display_order
+_primary_image = (
+    select(ProductImage.image_url)
+    .where(ProductImage.product_id == Product.id)
+    .order_by(ProductImage.is_primary.desc(), ProductImage.display_order, ProductImage.id)
+    .limit(1)
+    .correlate(Product)
+    .scalar_subquery()
+)
+
+# Columnas de ?fields=card (sin description ni la lista de imágenes).
+# created_at se lee para armar el cursor aunque no se devuelve.
+CARD_COLUMNS = (
+    Product.id,
+    Product.category_id,
+    Product.name,
+    Product.code,
+    Product.brand,
+    Product.price,
+    Product.original_price,
+    Product.stock,
+    func.coalesce(Product.image_url, _primary_image).label("image_url"),
+    Product.is_featured,
+    Product.is_new,
+    Product.is_on_promotion,
+    Product.rating,
+    Product.created_at,
+)
 
 
-@router.get("", response_model=ProductListResponse)
+@router.get("", response_model=ProductListResponse | ProductCardListResponse)
 async def list_products(
-    response: Response,
+    request: Request,
     page: int = Query(1, ge=1),
     page_size: int = Query(12, ge=1, le=1000),
     category_id: int | None = None,
@@ -59,11 +80,15 @@ async def list_products(
     codes: str | None = None,
     sort_by: str = Query("created_at", enum=["created_at", "price", "name", "rating"]),
     sort_order: str = Query("desc", enum=["asc", "desc"]),
+    cursor: str | None = Query(None, description=CURSOR_DESCRIPTION),
+    count: str = Query("exact", enum=["exact", "estimate", "false"], description=COUNT_DESCRIPTION),
+    fields: str = Query("full", enum=["full", "card"], description="card: versión liviana para la grilla"),
     db: AsyncSession = Depends(get_db)
 ):
-    """List products with filters and pagination"""
-    # Cache por 1 minuto (datos que pueden cambiar)
-    response.headers["Cache-Control"] = "public, max-age=60"
+    """List products with filters and pagination (offset o cursor)"""
+    cached = await response_cache.get(CATALOG_PRODUCTS, request, CACHE_SECONDS, CACHE_HEADERS)
+    if cached is not None:
+        return cached
     
     query = select(Product).where(Product.is_active == True)
     
@@ -112,40 +137,61 @@ async def list_products(
         if code_list:
             query = query.where(Product.code.in_(code_list))
 
-    # Sorting
+    # Get total count (cacheado / estimado / omitido según ?count=)
+    total, total_mode = await product_counter.count(
+        db,
+        query,
+        filters_key(
+            "list",
+            category_id=category_id, category_slug=category_slug, brand=brand,
+            min_price=min_price, max_price=max_price, in_stock=in_stock,
+            featured=featured, is_new=is_new, on_promotion=on_promotion, codes=codes,
+        ),
+        COUNT_NONE if count == "false" else count,
+    )
+    
+    # Sorting + pagination
     sort_column = getattr(Product, sort_by)
-    if sort_order == "desc":
-        query = query.order_by(sort_column.desc())
+    if cursor is not None:
+        position = decode_cursor(cursor, sort_by, sort_order)
+        query = apply_keyset(query, sort_column, Product.id, sort_order == "desc", position, page_size)
     else:
-        query = query.order_by(sort_column.asc())
-    
-    # Get total count
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
-    
-    # Pagination
-    offset = (page - 1) * page_size
-    query = query.offset(offset).limit(page_size)
-    query = query.options(
-        selectinload(Product.category),
-        selectinload(Product.images)
-    )
+        if sort_order == "desc":
+            query = query.order_by(sort_column.desc())
+        else:
+            query = query.order_by(sort_column.asc())
+        offset = (page - 1) * page_size
+        query = query.offset(offset).limit(page_size)
     
-    result = await db.execute(query)
-    products = result.scalars().all()
+    if fields == "card":
+        # Solo las columnas de la card + imagen principal, en una sola query
+        result = await db.execute(query.with_only_columns(*CARD_COLUMNS))
+        products = result.all()
+    else:
+        query = query.options(
+            selectinload(Product.category),
+            selectinload(Product.images)
+        )
+        result = await db.execute(query)
+        products = result.scalars().all()
     
-    items = [product_to_response(p) for p in products]
+    next_cursor = None
+    if cursor is not None:
+        products, next_cursor = split_page(products, page_size, sort_by, sort_order)
     
-    total_pages = (total + page_size - 1) // page_size
+    total_pages = (total + page_size - 1) // page_size if total is not None else None
     
-    return ProductListResponse(
-        items=items,
+    dump = dump_product_cards if fields == "card" else dump_product_list
+    body = dump(
+        products,
         total=total,
+        total_mode=total_mode,
         page=page,
         page_size=page_size,
         total_pages=total_pages,
+        next_cursor=next_cursor,
     )
+    return await response_cache.store(CATALOG_PRODUCTS, request, body, CACHE_SECONDS, CACHE_HEADERS)
 
 
 @router.get("/search", response_model=ProductListResponse)
@@ -159,25 +205,25 @@ async def search_products(
     in_stock: bool | None = None,
     on_promotion: bool | None = None,
     codes: str | None = None,
-    sort_by: str = Query("name", enum=["created_at", "price", "name", "rating"]),
+    sort_by: str | None = Query(None, enum=["created_at", "price", "name", "rating"]),
     sort_order: str = Query("asc", enum=["asc", "desc"]),
+    cursor: str | None = Query(None, description=CURSOR_DESCRIPTION),
+    count: str = Query("exact", enum=["exact", "estimate", "false"], description=COUNT_DESCRIPTION),
     db: AsyncSession = Depends(get_db)
 ):
-    """Search products by name, code, or brand with additional filters"""
-    search_term = f"%{q}%"
-
-    query = (
-        select(Product)
-        .where(Product.is_active == True)
-        .where(
-            or_(
-                Product.name.ilike(search_term),
-                Product.code.ilike(search_term),
-                Product.brand.ilike(search_term),
-                Product.description.ilike(search_term),
-            )
+    """
+    Search products by name, code, brand or description with additional filters.
+    Sin sort_by, los resultados se ordenan por relevancia.
+    """
+    if cursor is not None and sort_by is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La paginación por cursor requiere sort_by"
         )
-    )
+
+    await code_index.ensure_fresh(db)
+    query = select(Product).where(Product.is_active == True)
+    query, relevance_order = product_search.apply(query, q)
 
     # Category filter
     if category_id:
@@ -210,21 +256,35 @@ async def search_products(
         if code_list:
             query = query.where(Product.code.in_(code_list))
 
-    # Sorting
-    sort_column = getattr(Product, sort_by)
-    if sort_order == "desc":
-        query = query.order_by(sort_column.desc())
+    # Get total count (sin ORDER BY: el ranking no afecta el conteo)
+    total, total_mode = await product_counter.count(
+        db,
+        query,
+        filters_key(
+            "search",
+            q=q, category_id=category_id, category_slug=category_slug, brand=brand,
+            in_stock=in_stock, on_promotion=on_promotion, codes=codes,
+        ),
+        COUNT_NONE if count == "false" else count,
+    )
+
+    # Sorting (por relevancia si no se pidió un orden explícito) + pagination
+    if cursor is not None:
+        position = decode_cursor(cursor, sort_by, sort_order)
+        query = apply_keyset(
+            query, getattr(Product, sort_by), Product.id, sort_order == "desc", position, page_size
+        )
     else:
-        query = query.order_by(sort_column.asc())
-    
-    # Get total count
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
-    
-    # Pagination
-    offset = (page - 1) * page_size
-    query = query.offset(offset).limit(page_size)
+        if sort_by is None:
+            query = query.order_by(*relevance_order)
+        else:
+            sort_column = getattr(Product, sort_by)
+            if sort_order == "desc":
+                query = query.order_by(sort_column.desc())
+            else:
+                query = query.order_by(sort_column.asc())
+        offset = (page - 1) * page_size
+        query = query.offset(offset).limit(page_size)
     query = query.options(
         selectinload(Product.category),
         selectinload(Product.images)
@@ -233,25 +293,53 @@ async def search_products(
     result = await db.execute(query)
     products = result.scalars().all()
     
-    items = [product_to_response(p) for p in products]
+    next_cursor = None
+    if cursor is not None:
+        products, next_cursor = split_page(products, page_size, sort_by, sort_order)
     
-    total_pages = (total + page_size - 1) // page_size
+    total_pages = (total + page_size - 1) // page_size if total is not None else None
     
-    return ProductListResponse(
-        items=items,
+    return json_response(dump_product_list(
+        products,
         total=total,
+        total_mode=total_mode,
         page=page,
         page_size=page_size,
         total_pages=total_pages,
-    )
+        next_cursor=next_cursor,
+    ))
+
+
+@router.get("/code-suggest", response_model=list[CodeSuggestion])
+async def suggest_codes(
+    q: str = Query(..., min_length=1, max_length=50),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Autocompletado por código de pieza (índice en memoria, sin consultar la DB).
+    Tolera separadores, códigos parciales y un error de tipeo.
+    """
+    await code_index.ensure_fresh(db)
+    suggestions = []
+    for product_id, match in code_index.lookup(q, limit):
+        entry = code_index.get(product_id)
+        if entry:
+            suggestions.append(CodeSuggestion(id=product_id, code=entry[0], name=entry[1], match=match))
+    return suggestions
 
 
 @router.get("/{product_id}", response_model=ProductResponse)
 async def get_product(
     product_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db)
 ):
     """Get a product by ID"""
+    cached = await response_cache.get(CATALOG_PRODUCTS, request, CACHE_SECONDS)
+    if cached is not None:
+        return cached
+    
     result = await db.execute(
         select(Product)
         .where(Product.id == product_id)
@@ -268,7 +356,8 @@ async def get_product(
             detail="Producto no encontrado"
         )
     
-    return product_to_response(product)
+    body = dump_product(product)
+    return await response_cache.store(CATALOG_PRODUCTS, request, body, CACHE_SECONDS)
 
 
 @router.get("/code/{code}", response_model=ProductResponse)
@@ -276,7 +365,7 @@ async def get_product_by_code(
     code: str,
     db: AsyncSession = Depends(get_db)
 ):
-    """Get a product by code"""
+    """Get a product by code (acepta el código sin separadores o en minúsculas)"""
     result = await db.execute(
         select(Product)
         .where(Product.code == code)
@@ -286,6 +375,21 @@ async def get_product_by_code(
         )
     )
     product = result.scalar_one_or_none()
+
+    if not product:
+        # "rod skf 32310" -> ROD-SKF-32310 (coincidencia exacta normalizada)
+        await code_index.ensure_fresh(db)
+        matches = code_index.lookup(code, limit=1)
+        if matches and matches[0][1] == MATCH_EXACT:
+            result = await db.execute(
+                select(Product)
+                .where(Product.id == matches[0][0])
+                .options(
+                    selectinload(Product.category),
+                    selectinload(Product.images)
+                )
+            )
+            product = result.scalar_one_or_none()
     
     if not product:
         raise HTTPException(
@@ -293,5 +397,5 @@ async def get_product_by_code(
             detail="Producto no encontrado"
         )
     
-    return product_to_response(product)
+    return json_response(dump_product(product))
 
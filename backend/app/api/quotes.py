@@ -1,40 +1,26 @@
 """
 Quotes API Routes (Cotizaciones)
 """
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from app.database import get_db
-from app.models.user import User
+from app.services.user_cache import Principal
 from app.models.quote import Quote, QuoteItem
 from app.schemas.quote import QuoteCreate, QuoteWithItemsCreate, QuoteResponse
+from app.services.dashboard import dashboard_stats
 from app.services.email import email_service
+from app.services.email_outbox import email_outbox
 from app.utils.dependencies import get_optional_user
 
 router = APIRouter()
 
 
-async def send_quote_emails(quote_id: int, db: AsyncSession):
-    """Background task to send quote emails"""
-    async with db.begin():
-        result = await db.execute(
-            select(Quote).where(Quote.id == quote_id)
-        )
-        quote = result.scalar_one_or_none()
-        
-        if quote:
-            # Send notification to admin
-            await email_service.send_quote_notification(quote)
-            # Send confirmation to customer
-            await email_service.send_quote_confirmation(quote)
-
-
 @router.post("", response_model=QuoteResponse, status_code=status.HTTP_201_CREATED)
 async def create_quote(
     quote_data: QuoteCreate,
-    background_tasks: BackgroundTasks,
-    current_user: User | None = Depends(get_optional_user),
+    current_user: Principal | None = Depends(get_optional_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Create a new quote request (sin items)"""
@@ -47,18 +33,12 @@ async def create_quote(
         message=quote_data.message,
     )
     db.add(quote)
+    # Emails al outbox en la misma transacción: se envían aunque el worker reinicie
+    email_service.queue_quote_emails(db, quote)
     await db.commit()
+    email_outbox.notify()
+    dashboard_stats.invalidate()
     await db.refresh(quote, attribute_names=["items"])
-
-    # Send emails in background
-    background_tasks.add_task(
-        email_service.send_quote_notification, 
-        quote
-    )
-    background_tasks.add_task(
-        email_service.send_quote_confirmation,
-        quote
-    )
     
     return QuoteResponse.model_validate(quote)
 
@@ -66,7 +46,7 @@ async def create_quote(
 @router.post("/whatsapp", response_model=QuoteResponse, status_code=status.HTTP_201_CREATED)
 async def create_quote_whatsapp(
     quote_data: QuoteWithItemsCreate,
-    current_user: User | None = Depends(get_optional_user),
+    current_user: Principal | None = Depends(get_optional_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Create a new quote with items (para cotización por WhatsApp)"""
@@ -84,17 +64,23 @@ async def create_quote_whatsapp(
     await db.flush()  # Para obtener el ID
     
     # Agregar items
-    for item_data in quote_data.items:
-        quote_item = QuoteItem(
+    items = [
+        QuoteItem(
             quote_id=quote.id,
             product_id=item_data.product_id,
             product_code=item_data.product_code,
             product_name=item_data.product_name,
             quantity=item_data.quantity,
         )
-        db.add(quote_item)
+        for item_data in quote_data.items
+    ]
+    db.add_all(items)
+    # Emails (con la tabla de productos) al outbox en la misma transacción
+    email_service.queue_quote_emails(db, quote, items)
     
     await db.commit()
+    email_outbox.notify()
+    dashboard_stats.invalidate()
     
     # Recargar con items
     result = await db.execute(
@@ -109,7 +95,7 @@ async def create_quote_whatsapp(
 
 @router.get("/my-quotes", response_model=list[QuoteResponse])
 async def get_my_quotes(
-    current_user: User = Depends(get_optional_user),
+    current_user: Principal = Depends(get_optional_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get current user's quotes"""
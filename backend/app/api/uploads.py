@@ -2,20 +2,33 @@
 Endpoint para subir imágenes de productos
 - En producción: usa Cloudinary (almacenamiento en la nube)
 - En desarrollo: usa sistema de archivos local
+- POST /uploads/images sube muchas imágenes en paralelo (resultado por archivo)
+- Los archivos se reciben en streaming (ver services/image_ingest.py): el
+  tamaño se controla mientras llegan y nunca se cargan enteros en memoria
+- Se guardan por su SHA-256 (ver services/image_store.py): la misma foto
+  subida dos veces no se vuelve a escribir ni a subir
 """
-import os
-import uuid
+import asyncio
+from contextlib import aclosing
 from pathlib import Path
-from datetime import datetime
-from fastapi import APIRouter, UploadFile, File, HTTPException, status, Depends
+from fastapi import APIRouter, Request, HTTPException, status, Depends
+from fastapi.responses import FileResponse, RedirectResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db
 from app.utils.dependencies import get_admin_user
-from app.models.user import User
+from app.services.user_cache import Principal
 from app.config import settings
+from app.services.cloudinary_service import cloudinary_service, CloudinaryError
+from app.services.image_ingest import image_ingest, IngestedImage
+from app.services.image_store import image_store, StoredImage, UPLOAD_DIR, LOCAL
+from app.services.image_variants import image_variants, FORMATS
+from app.utils.image_urls import PRESETS, blob_key
 
 router = APIRouter(prefix="/uploads", tags=["Uploads"])
 
-# Directorio local para desarrollo
-UPLOAD_DIR = Path("uploads/products")
+# Variantes de las imágenes locales: se incluye en la app (sin /api) antes del
+# mount de StaticFiles en /uploads
+variants_router = APIRouter(prefix="/uploads/variants", tags=["Uploads"])
 
 # Extensiones permitidas
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
@@ -23,114 +36,94 @@ ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
 # Tamaño máximo: 5MB
 MAX_FILE_SIZE = 5 * 1024 * 1024
 
+# Las variantes no cambian nunca para un mismo nombre de archivo
+VARIANT_CACHE_HEADERS = {"Cache-Control": "public, max-age=31536000, immutable"}
+
 
 def is_cloudinary_configured():
     """Verifica si Cloudinary está configurado"""
-    import os
-    # Intentar desde settings primero, luego desde os.environ como fallback
-    cloud_name = settings.CLOUDINARY_CLOUD_NAME or os.getenv('CLOUDINARY_CLOUD_NAME', '')
-    api_key = settings.CLOUDINARY_API_KEY or os.getenv('CLOUDINARY_API_KEY', '')
-    api_secret = settings.CLOUDINARY_API_SECRET or os.getenv('CLOUDINARY_API_SECRET', '')
-    
-    is_configured = bool(cloud_name and api_key and api_secret)
-    print(f"[Cloudinary] Configured: {is_configured}, Cloud: {cloud_name[:4] if cloud_name else 'N/A'}...")
-    return is_configured
+    return cloudinary_service.configured
 
 
-def get_cloudinary():
-    """Configura y retorna cloudinary"""
-    import cloudinary
-    import cloudinary.uploader
-    
-    cloudinary.config(
-        cloud_name=settings.CLOUDINARY_CLOUD_NAME,
-        api_key=settings.CLOUDINARY_API_KEY,
-        api_secret=settings.CLOUDINARY_API_SECRET,
-        secure=True
-    )
-    return cloudinary.uploader
+def validate_image(image: IngestedImage) -> None:
+    """Valida extensión, content type y lo detectado al recibir el archivo"""
+    # Validar que sea un archivo
+    if not image.filename:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No se proporciono ningun archivo"
+        )
 
+    # Validar extensión
+    file_ext = Path(image.filename).suffix.lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Tipo de archivo no permitido. Use: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
 
-def get_upload_dir():
-    """Asegura que el directorio de uploads exista (solo para desarrollo local)"""
-    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-    return UPLOAD_DIR
+    # Validar content type
+    if image.content_type and not image.content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El archivo debe ser una imagen"
+        )
 
+    # Tamaño y magic bytes (verificados mientras llegaba)
+    if image.error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=image.error
+        )
 
-async def upload_to_cloudinary(file_contents: bytes, filename: str) -> str:
-    """Sube una imagen a Cloudinary y retorna la URL"""
-    import os
-    import cloudinary.uploader
-    
-    # Configurar Cloudinary - usar os.environ como fallback
-    import cloudinary
-    cloud_name = settings.CLOUDINARY_CLOUD_NAME or os.getenv('CLOUDINARY_CLOUD_NAME', '')
-    api_key = settings.CLOUDINARY_API_KEY or os.getenv('CLOUDINARY_API_KEY', '')
-    api_secret = settings.CLOUDINARY_API_SECRET or os.getenv('CLOUDINARY_API_SECRET', '')
-    
-    print(f"[Cloudinary Upload] Using cloud: {cloud_name}")
-    
-    cloudinary.config(
-        cloud_name=cloud_name,
-        api_key=api_key,
-        api_secret=api_secret,
-        secure=True
-    )
-    
-    # Generar un ID único para el archivo
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_id = uuid.uuid4().hex[:8]
-    public_id = f"maldonado/products/{timestamp}_{unique_id}"
-    
+
+async def store_image(image: IngestedImage) -> StoredImage:
+    """
+    Valida y guarda una imagen recibida según el entorno (Cloudinary o
+    local). Si ya se subió una imagen con el mismo contenido, se reutiliza.
+    """
     try:
-        # Subir a Cloudinary
-        result = cloudinary.uploader.upload(
-            file_contents,
-            public_id=public_id,
-            folder="maldonado/products",
-            resource_type="image",
-            overwrite=True,
-            transformation=[
-                {"quality": "auto:good"},
-                {"fetch_format": "auto"}
-            ]
-        )
-        return result["secure_url"]
-    except Exception as e:
+        validate_image(image)
+        return await image_store.store(image)
+    except CloudinaryError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al subir imagen a Cloudinary: {str(e)}"
         )
-
-
-async def upload_to_local(file_contents: bytes, file_ext: str) -> str:
-    """Sube una imagen al sistema de archivos local"""
-    # Generar nombre único para el archivo
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_id = uuid.uuid4().hex[:8]
-    safe_filename = f"{timestamp}_{unique_id}{file_ext}"
-    
-    # Guardar el archivo
-    upload_dir = get_upload_dir()
-    file_path = upload_dir / safe_filename
-    
-    try:
-        with open(file_path, "wb") as f:
-            f.write(file_contents)
-    except Exception as e:
+    except OSError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al guardar el archivo: {str(e)}"
         )
-    
-    # Devolver la URL relativa (se concatenará con el backend URL en el frontend)
-    return f"/uploads/products/{safe_filename}"
+    finally:
+        await image.adiscard()
 
 
-@router.post("/image")
+def _multipart_body(field: str, multiple: bool) -> dict:
+    """Documenta en OpenAPI el formulario que los endpoints leen en streaming"""
+    file_schema = {"type": "string", "format": "binary"}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": [field],
+                        "properties": {
+                            field: {"type": "array", "items": file_schema} if multiple else file_schema
+                        },
+                    }
+                }
+            },
+        }
+    }
+
+
+@router.post("/image", openapi_extra=_multipart_body("file", multiple=False))
 async def upload_image(
-    file: UploadFile = File(...),
-    admin: User = Depends(get_admin_user)
+    request: Request,
+    admin: Principal = Depends(get_admin_user)
 ):
     """
     Subir una imagen de producto.
@@ -142,61 +135,103 @@ async def upload_image(
     Returns:
         dict: URL de la imagen subida
     """
-    # Validar que sea un archivo
-    if not file.filename:
+    stored = None
+    async with aclosing(image_ingest.stream(request, {"file"}, 1, MAX_FILE_SIZE)) as images:
+        async for image in images:
+            stored = await store_image(image)
+
+    if stored is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No se proporciono ningun archivo"
         )
-    
-    # Validar extensión
-    file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in ALLOWED_EXTENSIONS:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Tipo de archivo no permitido. Use: {', '.join(ALLOWED_EXTENSIONS)}"
-        )
-    
-    # Validar content type
-    if file.content_type and not file.content_type.startswith("image/"):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="El archivo debe ser una imagen"
-        )
-    
-    # Leer contenido y validar tamaño
-    contents = await file.read()
-    if len(contents) > MAX_FILE_SIZE:
+
+    return {
+        "success": True,
+        "image_url": stored.url,
+        "storage": stored.storage,
+        "deduplicated": stored.deduplicated
+    }
+
+
+@router.post("/images", openapi_extra=_multipart_body("files", multiple=True))
+async def upload_images(
+    request: Request,
+    admin: Principal = Depends(get_admin_user)
+):
+    """
+    Subir varias imágenes de producto en un solo request (p. ej. las fotos
+    de un envío nuevo). Cada archivo empieza a subirse apenas termina de
+    llegar, hasta UPLOAD_CONCURRENCY a la vez; un archivo inválido o que
+    falla no corta el resto.
+
+    Requiere autenticación de administrador.
+
+    Returns:
+        dict: resultado por archivo, en el mismo orden en que se enviaron
+    """
+    slots = asyncio.Semaphore(settings.UPLOAD_CONCURRENCY)
+
+    async def upload_one(image: IngestedImage) -> dict:
+        async with slots:
+            try:
+                stored = await store_image(image)
+            except HTTPException as e:
+                return {"filename": image.filename, "success": False, "error": e.detail}
+            except Exception as e:
+                print(f"[Uploads] Error subiendo {image.filename}: {e!r}")
+                return {"filename": image.filename, "success": False, "error": "Error al subir la imagen"}
+            return {
+                "filename": image.filename,
+                "success": True,
+                "image_url": stored.url,
+                "storage": stored.storage,
+                "deduplicated": stored.deduplicated
+            }
+
+    images: list[IngestedImage] = []
+    tasks: list[asyncio.Task] = []
+    try:
+        async for image in image_ingest.stream(request, {"files"}, settings.UPLOAD_MAX_FILES, MAX_FILE_SIZE):
+            images.append(image)
+            tasks.append(asyncio.create_task(upload_one(image)))
+    except BaseException:
+        # Request inválido o cortado: no seguir subiendo. Una tarea cancelada
+        # antes de arrancar no llega a borrar su temporal: se borran acá
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.gather(*(image.adiscard() for image in images))
+        raise
+
+    if not tasks:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"El archivo es demasiado grande. Maximo: {MAX_FILE_SIZE // (1024 * 1024)}MB"
+            detail="No se proporciono ningun archivo"
         )
-    
-    # Subir según el entorno
-    if is_cloudinary_configured():
-        # Producción: usar Cloudinary
-        image_url = await upload_to_cloudinary(contents, file.filename)
-        storage_type = "cloudinary"
-    else:
-        # Desarrollo: usar sistema local
-        image_url = await upload_to_local(contents, file_ext)
-        storage_type = "local"
-    
+
+    results = await asyncio.gather(*tasks)
+    uploaded = sum(1 for result in results if result["success"])
+
     return {
-        "success": True,
-        "image_url": image_url,
-        "storage": storage_type
+        "success": uploaded == len(results),
+        "uploaded": uploaded,
+        "failed": len(results) - uploaded,
+        "results": results
     }
 
 
 @router.delete("/image/{filename}")
 async def delete_image(
     filename: str,
-    admin: User = Depends(get_admin_user)
+    admin: Principal = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Eliminar una imagen subida (solo funciona para archivos locales).
     Para Cloudinary, las imágenes se gestionan desde el dashboard.
+    No se puede eliminar una imagen que todavía usa un producto, banner o
+    categoría (la misma foto puede estar compartida por varios).
     """
     # Prevenir path traversal
     if ".." in filename or "/" in filename or "\\" in filename:
@@ -213,6 +248,13 @@ async def delete_image(
             detail="Archivo no encontrado"
         )
     
+    references = await image_store.references(db, f"/uploads/products/{filename}")
+    if references:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"La imagen esta en uso ({references} referencias). Quitela de los productos antes de eliminarla"
+        )
+    
     try:
         file_path.unlink()
     except Exception as e:
@@ -221,4 +263,42 @@ async def delete_image(
             detail=f"Error al eliminar el archivo: {str(e)}"
         )
     
+    digest = blob_key(filename)
+    if digest:
+        await image_store.forget(db, LOCAL, digest)
+        await db.commit()
+    
     return {"success": True, "message": "Imagen eliminada"}
+
+
+@variants_router.get("/{preset}/{filename}")
+async def get_image_variant(preset: str, filename: str):
+    """
+    Versión reducida de una imagen local (thumb, card o detail; .webp o .jpg).
+    Se genera la primera vez que se pide y después se sirve desde la cache.
+    """
+    stem, _, fmt = filename.rpartition(".")
+    if preset not in PRESETS or fmt not in FORMATS or not stem or not stem.replace("_", "").replace("-", "").isalnum():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Imagen no encontrada"
+        )
+
+    source = next(
+        (UPLOAD_DIR / f"{stem}{ext}" for ext in ALLOWED_EXTENSIONS if (UPLOAD_DIR / f"{stem}{ext}").is_file()),
+        None
+    )
+    if source is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Imagen no encontrada"
+        )
+
+    try:
+        path = await image_variants.get(source, preset, fmt)
+    except Exception as e:
+        # Imagen que Pillow no puede procesar: servir el original
+        print(f"[ImageVariants] Error generando {preset}/{filename}: {e!r}")
+        return RedirectResponse(f"/uploads/products/{source.name}")
+
+    return FileResponse(path, media_type=FORMATS[fmt][1], headers=VARIANT_CACHE_HEADERS)
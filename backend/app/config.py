@@ -31,9 +31,25 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "dev-secret-key-change-in-production-use-64-chars"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440  # 24 hours
+
+    # Passwords: costo de bcrypt (al subirlo, los hashes se actualizan en el login)
+    # y hashing fuera del event loop con concurrencia y espera máximas
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_TIMEOUT: float = 5.0
     
     # MercadoPago
     MERCADOPAGO_ACCESS_TOKEN: str = ""
+    MERCADOPAGO_API_URL: str = "https://api.mercadopago.com"  # Apuntar a fake_mercadopago.py en desarrollo
+    MERCADOPAGO_TIMEOUT_SECONDS: float = 10.0
+    MERCADOPAGO_MAX_RETRIES: int = 3
+
+    # Inbox de webhooks de pago: workers por proceso, reintentos y lease de cada fila
+    PAYMENT_WEBHOOK_WORKERS: int = 2
+    PAYMENT_WEBHOOK_MAX_ATTEMPTS: int = 8
+    PAYMENT_WEBHOOK_RETRY_SECONDS: float = 5.0
+    PAYMENT_WEBHOOK_RETRY_MAX_SECONDS: float = 600.0
+    PAYMENT_WEBHOOK_LEASE_SECONDS: float = 120.0
     
     # Email
     SMTP_HOST: str = "smtp.gmail.com"
@@ -41,6 +57,17 @@ class Settings(BaseSettings):
     SMTP_USER: str = ""
     SMTP_PASSWORD: str = ""
     NOTIFICATION_EMAIL: str = "repuestos@maldonadosaci.com"
+    SMTP_STARTTLS: bool = True  # False para un servidor local de pruebas (fake_smtp.py)
+    SMTP_TIMEOUT_SECONDS: float = 30.0
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = 100
+
+    # Outbox de emails: workers por proceso (una conexión SMTP cada uno), lote y reintentos
+    EMAIL_OUTBOX_WORKERS: int = 1
+    EMAIL_OUTBOX_BATCH_SIZE: int = 20
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 6
+    EMAIL_OUTBOX_RETRY_SECONDS: float = 30.0
+    EMAIL_OUTBOX_RETRY_MAX_SECONDS: float = 3600.0
+    EMAIL_OUTBOX_LEASE_SECONDS: float = 300.0
     
     # Railway Database (solo para backups, no usado por la app)
     RAILWAY_DATABASE_URL: str = ""
@@ -53,6 +80,50 @@ class Settings(BaseSettings):
     CLOUDINARY_CLOUD_NAME: str = ""
     CLOUDINARY_API_KEY: str = ""
     CLOUDINARY_API_SECRET: str = ""
+    CLOUDINARY_API_URL: str = "https://api.cloudinary.com"  # Apuntar a fake_cloudinary.py en desarrollo
+    CLOUDINARY_TIMEOUT_SECONDS: float = 60.0
+    CLOUDINARY_MAX_RETRIES: int = 2
+
+    # Subidas de imágenes: subidas simultáneas al proveedor (por proceso y por request)
+    # y máximo de archivos en POST /uploads/images
+    UPLOAD_CONCURRENCY: int = 8
+    UPLOAD_MAX_FILES: int = 500
+
+    # Variantes reducidas de las imágenes locales: procesos del pool (0 = la mitad
+    # de los CPUs) y si se generan apenas se sube la imagen
+    IMAGE_VARIANT_WORKERS: int = 0
+    IMAGE_VARIANTS_EAGER: bool = True
+
+    # GC de imágenes huérfanas: cada cuántas horas corre (0 = solo a pedido), edad
+    # mínima para borrar una imagen sin referencias y lotes de borrado simultáneos
+    IMAGE_GC_INTERVAL_HOURS: float = 24.0
+    IMAGE_GC_MIN_AGE_HOURS: float = 48.0
+    IMAGE_GC_CONCURRENCY: int = 4
+
+    # Índice de códigos en memoria: cada cuántos segundos se verifica si cambió products
+    CODE_INDEX_REFRESH_SECONDS: int = 30
+
+    # Cache de totales de listados de productos (por conjunto de filtros)
+    PRODUCT_COUNT_CACHE_SECONDS: int = 60
+
+    # Cache de respuestas del catálogo público
+    # Vacío = en memoria por worker; redis://... = compartida (requiere el paquete redis).
+    # En memoria, un cambio del admin solo invalida la cache del worker que lo atendió:
+    # los demás (el Dockerfile arranca 4) sirven la versión anterior hasta que vence
+    # (60 s productos y banners, 300 s categorías). Con Redis se ve en todos al instante.
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_URL: str = ""
+    RESPONSE_CACHE_MAX_ENTRIES: int = 2048
+
+    # Snapshot de las estadísticas del dashboard, por worker (0 = calcular en cada request).
+    # Los otros workers ven las escrituras a más tardar en este tiempo
+    DASHBOARD_STATS_CACHE_SECONDS: int = 30
+
+    # Cache de usuarios autenticados (evita el SELECT de users por request)
+    USER_CACHE_SECONDS: int = 30
+
+    # Cache del resumen del carrito (badge del navbar)
+    CART_SUMMARY_CACHE_SECONDS: int = 15
 
     class Config:
         env_file = ".env"
@@ -16,19 +16,26 @@ database_url = settings.get_database_url()
 # Railway Hobby: pool_size=5 por worker = 20 total, max_overflow=10 por worker = 40 total
 IS_PRODUCTION = os.getenv("RAILWAY_ENVIRONMENT") is not None
 
+# SQLite (desarrollo) no usa QueuePool: los parametros de pool solo aplican a PostgreSQL
+IS_SQLITE = database_url.startswith("sqlite")
+
+pool_options = {} if IS_SQLITE else {
+    "pool_pre_ping": True,       # Verifica conexiones antes de usarlas (evita errores)
+    "pool_size": 5 if IS_PRODUCTION else 10,         # Conexiones por worker
+    "max_overflow": 10 if IS_PRODUCTION else 20,     # Conexiones extras por worker
+    "pool_recycle": 1800,        # Reciclar conexiones cada 30 min (Railway puede cerrarlas)
+    "pool_timeout": 30,          # Timeout para obtener conexion del pool
+}
+
 # Create async engine - optimizado para produccion con multiples workers
 engine = create_async_engine(
     database_url,
     echo=settings.DEBUG,
     future=True,
-    pool_pre_ping=True,       # Verifica conexiones antes de usarlas (evita errores)
-    pool_size=5 if IS_PRODUCTION else 10,         # Conexiones por worker
-    max_overflow=10 if IS_PRODUCTION else 20,     # Conexiones extras por worker
-    pool_recycle=1800,        # Reciclar conexiones cada 30 min (Railway puede cerrarlas)
-    pool_timeout=30,          # Timeout para obtener conexion del pool
     connect_args={
         "command_timeout": 60,  # Timeout para queries (evita queries colgados)
     } if "postgresql" in database_url else {},
+    **pool_options,
 )
 
 # Create async session factory
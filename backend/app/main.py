@@ -10,8 +10,18 @@ from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from app.config import settings
 from sqlalchemy import text
-from app.database import create_tables
+from app.database import create_tables, engine, AsyncSessionLocal
+from app.services.search import product_search
+from app.services.code_index import code_index
+from app.services.mercadopago import mercadopago_service
+from app.services.cloudinary_service import cloudinary_service
+from app.services.image_ingest import image_ingest
+from app.services.image_variants import image_variants
+from app.services.image_gc import image_gc
+from app.services.payment_inbox import payment_inbox
+from app.services.email_outbox import email_outbox
 from app.api import api_router
+from app.api.uploads import variants_router
 import traceback
 
 
@@ -50,6 +60,8 @@ async def lifespan(app: FastAPI):
             try:
                 print(f"[Startup] Conectando a DB (intento {attempt + 1}/{max_retries})...")
                 await create_tables()
+                async with engine.begin() as conn:
+                    await product_search.ensure_schema(conn)
                 print("[Startup] OK - Conexion a DB exitosa y tablas verificadas!")
                 break
             except Exception as e:
@@ -64,14 +76,36 @@ async def lifespan(app: FastAPI):
     else:
         print("[Startup] Saltando create_tables (producción con datos migrados)")
         # Solo verificamos conexión sin crear tablas
-        from app.database import engine
         async with engine.connect() as conn:
             await conn.execute(text("SELECT 1"))
         print("[Startup] OK - Conexion a DB verificada!")
 
+    # Índice de códigos en memoria (autocompletado y primera etapa de la búsqueda)
+    async with AsyncSessionLocal() as session:
+        await code_index.ensure_fresh(session)
+    print(f"[Startup] Índice de códigos: {len(code_index)} productos")
+
+    # Temporales de uploads que quedaron de un proceso anterior
+    removed = image_ingest.purge_stale()
+    if removed:
+        print(f"[Startup] {removed} temporales de uploads eliminados")
+
+    # Workers del inbox de webhooks de pago
+    await payment_inbox.start()
+    # Worker del outbox de emails (solo si SMTP está configurado)
+    await email_outbox.start()
+    # GC periódico de imágenes huérfanas
+    await image_gc.start()
+
     yield
     # Shutdown: cleanup if needed
     print("[Shutdown] Aplicación cerrándose...")
+    await payment_inbox.stop()
+    await email_outbox.stop()
+    await image_gc.stop()
+    await mercadopago_service.aclose()
+    await cloudinary_service.aclose()
+    await image_variants.shutdown()
 
 
 app = FastAPI(
@@ -131,6 +165,9 @@ async def global_exception_handler(request: Request, exc: Exception):
 # Include API routes
 app.include_router(api_router, prefix="/api")
 
+# Variantes reducidas de las imágenes locales (antes del mount de /uploads)
+app.include_router(variants_router)
+
 # Configurar carpeta de uploads para servir imágenes estáticas
 uploads_dir = Path("uploads")
 uploads_dir.mkdir(exist_ok=True)
@@ -9,6 +9,10 @@ from app.models.cart import CartItem
 from app.models.order import Order, OrderItem
 from app.models.quote import Quote, QuoteItem
 from app.models.banner import Banner
+from app.models.payment_webhook import PaymentWebhook, WebhookStatus
+from app.models.email_outbox import OutboxEmail, EmailStatus
+from app.models.image_blob import ImageBlob
+from app.models.job_lease import JobLease
 
 __all__ = [
     "User",
@@ -21,5 +25,11 @@ __all__ = [
     "Quote",
     "QuoteItem",
     "Banner",
+    "PaymentWebhook",
+    "WebhookStatus",
+    "OutboxEmail",
+    "EmailStatus",
+    "ImageBlob",
+    "JobLease",
 ]
 
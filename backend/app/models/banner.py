@@ -5,9 +5,10 @@ from datetime import datetime
 from sqlalchemy import String, Text, Boolean, Integer, DateTime
 from sqlalchemy.orm import Mapped, mapped_column
 from app.database import Base
+from app.models.image_ref import ImageRefMixin
 
 
-class Banner(Base):
+class Banner(ImageRefMixin, Base):
     __tablename__ = "banners"
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
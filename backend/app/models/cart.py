@@ -2,13 +2,17 @@
 Cart Model
 """
 from datetime import datetime
-from sqlalchemy import DateTime, ForeignKey, Integer
+from sqlalchemy import DateTime, ForeignKey, Integer, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 
 
 class CartItem(Base):
     __tablename__ = "cart_items"
+    __table_args__ = (
+        # Una línea por producto: los agregados hacen upsert sobre (user_id, product_id)
+        UniqueConstraint('user_id', 'product_id', name='uq_cart_items_user_product'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
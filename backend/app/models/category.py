@@ -5,9 +5,10 @@ from datetime import datetime
 from sqlalchemy import String, Text, DateTime
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
+from app.models.image_ref import ImageRefMixin
 
 
-class Category(Base):
+class Category(ImageRefMixin, Base):
     __tablename__ = "categories"
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
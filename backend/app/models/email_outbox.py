@@ -0,0 +1,48 @@
+"""
+Email Outbox Model
+Emails pendientes de envío: se guardan en la misma transacción que los genera
+y los envía el worker de services/email_outbox.py
+"""
+from datetime import datetime
+from enum import Enum
+from sqlalchemy import String, Text, Integer, DateTime, Enum as SQLEnum, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class EmailStatus(str, Enum):
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class OutboxEmail(Base):
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # Cola del worker: próximos emails listos para enviar
+        Index('ix_email_outbox_queue', 'status', 'next_attempt_at'),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+
+    to_email: Mapped[str] = mapped_column(String(255), nullable=False)
+    subject: Mapped[str] = mapped_column(String(255), nullable=False)
+    html_content: Mapped[str] = mapped_column(Text, nullable=False)
+    text_content: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    status: Mapped[EmailStatus] = mapped_column(
+        SQLEnum(EmailStatus),
+        default=EmailStatus.PENDING,
+        nullable=False
+    )
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    # Para SENDING, next_attempt_at es el vencimiento del lease del worker
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<OutboxEmail {self.id} to={self.to_email} ({self.status.value})>"
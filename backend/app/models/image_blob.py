@@ -0,0 +1,35 @@
+"""
+Image Blob Model
+Imágenes guardadas por contenido: la clave es el SHA-256 de los bytes, así
+la misma foto subida varias veces se guarda (y se sube al proveedor) una vez.
+Las filas que la usan guardan el sha256 en image_sha256 (ver image_ref.py).
+"""
+from datetime import datetime
+from sqlalchemy import String, Integer, DateTime, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class ImageBlob(Base):
+    __tablename__ = "image_blobs"
+    __table_args__ = (
+        UniqueConstraint('sha256', 'storage', name='uq_image_blobs_sha256_storage'),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+    storage: Mapped[str] = mapped_column(String(20), nullable=False)  # local | cloudinary
+
+    # URL pública y, en Cloudinary, el public_id para poder borrarla
+    url: Mapped[str] = mapped_column(String(500), nullable=False)
+    public_id: Mapped[str | None] = mapped_column(String(200), nullable=True)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    ext: Mapped[str] = mapped_column(String(10), nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    # Última vez que una subida reutilizó el blob (el GC no borra blobs recién usados)
+    last_used_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<ImageBlob {self.sha256[:12]} ({self.storage})>"
@@ -0,0 +1,21 @@
+"""
+Image Reference Mixin
+Modelos con image_url (productos, imágenes de productos, banners y
+categorías): guardan además el sha256 de la imagen cuando es un blob
+direccionado por contenido (ver services/image_store.py), así las
+referencias a un blob se cuentan por igualdad sobre una columna indexada.
+"""
+from sqlalchemy import String
+from sqlalchemy.orm import Mapped, mapped_column, validates
+
+
+class ImageRefMixin:
+    # Se completa solo al asignar image_url (None para URLs que no son blobs)
+    image_sha256: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
+
+    @validates("image_url")
+    def _set_image_sha256(self, key: str, url: str | None) -> str | None:
+        # Import local: app.utils importa dependencias que cargan los modelos
+        from app.utils.image_urls import blob_key
+        self.image_sha256 = blob_key(url)
+        return url
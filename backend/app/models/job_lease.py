@@ -0,0 +1,22 @@
+"""
+Job Lease Model
+Una fila por tarea periódica: el worker que la toma (UPDATE condicional sobre
+locked_until) es el único que corre ese ciclo, aunque haya varios procesos
+"""
+from datetime import datetime
+from sqlalchemy import String, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class JobLease(Base):
+    __tablename__ = "job_leases"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    # Hasta cuándo la tiene el último worker que la tomó
+    locked_until: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    # Proceso que la tomó (pid), para diagnóstico
+    owner: Mapped[str | None] = mapped_column(String(100), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<JobLease {self.name} (hasta {self.locked_until})>"
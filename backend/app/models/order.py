@@ -4,7 +4,7 @@ Order Models
 from datetime import datetime
 from decimal import Decimal
 from enum import Enum
-from sqlalchemy import String, Text, DateTime, ForeignKey, Numeric, Integer, Enum as SQLEnum
+from sqlalchemy import String, Text, DateTime, ForeignKey, Numeric, Integer, Enum as SQLEnum, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 
@@ -21,6 +21,11 @@ class OrderStatus(str, Enum):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Listados del admin: orden por fecha (paginación por cursor) y filtro por estado
+        Index('ix_orders_created', 'created_at', 'id'),
+        Index('ix_orders_status_created', 'status', 'created_at', 'id'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
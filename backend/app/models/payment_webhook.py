@@ -0,0 +1,47 @@
+"""
+Payment Webhook Inbox Model
+Notificaciones de MercadoPago recibidas y pendientes de procesar (una fila por pago)
+"""
+from datetime import datetime
+from enum import Enum
+from sqlalchemy import String, Text, Integer, DateTime, Enum as SQLEnum, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class WebhookStatus(str, Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class PaymentWebhook(Base):
+    __tablename__ = "payment_webhooks"
+    __table_args__ = (
+        # Cola de los workers: próximas filas listas para procesar
+        Index('ix_payment_webhooks_queue', 'status', 'next_attempt_at'),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+
+    # Notificaciones repetidas del mismo pago se agrupan en una sola fila
+    payment_id: Mapped[str] = mapped_column(String(100), unique=True, nullable=False)
+    payload: Mapped[str | None] = mapped_column(Text, nullable=True)
+    notifications: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
+
+    status: Mapped[WebhookStatus] = mapped_column(
+        SQLEnum(WebhookStatus),
+        default=WebhookStatus.PENDING,
+        nullable=False
+    )
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    # Para PROCESSING, next_attempt_at es el vencimiento del lease del worker
+    received_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    processed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<PaymentWebhook {self.payment_id} ({self.status.value})>"
@@ -7,9 +7,10 @@ from decimal import Decimal
 from sqlalchemy import String, Text, DateTime, ForeignKey, Numeric, Integer, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
+from app.models.image_ref import ImageRefMixin
 
 
-class Product(Base):
+class Product(ImageRefMixin, Base):
     __tablename__ = "products"
     __table_args__ = (
         # Índices compuestos para búsquedas frecuentes
@@ -2,13 +2,18 @@
 Product Image Model - Para múltiples imágenes por producto
 """
 from datetime import datetime
-from sqlalchemy import String, Integer, DateTime, ForeignKey, Boolean
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
+from app.models.image_ref import ImageRefMixin
 
 
-class ProductImage(Base):
+class ProductImage(ImageRefMixin, Base):
     __tablename__ = "product_images"
+    __table_args__ = (
+        # Imágenes de un producto en orden (selectinload e imagen principal de las cards)
+        Index('ix_product_images_product', 'product_id', 'display_order'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     product_id: Mapped[int] = mapped_column(ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
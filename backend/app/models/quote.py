@@ -3,7 +3,7 @@ Quote Model (Cotizaciones)
 """
 from datetime import datetime
 from enum import Enum
-from sqlalchemy import String, Text, DateTime, Integer, ForeignKey, Enum as SQLEnum
+from sqlalchemy import String, Text, DateTime, Integer, ForeignKey, Enum as SQLEnum, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 
@@ -17,6 +17,11 @@ class QuoteStatus(str, Enum):
 
 class Quote(Base):
     __tablename__ = "quotes"
+    __table_args__ = (
+        # Listados del admin: orden por fecha (paginación por cursor) y filtro por estado
+        Index('ix_quotes_created', 'created_at', 'id'),
+        Index('ix_quotes_status_created', 'status', 'created_at', 'id'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id"), nullable=True)
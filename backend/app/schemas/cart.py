@@ -11,6 +11,11 @@ class CartItemCreate(BaseModel):
     quantity: int = Field(1, ge=1)
 
 
+class CartBulkAdd(BaseModel):
+    # Se suman a las cantidades ya presentes (como /add); productos repetidos se agrupan
+    items: list[CartItemCreate] = Field(..., min_length=1, max_length=100)
+
+
 class CartItemUpdate(BaseModel):
     quantity: int = Field(..., ge=1)
 
@@ -42,6 +47,14 @@ class CartItemResponse(BaseModel):
         from_attributes = True
 
 
+class CartSummary(BaseModel):
+    items_count: int  # líneas
+    total_quantity: int  # unidades
+    subtotal: Decimal
+    shipping_estimate: Decimal
+    total: Decimal
+
+
 class CartResponse(BaseModel):
     items: list[CartItemResponse]
     items_count: int
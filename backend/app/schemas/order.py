@@ -66,6 +66,7 @@ class OrderListResponse(BaseModel):
     total: int
     page: int
     page_size: int
+    next_cursor: str | None = None  # Solo en modo cursor (?cursor=)
 
 
 class OrderStatusUpdate(BaseModel):
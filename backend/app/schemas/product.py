@@ -3,7 +3,8 @@ Product Schemas
 """
 from datetime import datetime
 from decimal import Decimal
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
+from app.utils.image_urls import variant_urls
 
 
 # === Product Image Schemas ===
@@ -24,6 +25,12 @@ class ProductImageResponse(ProductImageBase):
     product_id: int
     created_at: datetime
 
+    # Versiones reducidas (thumb, card, detail) para imágenes locales o de Cloudinary
+    @computed_field
+    @property
+    def variants(self) -> dict[str, str] | None:
+        return variant_urls(self.image_url)
+
     class Config:
         from_attributes = True
 
@@ -105,8 +112,60 @@ class ProductResponse(BaseModel):
 
 class ProductListResponse(BaseModel):
     items: list[ProductResponse]
-    total: int
+    total: int | None  # None con ?count=false
+    total_mode: str = "exact"  # exact | estimate | none
+    page: int
+    page_size: int
+    total_pages: int | None
+    next_cursor: str | None = None  # Solo en modo cursor (?cursor=)
+
+
+class ProductCard(BaseModel):
+    """Versión liviana para la grilla del catálogo (?fields=card)"""
+    id: int
+    category_id: int
+    name: str
+    code: str
+    brand: str
+    price: Decimal
+    original_price: Decimal | None
+    stock: int
+    image_url: str | None  # Imagen legacy o, si no hay, la principal de product_images
+    is_featured: bool
+    is_new: bool
+    is_on_promotion: bool
+    rating: Decimal
+
+    # Mismo cálculo que las propiedades del modelo Product
+    @computed_field
+    @property
+    def in_stock(self) -> bool:
+        return self.stock > 0
+
+    @computed_field
+    @property
+    def discount_percent(self) -> int | None:
+        if self.original_price and self.original_price > self.price:
+            return int((1 - self.price / self.original_price) * 100)
+        return None
+
+    class Config:
+        from_attributes = True
+
+
+class ProductCardListResponse(BaseModel):
+    items: list[ProductCard]
+    total: int | None
+    total_mode: str = "exact"
     page: int
     page_size: int
-    total_pages: int
+    total_pages: int | None
+    next_cursor: str | None = None
+
 
+class CodeSuggestion(BaseModel):
+    """Sugerencia del índice de códigos (autocompletado por código de pieza)"""
+    id: int
+    code: str
+    name: str
+    match: str  # exact | prefix | infix | fuzzy
@@ -78,4 +78,5 @@ class QuoteListResponse(BaseModel):
     total: int
     page: int
     page_size: int
+    next_cursor: str | None = None  # Solo en modo cursor (?cursor=)
 
@@ -0,0 +1,71 @@
+"""
+Cart Summary Service
+Totales del carrito (líneas, unidades, subtotal, envío) calculados con un
+solo SELECT agregado, sin cargar CartItem ni Product, y cacheados por
+usuario para el badge del navbar.
+
+Las mutaciones del carrito (y la creación de pedidos, que lo vacía)
+invalidan la entrada del usuario en el worker que las atiende;
+CART_SUMMARY_CACHE_SECONDS acota el desfase en los demás workers y ante
+cambios de precio.
+"""
+from decimal import Decimal
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models.cart import CartItem
+from app.models.product import Product
+from app.utils.cache import TTLCache
+
+
+# Simple shipping estimate (free over 100,000 ARS)
+FREE_SHIPPING_FROM = Decimal("100000")
+SHIPPING_ESTIMATE = Decimal("5000.00")
+
+
+def shipping_estimate(subtotal: Decimal) -> Decimal:
+    return Decimal("0.00") if subtotal >= FREE_SHIPPING_FROM else SHIPPING_ESTIMATE
+
+
+class CartSummaryService:
+    """user_id -> totales del carrito"""
+
+    def __init__(self, ttl: int, maxsize: int = 4096):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def invalidate(self, user_id: int) -> None:
+        """Llamar después de modificar el carrito del usuario"""
+        self._cache.delete(user_id)
+
+    async def get(self, db: AsyncSession, user_id: int) -> dict:
+        summary = self._cache.get(user_id)
+        if summary is None:
+            summary = await self._query(db, user_id)
+            self._cache.set(user_id, summary)
+        return summary
+
+    async def _query(self, db: AsyncSession, user_id: int) -> dict:
+        result = await db.execute(
+            select(
+                func.count(CartItem.id),
+                func.coalesce(func.sum(CartItem.quantity), 0),
+                func.coalesce(func.sum(Product.price * CartItem.quantity), 0),
+            )
+            .join(Product, Product.id == CartItem.product_id)
+            .where(CartItem.user_id == user_id)
+        )
+        items_count, total_quantity, subtotal = result.one()
+        # SQLite devuelve float en sum() de Numeric: normalizar a 2 decimales
+        subtotal = Decimal(str(subtotal)).quantize(Decimal("0.01"))
+        shipping = shipping_estimate(subtotal)
+        return {
+            "items_count": items_count,
+            "total_quantity": total_quantity,
+            "subtotal": subtotal,
+            "shipping_estimate": shipping,
+            "total": subtotal + shipping,
+        }
+
+
+# Instancia singleton (una cache por worker)
+cart_summary = CartSummaryService(ttl=settings.CART_SUMMARY_CACHE_SECONDS)
@@ -1,42 +1,183 @@
 """
 Cloudinary Image Upload Service
-Maneja la subida, eliminación y gestión de imágenes en Cloudinary
+Maneja la subida, eliminación y gestión de imágenes en Cloudinary.
+
+Las llamadas a la Upload API van por un cliente async (httpx) con un pool de
+conexiones compartido por worker; el SDK se usa solo para firmar los
+parámetros y armar URLs. Antes cloudinary.uploader.upload() (sincrónico)
+bloqueaba el event loop durante toda la subida. Un semáforo limita las
+subidas simultáneas por proceso (UPLOAD_CONCURRENCY).
+
+El listado y el borrado masivo usan la Admin API (basic auth): hasta 100
+public_ids por request de borrado.
+
+CLOUDINARY_API_URL permite apuntar a un servidor falso local
+(ver fake_cloudinary.py).
 """
+import asyncio
+import random
 import cloudinary
-import cloudinary.uploader
-import cloudinary.api
+import cloudinary.utils
+import httpx
 from fastapi import UploadFile, HTTPException
 from app.config import settings
-from typing import Dict, Optional
-import os
+from typing import AsyncIterator, BinaryIO, Dict, Optional
+
+
+class CloudinaryError(Exception):
+    """Error de la API de Cloudinary"""
+
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
 
 
 class CloudinaryService:
     """Servicio para gestionar imágenes en Cloudinary"""
 
-    def __init__(self):
-        """Inicializa la configuración de Cloudinary"""
-        # Log para debug
-        cloud_name = settings.CLOUDINARY_CLOUD_NAME
-        api_key = settings.CLOUDINARY_API_KEY
-        api_secret = settings.CLOUDINARY_API_SECRET
-
-        is_configured = bool(cloud_name and api_key and api_secret)
+    # Respuestas que vale la pena reintentar (además de timeouts y errores de red)
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
 
-        print(f"[Cloudinary] Configured: {is_configured}, Cloud: {cloud_name or 'N/A'}...")
+    # Límites de la Admin API: public_ids por DELETE y recursos por página del listado
+    DELETE_BATCH_SIZE = 100
+    LIST_PAGE_SIZE = 500
 
-        if not is_configured:
+    def __init__(
+        self,
+        cloud_name: str,
+        api_key: str,
+        api_secret: str,
+        api_url: str,
+        timeout: float,
+        max_retries: int,
+        concurrency: int,
+    ):
+        """Inicializa la configuración de Cloudinary"""
+        self.cloud_name = cloud_name
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.api_url = api_url.rstrip("/")
+        self.timeout = httpx.Timeout(timeout, connect=min(timeout, 10.0))
+        self.max_retries = max_retries
+        self.concurrency = max(1, concurrency)
+        self._client: httpx.AsyncClient | None = None
+        self._slots = asyncio.Semaphore(self.concurrency)
+
+        print(f"[Cloudinary] Configured: {self.configured}, Cloud: {cloud_name or 'N/A'}...")
+
+        if not self.configured:
             print("[Cloudinary] WARNING: Credenciales no configuradas. Upload de imágenes no funcionará.")
             print(f"[Cloudinary] CLOUD_NAME presente: {bool(cloud_name)}")
             print(f"[Cloudinary] API_KEY presente: {bool(api_key)}")
             print(f"[Cloudinary] API_SECRET presente: {bool(api_secret)}")
 
+        # El SDK firma los requests y arma las URLs de entrega
         cloudinary.config(
             cloud_name=cloud_name,
             api_key=api_key,
-            api_secret=api_secret
+            api_secret=api_secret,
+            secure=True
         )
 
+    @property
+    def configured(self) -> bool:
+        return bool(self.cloud_name and self.api_key and self.api_secret)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Cliente compartido (se crea en el primer uso, dentro del event loop)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=f"{self.api_url}/v1_1/{self.cloud_name}",
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.concurrency,
+                    max_keepalive_connections=self.concurrency,
+                ),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _backoff(self, attempt: int) -> float:
+        """Full jitter: espera aleatoria en [0, 0.5 * 2^intento] segundos"""
+        return random.uniform(0, min(8.0, 0.5 * 2 ** attempt))
+
+    async def _request(self, method: str, url: str, **kwargs) -> dict:
+        """Request a la API; reintenta ante 429/5xx y errores de red"""
+        async with self._slots:
+            for attempt in range(self.max_retries + 1):
+                last_attempt = attempt == self.max_retries
+                try:
+                    response = await self.client.request(method, url, **kwargs)
+                except (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError) as e:
+                    if last_attempt:
+                        raise CloudinaryError(f"Cloudinary no responde: {e!r}")
+                    await asyncio.sleep(self._backoff(attempt))
+                    continue
+
+                if response.status_code in self.RETRY_STATUSES and not last_attempt:
+                    await asyncio.sleep(self._backoff(attempt))
+                    continue
+                try:
+                    result = response.json()
+                except ValueError:
+                    result = {"error": {"message": response.text[:200]}}
+                if response.status_code >= 400 or "error" in result:
+                    message = result.get("error", {}).get("message", f"HTTP {response.status_code}")
+                    raise CloudinaryError(message, status_code=response.status_code)
+                return result
+
+    async def _call(self, action: str, params: dict, file: tuple | None = None) -> dict:
+        """POST firmado a la Upload API (/image/{action})"""
+        data = cloudinary.utils.sign_request(
+            cloudinary.utils.build_upload_params(**params),
+            {"api_key": self.api_key, "api_secret": self.api_secret},
+        )
+        files = {"file": file} if file else None
+        return await self._request("POST", f"/image/{action}", data=data, files=files)
+
+    async def _admin(self, method: str, params: list[tuple] | dict) -> dict:
+        """Admin API sobre las imágenes subidas (/resources/image/upload, basic auth)"""
+        return await self._request(
+            method, "/resources/image/upload", params=params, auth=(self.api_key, self.api_secret)
+        )
+
+    async def upload_bytes(
+        self,
+        contents: bytes | BinaryIO,
+        filename: str,
+        folder: str,
+        public_id: Optional[str] = None,
+        transformation: Optional[list[dict]] = None,
+    ) -> Dict[str, str]:
+        """
+        Sube el contenido de una imagen (sin validar). Con un archivo abierto,
+        httpx lo envía de a bloques y lo rebobina en cada reintento.
+
+        Returns:
+            Dict con url, public_id, width, height y format
+
+        Raises:
+            CloudinaryError: Si Cloudinary rechaza la imagen o no responde
+        """
+        params = {"folder": folder, "overwrite": True}
+        if public_id:
+            params["public_id"] = public_id
+        if transformation:
+            params["transformation"] = transformation
+        result = await self._call("upload", params, file=(filename or "image", contents))
+        return {
+            "url": result["secure_url"],
+            "public_id": result["public_id"],
+            "width": result.get("width"),
+            "height": result.get("height"),
+            "format": result.get("format")
+        }
+
     async def upload_image(
         self,
         file: UploadFile,
@@ -74,34 +215,18 @@ class CloudinaryService:
                 detail=f"Archivo muy grande. Tamaño máximo: 5MB (actual: {file_size / (1024 * 1024):.2f}MB)"
             )
 
-        # Reset file pointer
-        await file.seek(0)
-
         try:
-            # Subir a Cloudinary
-            result = cloudinary.uploader.upload(
-                file.file,
-                folder=folder,
-                resource_type="image",
-                # Optimizaciones automáticas
-                quality="auto",
-                fetch_format="auto",
+            return await self.upload_bytes(
+                file_content,
+                file.filename,
+                folder,
                 # Transformaciones
                 transformation=[
                     {"width": 1200, "crop": "limit"},  # Max width 1200px
                     {"quality": "auto:good"}
                 ]
             )
-
-            return {
-                "url": result["secure_url"],
-                "public_id": result["public_id"],
-                "width": result.get("width"),
-                "height": result.get("height"),
-                "format": result.get("format")
-            }
-
-        except Exception as e:
+        except CloudinaryError as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"Error al subir imagen a Cloudinary: {str(e)}"
@@ -121,36 +246,89 @@ class CloudinaryService:
             return False
 
         try:
-            result = cloudinary.uploader.destroy(public_id)
+            result = await self._call("destroy", {"public_id": public_id})
             return result.get("result") == "ok"
         except Exception as e:
             # Log error pero no fallar (la imagen puede no existir)
             print(f"Error al eliminar imagen de Cloudinary: {str(e)}")
             return False
 
-    async def delete_images(self, public_ids: list[str]) -> Dict[str, int]:
+    async def list_resources(self, prefix: str) -> AsyncIterator[dict]:
         """
-        Elimina múltiples imágenes de Cloudinary
+        Recorre las imágenes cuyo public_id empieza con `prefix` (Admin API,
+        de a LIST_PAGE_SIZE por request)
+
+        Yields:
+            Dict de cada recurso (public_id, format, bytes, created_at, ...)
+        """
+        cursor = None
+        while True:
+            params = {"prefix": prefix, "max_results": self.LIST_PAGE_SIZE}
+            if cursor:
+                params["next_cursor"] = cursor
+            page = await self._admin("GET", params)
+            for resource in page.get("resources", []):
+                yield resource
+            cursor = page.get("next_cursor")
+            if not cursor:
+                return
+
+    async def delete_resources(self, public_ids: list[str]) -> Dict[str, str]:
+        """
+        Elimina hasta DELETE_BATCH_SIZE imágenes en un solo request (Admin API)
+
+        Returns:
+            Dict public_id -> "deleted" | "not_found"
+
+        Raises:
+            CloudinaryError: Si Cloudinary rechaza el request o no responde
+        """
+        if len(public_ids) > self.DELETE_BATCH_SIZE:
+            raise ValueError(f"Máximo {self.DELETE_BATCH_SIZE} public_ids por request")
+        result = await self._admin("DELETE", [("public_ids[]", public_id) for public_id in public_ids])
+        return result.get("deleted", {})
+
+    async def delete_images(self, public_ids: list[str], concurrency: int = 4) -> Dict[str, int]:
+        """
+        Elimina múltiples imágenes de Cloudinary, en lotes de
+        DELETE_BATCH_SIZE con hasta `concurrency` lotes a la vez
 
         Args:
             public_ids: Lista de IDs públicos de las imágenes
+            concurrency: Lotes simultáneos
 
         Returns:
-            Dict con contadores de éxito y fallo
+            Dict con contadores de éxito y fallo, y los IDs eliminados
+            (deleted) o que ya no existían (not_found)
         """
-        success = 0
-        failed = 0
-
-        for public_id in public_ids:
-            if await self.delete_image(public_id):
-                success += 1
-            else:
-                failed += 1
+        public_ids = list(dict.fromkeys(filter(None, public_ids)))
+        batches = [
+            public_ids[i:i + self.DELETE_BATCH_SIZE]
+            for i in range(0, len(public_ids), self.DELETE_BATCH_SIZE)
+        ]
+        slots = asyncio.Semaphore(max(1, concurrency))
+
+        async def delete_batch(batch: list[str]) -> Dict[str, str]:
+            async with slots:
+                try:
+                    return await self.delete_resources(batch)
+                except CloudinaryError as e:
+                    # Log error pero no fallar (el resto de los lotes sigue)
+                    print(f"[Cloudinary] Error al eliminar {len(batch)} imágenes: {str(e)}")
+                    return {}
+
+        deleted: list[str] = []
+        not_found: list[str] = []
+        for results in await asyncio.gather(*(delete_batch(batch) for batch in batches)):
+            for public_id, outcome in results.items():
+                (deleted if outcome == "deleted" else not_found).append(public_id)
 
         return {
-            "success": success,
-            "failed": failed,
-            "total": len(public_ids)
+            "success": len(deleted),
+            "failed": len(public_ids) - len(deleted),
+            "total": len(public_ids),
+            "deleted": deleted,
+            "not_found": not_found
         }
 
     def get_optimized_url(
@@ -191,4 +369,12 @@ class CloudinaryService:
 
 
 # Instancia singleton del servicio
-cloudinary_service = CloudinaryService()
+cloudinary_service = CloudinaryService(
+    cloud_name=settings.CLOUDINARY_CLOUD_NAME,
+    api_key=settings.CLOUDINARY_API_KEY,
+    api_secret=settings.CLOUDINARY_API_SECRET,
+    api_url=settings.CLOUDINARY_API_URL,
+    timeout=settings.CLOUDINARY_TIMEOUT_SECONDS,
+    max_retries=settings.CLOUDINARY_MAX_RETRIES,
+    concurrency=settings.UPLOAD_CONCURRENCY,
+)
@@ -0,0 +1,249 @@
+"""
+Code Index Service
+Índice en memoria de códigos de producto para lo que tipean los mecánicos:
+- prefijo: "PUL WAB" -> PUL-WAB-24S
+- infijo (trigramas): "32310" -> ROD-SKF-32310
+- errores de tipeo a distancia 1 (incluye transposiciones): "PULWAB42S" -> PUL-WAB-24S
+
+Los códigos se normalizan sin separadores y en mayúsculas. Cada worker tiene
+su copia: los endpoints del admin la actualizan al instante y, cada
+CODE_INDEX_REFRESH_SECONDS, se compara una firma barata de la tabla products
+para reconstruirla si otro worker la modificó.
+"""
+import asyncio
+import re
+import string
+import time
+from bisect import bisect_left, insort
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models.product import Product
+
+
+_NON_ALNUM = re.compile(r"[^0-9A-Za-z]+")
+_ALPHABET = string.ascii_uppercase + string.digits
+
+# Longitud mínima de consulta para infijo y para tolerancia a errores
+MIN_INFIX_LENGTH = 3
+MIN_FUZZY_LENGTH = 4
+
+# Orden de los resultados según el tipo de coincidencia
+MATCH_EXACT = "exact"
+MATCH_PREFIX = "prefix"
+MATCH_INFIX = "infix"
+MATCH_FUZZY = "fuzzy"
+
+
+def normalize_code(code: str) -> str:
+    """Quita separadores y pasa a mayúsculas: 'rod-skf 32310' -> 'RODSKF32310'"""
+    return _NON_ALNUM.sub("", code).upper()
+
+
+def _segments(code: str) -> list[str]:
+    """Partes del código entre separadores ('ROD-SKF-32310' -> ROD, SKF, 32310)"""
+    return [s.upper() for s in _NON_ALNUM.split(code) if s]
+
+
+def _trigrams(value: str) -> set[str]:
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def _edits1(value: str) -> set[str]:
+    """Variantes a distancia 1: borrado, transposición, reemplazo e inserción"""
+    splits = [(value[:i], value[i:]) for i in range(len(value) + 1)]
+    deletes = [a + b[1:] for a, b in splits if b]
+    transposes = [a + b[1] + b[0] + b[2:] for a, b in splits if len(b) > 1]
+    replaces = [a + c + b[1:] for a, b in splits if b for c in _ALPHABET]
+    inserts = [a + c + b for a, b in splits for c in _ALPHABET]
+    return set(deletes + transposes + replaces + inserts)
+
+
+class _IndexState:
+    """Estructuras del índice (se reemplazan juntas al reconstruir)"""
+
+    def __init__(self):
+        self.entries: dict[int, tuple[str, str, str]] = {}  # id -> (code, name, normalizado)
+        self.sorted_codes: list[tuple[str, int]] = []        # (normalizado, id) para prefijos
+        self.grams: dict[str, set[int]] = {}                 # trigrama -> ids
+        self.codes: dict[str, set[int]] = {}                 # normalizado -> ids
+        self.segments: dict[str, set[int]] = {}              # parte del código -> ids
+
+    @staticmethod
+    def _fuzzy_segments(code: str) -> set[str]:
+        return {s for s in _segments(code) if len(s) >= MIN_FUZZY_LENGTH}
+
+    def add(self, product_id: int, code: str, name: str, keep_sorted: bool = True) -> None:
+        normalized = normalize_code(code)
+        self.entries[product_id] = (code, name, normalized)
+        if keep_sorted:
+            insort(self.sorted_codes, (normalized, product_id))
+        else:
+            self.sorted_codes.append((normalized, product_id))
+        for gram in _trigrams(normalized):
+            self.grams.setdefault(gram, set()).add(product_id)
+        self.codes.setdefault(normalized, set()).add(product_id)
+        for segment in self._fuzzy_segments(code):
+            self.segments.setdefault(segment, set()).add(product_id)
+
+    def remove(self, product_id: int) -> None:
+        entry = self.entries.pop(product_id, None)
+        if entry is None:
+            return
+        code, _, normalized = entry
+        pos = bisect_left(self.sorted_codes, (normalized, product_id))
+        if pos < len(self.sorted_codes) and self.sorted_codes[pos] == (normalized, product_id):
+            del self.sorted_codes[pos]
+        for gram in _trigrams(normalized):
+            self._discard(self.grams, gram, product_id)
+        self._discard(self.codes, normalized, product_id)
+        for segment in self._fuzzy_segments(code):
+            self._discard(self.segments, segment, product_id)
+
+    @staticmethod
+    def _discard(mapping: dict[str, set[int]], key: str, product_id: int) -> None:
+        ids = mapping.get(key)
+        if ids is not None:
+            ids.discard(product_id)
+            if not ids:
+                del mapping[key]
+
+
+class CodeIndex:
+    """Índice invertido de códigos de producto (en memoria, por worker)"""
+
+    def __init__(self, refresh_seconds: int):
+        self.refresh_seconds = refresh_seconds
+        self._state = _IndexState()
+        self._signature: tuple | None = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._state.entries)
+
+    # --- Mantenimiento ---
+
+    @staticmethod
+    def _build(rows) -> _IndexState:
+        state = _IndexState()
+        for product_id, code, name in rows:
+            state.add(product_id, code, name, keep_sorted=False)
+        state.sorted_codes.sort()
+        return state
+
+    def _is_checked(self) -> bool:
+        return (
+            self._signature is not None
+            and time.monotonic() - self._checked_at < self.refresh_seconds
+        )
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        """Reconstruye el índice si la tabla products cambió desde la última carga"""
+        if self._is_checked():
+            return
+        async with self._lock:
+            if self._is_checked():
+                return
+            # Firma barata: cantidad de filas + última modificación
+            result = await db.execute(
+                select(func.count(Product.id), func.max(Product.updated_at))
+            )
+            signature = tuple(result.one())
+            if signature != self._signature:
+                rows = (await db.execute(
+                    select(Product.id, Product.code, Product.name)
+                    .where(Product.is_active == True)
+                )).all()
+                # Construcción fuera del event loop (puede ser de cientos de miles de códigos)
+                self._state = await asyncio.to_thread(self._build, rows)
+                self._signature = signature
+            self._checked_at = time.monotonic()
+
+    def upsert(self, product_id: int, code: str, name: str, is_active: bool = True) -> None:
+        """Hook para altas/ediciones desde el admin"""
+        self._state.remove(product_id)
+        if is_active:
+            self._state.add(product_id, code, name)
+
+    def remove(self, product_id: int) -> None:
+        """Hook para bajas desde el admin"""
+        self._state.remove(product_id)
+
+    # --- Consultas ---
+
+    def lookup(self, q: str, limit: int = 10) -> list[tuple[int, str]]:
+        """
+        Busca códigos que coincidan con la consulta.
+
+        Returns:
+            Lista de (product_id, tipo de coincidencia), de mejor a peor:
+            exacta, prefijo, infijo y distancia de edición 1
+        """
+        state = self._state
+        query = normalize_code(q)
+        if not query or limit <= 0:
+            return []
+
+        results: list[tuple[int, str]] = []
+        seen: set[int] = set()
+
+        def collect(ids, match: str) -> bool:
+            """Agrega ids (ya ordenados); True si se alcanzó el límite"""
+            for product_id in ids:
+                if product_id not in seen:
+                    seen.add(product_id)
+                    results.append((product_id, match))
+                    if len(results) >= limit:
+                        return True
+            return False
+
+        # 1) Exacta + prefijo: búsqueda binaria sobre los códigos ordenados
+        exact, prefix = [], []
+        pos = bisect_left(state.sorted_codes, (query, -1))
+        while pos < len(state.sorted_codes) and len(prefix) < limit:
+            normalized, product_id = state.sorted_codes[pos]
+            if not normalized.startswith(query):
+                break
+            (exact if normalized == query else prefix).append(product_id)
+            pos += 1
+        if collect(exact, MATCH_EXACT) or collect(prefix, MATCH_PREFIX):
+            return results
+
+        # 2) Infijo: intersección de las listas de trigramas
+        if len(query) >= MIN_INFIX_LENGTH:
+            # Alcanza con recorrer la lista de trigramas más corta y verificar el infijo
+            shortest = min(
+                (state.grams.get(g, set()) for g in _trigrams(query)), key=len
+            )
+            infix = [
+                product_id for product_id in shortest
+                if query in state.entries[product_id][2]
+            ]
+            infix.sort(key=lambda pid: (len(state.entries[pid][2]), state.entries[pid][2]))
+            if collect(infix, MATCH_INFIX):
+                return results
+
+        # 3) Errores de tipeo: variantes a distancia 1 de la consulta contra
+        #    el código completo y sus partes (búsquedas exactas en diccionarios)
+        if len(query) >= MIN_FUZZY_LENGTH:
+            candidates = set()
+            for variant in _edits1(query):
+                candidates |= state.codes.get(variant, set())
+                candidates |= state.segments.get(variant, set())
+            fuzzy = sorted(
+                candidates,
+                key=lambda pid: (len(state.entries[pid][2]), state.entries[pid][2]),
+            )
+            collect(fuzzy, MATCH_FUZZY)
+
+        return results
+
+    def get(self, product_id: int) -> tuple[str, str] | None:
+        """(code, name) de un producto indexado"""
+        entry = self._state.entries.get(product_id)
+        return (entry[0], entry[1]) if entry else None
+
+
+# Instancia singleton (una por worker)
+code_index = CodeIndex(refresh_seconds=settings.CODE_INDEX_REFRESH_SECONDS)
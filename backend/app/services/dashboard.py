@@ -0,0 +1,94 @@
+"""
+Dashboard Stats Service
+Estadísticas del dashboard del admin en una sola sentencia (agregación
+condicional con FILTER) y un snapshot en memoria que se descarta cuando se
+crean o modifican pedidos y cotizaciones, se registra un usuario o se crea o
+borra un producto.
+
+El snapshot es por worker: las escrituras lo descartan en el worker que las
+atiende y DASHBOARD_STATS_CACHE_SECONDS acota lo que tardan en verse en
+los demás.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models.order import Order, OrderStatus
+from app.models.product import Product
+from app.models.quote import Quote, QuoteStatus
+from app.models.user import User
+from app.utils.cache import TTLCache
+
+
+PENDING_ORDER_STATUSES = [OrderStatus.PENDING, OrderStatus.PAYMENT_PENDING, OrderStatus.PAID]
+
+
+class DashboardStatsService:
+    """Calcula las estadísticas del dashboard (con snapshot opcional por worker)"""
+
+    def __init__(self, ttl: int):
+        # ttl = 0 desactiva el snapshot
+        self.ttl = ttl
+        self._snapshot = TTLCache(maxsize=1, ttl=ttl)
+
+    def invalidate(self) -> None:
+        """Llamar después de crear o modificar pedidos / cotizaciones, registrar usuarios o crear / borrar productos"""
+        self._snapshot.clear()
+
+    @staticmethod
+    def _query(now: datetime):
+        # Rango [hoy 00:00, mañana 00:00): usa el índice sobre created_at,
+        # a diferencia de date(created_at) = hoy
+        today_start = datetime.combine(now.date(), datetime.min.time())
+        today_end = today_start + timedelta(days=1)
+
+        orders = select(
+            func.count().label("total_orders"),
+            func.count().filter(Order.status.in_(PENDING_ORDER_STATUSES)).label("pending_orders"),
+            func.coalesce(
+                func.sum(Order.total).filter(Order.status == OrderStatus.PAID), 0
+            ).label("total_revenue"),
+            func.count().filter(
+                Order.created_at >= today_start, Order.created_at < today_end
+            ).label("orders_today"),
+        ).select_from(Order).subquery()
+
+        quotes = select(
+            func.count().label("total_quotes"),
+            func.count().filter(Quote.status == QuoteStatus.PENDING).label("pending_quotes"),
+        ).select_from(Quote).subquery()
+
+        return (
+            select(
+                select(func.count(Product.id)).scalar_subquery().label("total_products"),
+                select(func.count(User.id)).scalar_subquery().label("total_users"),
+                orders,
+                quotes,
+            )
+            .select_from(orders)
+            .join(quotes, true())
+        )
+
+    async def get(self, db: AsyncSession) -> dict:
+        """Estadísticas como dict (las claves de DashboardStats)"""
+        stats = self._snapshot.get("stats") if self.ttl else None
+        if stats is None:
+            result = await db.execute(self._query(datetime.utcnow()))
+            row = result.mappings().one()
+            stats = {
+                "total_products": row["total_products"] or 0,
+                "total_orders": row["total_orders"] or 0,
+                "total_users": row["total_users"] or 0,
+                "total_quotes": row["total_quotes"] or 0,
+                "pending_orders": row["pending_orders"] or 0,
+                "pending_quotes": row["pending_quotes"] or 0,
+                "total_revenue": float(row["total_revenue"] or 0),
+                "orders_today": row["orders_today"] or 0,
+            }
+            if self.ttl:
+                self._snapshot.set("stats", stats)
+        return stats
+
+
+# Instancia singleton
+dashboard_stats = DashboardStatsService(ttl=settings.DASHBOARD_STATS_CACHE_SECONDS)
@@ -1,11 +1,85 @@
 """
 Email Service
+Los emails se encolan en email_outbox dentro de la transacción que los genera
+(ver services/email_outbox.py, que los envía). El contenido sale de los
+templates precompilados de services/email_templates.py. SMTPSession mantiene una
+conexión SMTP autenticada y la reutiliza entre mensajes, en lugar de abrir
+conexión + STARTTLS + login por cada email.
 """
+from typing import Sequence
 import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
+from app.models.email_outbox import OutboxEmail
 from app.models.quote import Quote
+from app.services.email_templates import email_templates, RenderedEmail
+
+
+class SMTPSession:
+    """Conexión SMTP reutilizable (se reconecta si el servidor la cerró)"""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        start_tls: bool,
+        timeout: float,
+        max_messages: int,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.start_tls = start_tls
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self._smtp: aiosmtplib.SMTP | None = None
+        self._sent = 0
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.host,
+            port=self.port,
+            username=self.user if self.password else None,
+            password=self.password or None,
+            start_tls=self.start_tls,
+            timeout=self.timeout,
+        )
+        await smtp.connect()  # Incluye STARTTLS y login
+        self._sent = 0
+        return smtp
+
+    async def send(self, message: MIMEMultipart) -> None:
+        """Envía por la conexión abierta; lanza la excepción de aiosmtplib si falla"""
+        # Algunos servidores limitan los mensajes por conexión
+        if self._smtp is not None and self._sent >= self.max_messages:
+            await self.close()
+        fresh = self._smtp is None or not self._smtp.is_connected
+        if fresh:
+            self._smtp = await self._connect()
+        try:
+            await self._smtp.send_message(message)
+        except (aiosmtplib.SMTPServerDisconnected, ConnectionError):
+            await self.close()
+            if fresh:
+                raise
+            # La conexión reutilizada había expirado: un intento con una nueva
+            self._smtp = await self._connect()
+            await self._smtp.send_message(message)
+        self._sent += 1
+
+    async def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                if self._smtp.is_connected:
+                    await self._smtp.quit()
+            except aiosmtplib.SMTPException:
+                self._smtp.close()
+            self._smtp = None
 
 
 class EmailService:
@@ -15,6 +89,67 @@ class EmailService:
         self.user = settings.SMTP_USER
         self.password = settings.SMTP_PASSWORD
     
+    @property
+    def configured(self) -> bool:
+        # Sin password no se hace login (relay local o servidor de pruebas)
+        return bool(self.host and self.user)
+    
+    def session(self) -> SMTPSession:
+        return SMTPSession(
+            host=self.host,
+            port=self.port,
+            user=self.user,
+            password=self.password,
+            start_tls=settings.SMTP_STARTTLS,
+            timeout=settings.SMTP_TIMEOUT_SECONDS,
+            max_messages=settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+        )
+    
+    def build_message(
+        self,
+        to_email: str,
+        subject: str,
+        html_content: str,
+        text_content: str | None = None
+    ) -> MIMEMultipart:
+        message = MIMEMultipart("alternative")
+        message["From"] = f"Maldonado Repuestos <{self.user}>"
+        message["To"] = to_email
+        message["Subject"] = subject
+        
+        if text_content:
+            message.attach(MIMEText(text_content, "plain"))
+        message.attach(MIMEText(html_content, "html"))
+        return message
+    
+    def queue(
+        self,
+        db: AsyncSession,
+        to_email: str,
+        subject: str,
+        html_content: str,
+        text_content: str | None = None
+    ) -> OutboxEmail | None:
+        """Agrega el email al outbox de la sesión (se envía después del commit)"""
+        if not self.configured:
+            print("Email not configured, skipping send")
+            return None
+        email = OutboxEmail(
+            to_email=to_email,
+            subject=subject,
+            html_content=html_content,
+            text_content=text_content,
+        )
+        db.add(email)
+        return email
+    
+    def queue_quote_emails(self, db: AsyncSession, quote: Quote, items: Sequence = ()) -> None:
+        """Notificación al admin y confirmación al cliente de una cotización nueva"""
+        subject, body = self.quote_notification(quote, items)
+        self.queue(db, settings.NOTIFICATION_EMAIL or self.user, subject, body.html, body.text)
+        subject, body = self.quote_confirmation(quote, items)
+        self.queue(db, quote.email, subject, body.html, body.text)
+    
     async def send_email(
         self, 
         to_email: str, 
@@ -22,140 +157,30 @@ class EmailService:
         html_content: str,
         text_content: str | None = None
     ) -> bool:
-        """Send an email"""
-        if not self.user or not self.password:
+        """Send an email now (sin outbox ni reintentos)"""
+        if not self.configured:
             print("Email not configured, skipping send")
             return False
         
+        session = self.session()
         try:
-            message = MIMEMultipart("alternative")
-            message["From"] = f"Maldonado Repuestos <{self.user}>"
-            message["To"] = to_email
-            message["Subject"] = subject
-            
-            if text_content:
-                message.attach(MIMEText(text_content, "plain"))
-            message.attach(MIMEText(html_content, "html"))
-            
-            await aiosmtplib.send(
-                message,
-                hostname=self.host,
-                port=self.port,
-                username=self.user,
-                password=self.password,
-                start_tls=True,
-            )
+            await session.send(self.build_message(to_email, subject, html_content, text_content))
             return True
         except Exception as e:
             print(f"Error sending email: {e}")
             return False
+        finally:
+            await session.close()
     
-    async def send_quote_notification(self, quote: Quote) -> bool:
-        """Send notification about new quote to admin"""
+    def quote_notification(self, quote: Quote, items: Sequence = ()) -> tuple[str, RenderedEmail]:
+        """Notificación al admin de una cotización nueva (items: QuoteItem, si tiene)"""
         subject = f"Nueva Cotización - {quote.name}"
-        
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #A51C30; color: white; padding: 20px; text-align: center; }}
-                .content {{ padding: 20px; background: #f9f9f9; }}
-                .field {{ margin-bottom: 15px; }}
-                .label {{ font-weight: bold; color: #666; }}
-                .value {{ margin-top: 5px; }}
-                .message {{ background: white; padding: 15px; border-left: 4px solid #A51C30; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>Nueva Solicitud de Cotización</h1>
-                </div>
-                <div class="content">
-                    <div class="field">
-                        <div class="label">Nombre:</div>
-                        <div class="value">{quote.name}</div>
-                    </div>
-                    <div class="field">
-                        <div class="label">Email:</div>
-                        <div class="value">{quote.email}</div>
-                    </div>
-                    <div class="field">
-                        <div class="label">Teléfono:</div>
-                        <div class="value">{quote.phone}</div>
-                    </div>
-                    <div class="field">
-                        <div class="label">Vehículo:</div>
-                        <div class="value">{quote.vehicle_info or 'No especificado'}</div>
-                    </div>
-                    <div class="field">
-                        <div class="label">Mensaje:</div>
-                        <div class="message">{quote.message}</div>
-                    </div>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return await self.send_email(
-            to_email=settings.NOTIFICATION_EMAIL or self.user,
-            subject=subject,
-            html_content=html_content,
-        )
+        return subject, email_templates.render("quote_notification", quote=quote, items=items)
     
-    async def send_quote_confirmation(self, quote: Quote) -> bool:
-        """Send confirmation to customer that quote was received"""
+    def quote_confirmation(self, quote: Quote, items: Sequence = ()) -> tuple[str, RenderedEmail]:
+        """Confirmación al cliente de que recibimos la cotización"""
         subject = "Recibimos tu solicitud de cotización - Maldonado Repuestos"
-        
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #A51C30; color: white; padding: 20px; text-align: center; }}
-                .content {{ padding: 20px; }}
-                .footer {{ text-align: center; padding: 20px; color: #666; font-size: 12px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>MALDONADO REPUESTOS</h1>
-                </div>
-                <div class="content">
-                    <h2>¡Hola {quote.name}!</h2>
-                    <p>Recibimos tu solicitud de cotización y la estamos procesando.</p>
-                    <p>Nuestro equipo se pondrá en contacto contigo a la brevedad para brindarte toda la información que necesitás.</p>
-                    <p><strong>Resumen de tu consulta:</strong></p>
-                    <blockquote style="background: #f9f9f9; padding: 15px; border-left: 4px solid #A51C30;">
-                        {quote.message}
-                    </blockquote>
-                    <p>Si tenés alguna consulta urgente, no dudes en contactarnos:</p>
-                    <ul>
-                        <li>Teléfono: +54 11 1234-5678</li>
-                        <li>WhatsApp: +54 11 1234-5678</li>
-                    </ul>
-                    <p>¡Gracias por elegirnos!</p>
-                </div>
-                <div class="footer">
-                    <p>Maldonado Repuestos - Especialistas en Semirremolques y Acoplados</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return await self.send_email(
-            to_email=quote.email,
-            subject=subject,
-            html_content=html_content,
-        )
+        return subject, email_templates.render("quote_confirmation", quote=quote, items=items)
 
 
 # Singleton instance
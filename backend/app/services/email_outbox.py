@@ -0,0 +1,241 @@
+"""
+Email Outbox Worker
+Envía los emails de email_outbox en lotes: cada worker toma hasta
+EMAIL_OUTBOX_BATCH_SIZE filas (UPDATE ... RETURNING, con FOR UPDATE SKIP
+LOCKED en PostgreSQL) y las manda por su propia SMTPSession, que queda
+abierta entre lotes mientras haya trabajo.
+
+- Errores transitorios (4xx, conexión, timeouts): reintento con backoff
+  exponencial + jitter hasta EMAIL_OUTBOX_MAX_ATTEMPTS, después FAILED.
+- Rechazos permanentes (5xx, p. ej. destinatario inexistente): FAILED directo.
+- Si el proceso muere con un lote tomado, las filas vuelven a la cola al
+  vencer el lease.
+"""
+import asyncio
+import random
+from datetime import datetime, timedelta
+import aiosmtplib
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.email_outbox import OutboxEmail, EmailStatus
+from app.services.email import email_service, SMTPSession
+
+
+_QUEUED = [EmailStatus.PENDING, EmailStatus.SENDING]
+
+
+def _permanent(error: Exception) -> bool:
+    """El servidor rechazó el mensaje en forma definitiva (reintentar no sirve)"""
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(500 <= r.code < 600 for r in error.recipients)
+    if isinstance(error, aiosmtplib.SMTPAuthenticationError):
+        return False  # Configuración: se reintenta hasta que se corrija
+    return isinstance(error, aiosmtplib.SMTPResponseException) and 500 <= error.code < 600
+
+
+class EmailOutbox:
+    def __init__(
+        self,
+        workers: int,
+        batch_size: int,
+        max_attempts: int,
+        retry_base: float,
+        retry_max: float,
+        lease_seconds: float,
+        poll_interval: float = 5.0,
+    ):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.lease = timedelta(seconds=lease_seconds)
+        self.poll_interval = poll_interval
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+        # Métricas del proceso
+        self._sent = 0
+        self._retried = 0
+        self._failed = 0
+
+    def notify(self) -> None:
+        """Despierta a los workers (llamar después del commit que encoló emails)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        if self._tasks or self.workers <= 0 or not email_service.configured:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"email-outbox-{n}")
+            for n in range(self.workers)
+        ]
+        print(f"[EmailOutbox] {self.workers} workers iniciados")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeup = None
+
+    async def _run(self) -> None:
+        session = email_service.session()
+        try:
+            while True:
+                # Limpiar antes de leer la cola: un notify() durante la lectura no se pierde
+                self._wakeup.clear()
+                try:
+                    batch = await self._claim()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"[EmailOutbox] Error leyendo la cola: {e!r}")
+                    batch = []
+
+                if batch:
+                    await self._send_batch(session, batch)
+                    continue
+
+                # Sin trabajo: cerrar la conexión (los servidores cortan las inactivas) y esperar
+                await session.close()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await session.close()
+
+    async def _claim(self) -> list:
+        """Toma hasta batch_size emails listos y los marca SENDING"""
+        now = datetime.utcnow()
+        ready = (OutboxEmail.status.in_(_QUEUED)) & (OutboxEmail.next_attempt_at <= now)
+        candidates = (
+            select(OutboxEmail.id)
+            .where(ready)
+            .order_by(OutboxEmail.next_attempt_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(OutboxEmail)
+            .where(OutboxEmail.id.in_(candidates), ready)
+            .values(
+                status=EmailStatus.SENDING,
+                attempts=OutboxEmail.attempts + 1,
+                next_attempt_at=now + self.lease,
+            )
+            .returning(
+                OutboxEmail.id,
+                OutboxEmail.to_email,
+                OutboxEmail.subject,
+                OutboxEmail.html_content,
+                OutboxEmail.text_content,
+                OutboxEmail.attempts,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(stmt)).all()
+            await db.commit()
+        return rows
+
+    def _backoff(self, attempts: int) -> float:
+        """Exponencial con jitter: entre la mitad y el total de base * 2^(intentos-1)"""
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def _send_batch(self, session: SMTPSession, batch: list) -> None:
+        sent: list[int] = []
+        failures: list[dict] = []
+        for row in batch:
+            message = email_service.build_message(
+                row.to_email, row.subject, row.html_content, row.text_content
+            )
+            try:
+                await session.send(message)
+                sent.append(row.id)
+            except Exception as e:
+                await session.close()
+                error = f"{type(e).__name__}: {e}"
+                give_up = _permanent(e) or row.attempts >= self.max_attempts
+                retry_at = datetime.utcnow() + timedelta(seconds=self._backoff(row.attempts))
+                failures.append({
+                    "id": row.id,
+                    "status": EmailStatus.FAILED if give_up else EmailStatus.PENDING,
+                    "next_attempt_at": retry_at,
+                    "last_error": error[:1000],
+                })
+                if give_up:
+                    self._failed += 1
+                    print(f"[EmailOutbox] Email {row.id} a {row.to_email}: FAILED ({error})")
+                else:
+                    self._retried += 1
+                    print(f"[EmailOutbox] Email {row.id}: intento {row.attempts} falló ({error}), reintento {retry_at:%H:%M:%S}")
+        self._sent += len(sent)
+
+        try:
+            async with AsyncSessionLocal() as db:
+                if sent:
+                    await db.execute(
+                        update(OutboxEmail)
+                        .where(OutboxEmail.id.in_(sent))
+                        .values(status=EmailStatus.SENT, sent_at=datetime.utcnow(), last_error=None)
+                        .execution_options(synchronize_session=False)
+                    )
+                for failure in failures:
+                    email_id = failure.pop("id")
+                    await db.execute(
+                        update(OutboxEmail)
+                        .where(OutboxEmail.id == email_id)
+                        .values(**failure)
+                        .execution_options(synchronize_session=False)
+                    )
+                await db.commit()
+        except Exception as e:
+            # Las filas vuelven a la cola al vencer el lease (podrían reenviarse)
+            print(f"[EmailOutbox] Error registrando el envío: {e!r}")
+
+    async def stats(self, db: AsyncSession) -> dict:
+        """Profundidad de la cola (global) y envíos de este proceso"""
+        now = datetime.utcnow()
+        result = await db.execute(
+            select(
+                func.count().filter(OutboxEmail.status == EmailStatus.PENDING).label("pending"),
+                func.count().filter(OutboxEmail.status == EmailStatus.SENDING).label("sending"),
+                func.count().filter(OutboxEmail.status == EmailStatus.FAILED).label("failed"),
+                func.min(OutboxEmail.created_at).filter(OutboxEmail.status.in_(_QUEUED)).label("oldest"),
+            )
+        )
+        row = result.one()
+        oldest = row.oldest
+        if isinstance(oldest, str):  # SQLite devuelve texto en agregados
+            oldest = datetime.fromisoformat(oldest)
+        return {
+            "queue": {
+                "pending": row.pending,
+                "sending": row.sending,
+                "failed": row.failed,
+                "oldest_pending_seconds": round((now - oldest).total_seconds(), 3) if oldest else 0.0,
+            },
+            "worker": {
+                "workers": len(self._tasks),
+                "sent": self._sent,
+                "retried": self._retried,
+                "failed": self._failed,
+            },
+        }
+
+
+# Instancia singleton (los workers se inician en el lifespan de la app)
+email_outbox = EmailOutbox(
+    workers=settings.EMAIL_OUTBOX_WORKERS,
+    batch_size=settings.EMAIL_OUTBOX_BATCH_SIZE,
+    max_attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    retry_base=settings.EMAIL_OUTBOX_RETRY_SECONDS,
+    retry_max=settings.EMAIL_OUTBOX_RETRY_MAX_SECONDS,
+    lease_seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS,
+)
@@ -0,0 +1,54 @@
+"""
+Email Templates
+Templates Jinja2 (HTML + texto plano) de app/templates/email, compilados una
+sola vez al cargar el módulo. El CSS y el encabezado/pie son fragmentos
+estáticos: el CSS se lee una vez y va como global ya marcado seguro, y el
+layout compilado (base.html) los emite como constantes.
+
+El HTML escapa automáticamente todo lo que viene del usuario (nombre,
+mensaje, vehículo, items); el texto plano no se escapa.
+"""
+from pathlib import Path
+from typing import NamedTuple
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, select_autoescape
+from markupsafe import Markup
+
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates" / "email"
+
+
+class RenderedEmail(NamedTuple):
+    html: str
+    text: str
+
+
+class EmailTemplates:
+    # Cada email tiene <nombre>.html y <nombre>.txt
+    NAMES = ("quote_notification", "quote_confirmation")
+
+    def __init__(self, directory: Path):
+        self.env = Environment(
+            loader=FileSystemLoader(directory),
+            autoescape=select_autoescape(["html"]),
+            undefined=StrictUndefined,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            auto_reload=False,
+        )
+        self.env.globals.update(
+            styles=Markup((directory / "styles.css").read_text(encoding="utf-8")),
+            contact_phone="+54 11 1234-5678",
+            contact_whatsapp="+54 11 1234-5678",
+        )
+        self._templates = {
+            name: (self.env.get_template(f"{name}.html"), self.env.get_template(f"{name}.txt"))
+            for name in self.NAMES
+        }
+
+    def render(self, name: str, **context) -> RenderedEmail:
+        html, text = self._templates[name]
+        return RenderedEmail(html=html.render(context), text=text.render(context))
+
+
+# Instancia singleton (compila los templates al importarse, en el arranque)
+email_templates = EmailTemplates(TEMPLATES_DIR)
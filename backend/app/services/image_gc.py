@@ -0,0 +1,372 @@
+"""
+Image GC
+Borra las imágenes subidas que ya no usa ningún producto, banner ni
+categoría. Editar o eliminar un producto borra sus filas de product_images
+pero nunca el archivo ni el asset de Cloudinary, así que se acumulaban.
+
+- Referenciadas: los blobs registrados cuyo sha256 aparece en alguna
+  columna image_sha256 (indexada, ver image_store.py). Solo si hay archivos
+  sin blob (subidos antes de image_blobs) se leen todas las URLs de
+  REFERENCE_COLUMNS más product_images.public_id.
+- Guardadas: los archivos de uploads/products y, si Cloudinary está
+  configurado, el listado de la carpeta maldonado/products (Admin API).
+- Huérfanas: guardadas, sin referencias y más viejas que min_age (una imagen
+  recién subida todavía no se asignó al producto). Tampoco se borra un blob
+  que una subida reutilizó hace menos de min_age.
+- Justo antes de borrar se vuelven a consultar las referencias de los
+  blobs candidatos: una imagen asignada mientras corría el GC no se borra.
+- En Cloudinary se borran en lotes de 100 public_ids por request, con
+  IMAGE_GC_CONCURRENCY lotes a la vez. Con dry_run solo se informa.
+
+Corre cada IMAGE_GC_INTERVAL_HOURS y a pedido desde POST /admin/images/gc.
+Todos los workers tienen el loop, pero en cada ciclo solo corre el que toma
+la fila "image_gc" de job_leases (UPDATE condicional, como payment_inbox):
+los demás ven el lease vigente y esperan al próximo.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from sqlalchemy import select, update, or_
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.image_blob import ImageBlob
+from app.models.job_lease import JobLease
+from app.models.product_image import ProductImage
+from app.services.cloudinary_service import cloudinary_service
+from app.services.image_store import (
+    image_store, REFERENCE_COLUMNS, LOCAL, CLOUDINARY, UPLOAD_DIR, CLOUDINARY_FOLDER,
+)
+from app.services.image_variants import image_variants, FORMATS
+from app.utils.image_urls import PRESETS, blob_key
+from app.utils.upsert import insert_for
+
+# Máximo de huérfanas listadas en el reporte (los totales cuentan todas)
+REPORT_LIMIT = 200
+
+LEASE_NAME = "image_gc"
+# El lease dura un poco menos que el intervalo: el próximo ciclo de cualquier
+# worker lo encuentra vencido aunque su loop arranque algo antes
+LEASE_FRACTION = 0.9
+
+_LOCAL_PREFIX = "/uploads/products/"
+_CLOUDINARY_UPLOAD = "/image/upload/"
+
+
+def _local_name(url: str) -> str | None:
+    """Nombre de archivo de una URL local (absoluta o relativa)"""
+    _, sep, name = url.split("?", 1)[0].rpartition(_LOCAL_PREFIX)
+    return name if sep and name and "/" not in name else None
+
+
+def _public_id_candidates(url: str) -> set[str]:
+    """
+    public_ids posibles de una URL de Cloudinary: lo que sigue a /image/upload/
+    puede llevar transformaciones y versión antes del public_id, así que se
+    toman todos los sufijos del path (sin extensión)
+    """
+    _, sep, tail = url.split("?", 1)[0].partition(_CLOUDINARY_UPLOAD)
+    if not sep or not tail:
+        return set()
+    head, _, name = tail.rpartition("/")
+    name = name.rsplit(".", 1)[0]
+    parts = [*head.split("/"), name] if head else [name]
+    return {"/".join(parts[i:]) for i in range(len(parts))}
+
+
+def _unused(storage: str, key: str | None, blobs: set, recent: set, in_use: set[str], referenced: bool) -> bool:
+    """Sin referencias: por image_sha256 si es un blob registrado; si no, por el listado de URLs"""
+    if (storage, key) in recent:
+        return False
+    if (storage, key) in blobs:
+        return key not in in_use
+    return not referenced
+
+
+def _parse_created_at(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        created = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if created.tzinfo is not None:
+        created = created.astimezone(timezone.utc).replace(tzinfo=None)
+    return created
+
+
+class ImageGC:
+    def __init__(
+        self,
+        upload_dir: Path,
+        cloudinary_folder: str,
+        interval_hours: float,
+        min_age_hours: float,
+        concurrency: int,
+    ):
+        self.upload_dir = upload_dir
+        self.cloudinary_folder = cloudinary_folder
+        self.interval_hours = interval_hours
+        self.min_age_hours = min_age_hours
+        self.concurrency = max(1, concurrency)
+        self._task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        self._last_report: dict | None = None
+
+    async def start(self) -> None:
+        if self._task is not None or self.interval_hours <= 0:
+            return
+        self._task = asyncio.create_task(self._run(), name="image-gc")
+        print(f"[ImageGC] Cada {self.interval_hours:g} h (huérfanas de más de {self.min_age_hours:g} h)")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _claim(self) -> bool:
+        """Toma el ciclo para este worker; False si otro ya lo corrió (lease vigente)"""
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                insert_for(db, JobLease)
+                .values(name=LEASE_NAME, locked_until=now)
+                .on_conflict_do_nothing(index_elements=["name"])
+            )
+            result = await db.execute(
+                update(JobLease)
+                .where(JobLease.name == LEASE_NAME, JobLease.locked_until <= now)
+                .values(
+                    locked_until=now + timedelta(hours=self.interval_hours * LEASE_FRACTION),
+                    owner=f"pid {os.getpid()}",
+                )
+                .returning(JobLease.name)
+                .execution_options(synchronize_session=False)
+            )
+            claimed = result.first() is not None
+            await db.commit()
+        return claimed
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_hours * 3600)
+            try:
+                if await self._claim():
+                    await self.collect(dry_run=False)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[ImageGC] Error: {e!r}")
+
+    async def _referenced(self) -> tuple[set[str], set[str]]:
+        """(nombres de archivos locales, public_ids posibles de Cloudinary) en uso"""
+        local: set[str] = set()
+        public_ids: set[str] = set()
+        async with AsyncSessionLocal() as db:
+            for column in REFERENCE_COLUMNS:
+                result = await db.execute(select(column).where(column.is_not(None)).distinct())
+                for url in result.scalars():
+                    name = _local_name(url)
+                    if name:
+                        local.add(name)
+                    else:
+                        public_ids |= _public_id_candidates(url)
+            result = await db.execute(
+                select(ProductImage.public_id).where(ProductImage.public_id.is_not(None)).distinct()
+            )
+            public_ids.update(result.scalars())
+        return local, public_ids
+
+    async def _blobs(self, cutoff: datetime) -> tuple[set[tuple[str, str]], set[tuple[str, str]], set[str]]:
+        """
+        (storage, sha256) de los blobs registrados, los creados o reutilizados
+        después de cutoff y los sha256 que usa alguna fila
+        """
+        recent_use = or_(ImageBlob.created_at > cutoff, ImageBlob.last_used_at > cutoff)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(ImageBlob.storage, ImageBlob.sha256, recent_use.label("recent"))
+            )
+            rows = result.all()
+            in_use = await image_store.referenced_keys(db)
+        blobs = {(row.storage, row.sha256) for row in rows}
+        recent = {(row.storage, row.sha256) for row in rows if row.recent}
+        return blobs, recent, in_use
+
+    async def _recheck(self, storage: str, names: list[str], blobs: set) -> list[str]:
+        """Descarta los blobs que pasaron a usarse desde el primer escaneo (consulta fresca)"""
+        keys = {key for key in map(blob_key, names) if (storage, key) in blobs}
+        if not keys:
+            return names
+        async with AsyncSessionLocal() as db:
+            in_use = await image_store.referenced_keys(db, keys)
+        return [name for name in names if blob_key(name) not in in_use]
+
+    async def _forget(self, storage: str, keys: set[str]) -> None:
+        if not keys:
+            return
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                ImageBlob.__table__.delete().where(
+                    ImageBlob.storage == storage, ImageBlob.sha256.in_(keys)
+                )
+            )
+            await db.commit()
+
+    def _scan_local(self) -> list[tuple[str, int, float]]:
+        if not self.upload_dir.exists():
+            return []
+        files = []
+        for path in self.upload_dir.iterdir():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if path.is_file():
+                files.append((path.name, stat.st_size, stat.st_mtime))
+        return files
+
+    def _delete_local(self, names: list[str]) -> tuple[list[str], int]:
+        """Borra los archivos y sus variantes en cache; retorna (borrados, fallidos)"""
+        deleted, failed = [], 0
+        for name in names:
+            try:
+                (self.upload_dir / name).unlink(missing_ok=True)
+            except OSError as e:
+                print(f"[ImageGC] No se pudo borrar {name}: {e!r}")
+                failed += 1
+                continue
+            deleted.append(name)
+            digest = blob_key(name)
+            if digest:
+                for preset in PRESETS:
+                    for fmt in FORMATS:
+                        image_variants.cache_path(digest, preset, fmt).unlink(missing_ok=True)
+        return deleted, failed
+
+    async def _collect_local(
+        self, files: list, blobs: set, recent: set, in_use: set[str], referenced: set[str],
+        cutoff: datetime, dry_run: bool,
+    ) -> dict:
+        limit = cutoff.replace(tzinfo=timezone.utc).timestamp()
+        orphans = [
+            (name, size) for name, size, mtime in files
+            if mtime < limit and _unused(LOCAL, blob_key(name), blobs, recent, in_use, name in referenced)
+        ]
+        report = {
+            "stored": len(files),
+            "orphans": len(orphans),
+            "orphan_bytes": sum(size for _, size in orphans),
+            "deleted": 0,
+            "failed": 0,
+            "items": [{"name": name, "bytes": size} for name, size in orphans[:REPORT_LIMIT]],
+        }
+        if dry_run or not orphans:
+            return report
+
+        names = await self._recheck(LOCAL, [name for name, _ in orphans], blobs)
+        report["now_in_use"] = len(orphans) - len(names)
+        deleted, failed = await asyncio.to_thread(self._delete_local, names)
+        await self._forget(LOCAL, {key for key in map(blob_key, deleted) if key})
+        report["deleted"] = len(deleted)
+        report["failed"] = failed
+        return report
+
+    async def _collect_cloudinary(
+        self, resources: list[dict], blobs: set, recent: set, in_use: set[str], referenced: set[str],
+        cutoff: datetime, dry_run: bool,
+    ) -> dict:
+        orphans: list[dict] = []
+        for resource in resources:
+            public_id = resource["public_id"]
+            created = _parse_created_at(resource.get("created_at"))
+            if created is None or created > cutoff:
+                continue
+            if _unused(CLOUDINARY, blob_key(public_id), blobs, recent, in_use, public_id in referenced):
+                orphans.append({"public_id": public_id, "bytes": resource.get("bytes", 0)})
+
+        report = {
+            "stored": len(resources),
+            "orphans": len(orphans),
+            "orphan_bytes": sum(orphan["bytes"] for orphan in orphans),
+            "deleted": 0,
+            "failed": 0,
+            "items": orphans[:REPORT_LIMIT],
+        }
+        if dry_run or not orphans:
+            return report
+
+        public_ids = await self._recheck(CLOUDINARY, [orphan["public_id"] for orphan in orphans], blobs)
+        report["now_in_use"] = len(orphans) - len(public_ids)
+        result = await cloudinary_service.delete_images(public_ids, concurrency=self.concurrency)
+        gone = result["deleted"] + result["not_found"]
+        await self._forget(CLOUDINARY, {key for key in map(blob_key, gone) if key})
+        report["deleted"] = result["success"]
+        report["failed"] = result["total"] - len(gone)
+        return report
+
+    async def collect(self, dry_run: bool = True, min_age_hours: float | None = None) -> dict:
+        """
+        Busca (y salvo dry_run, borra) las imágenes huérfanas
+
+        Returns:
+            Reporte por almacenamiento: guardadas, huérfanas, bytes, borradas
+            y las primeras REPORT_LIMIT huérfanas
+        """
+        min_age = self.min_age_hours if min_age_hours is None else min_age_hours
+        async with self._lock:
+            started = time.perf_counter()
+            cutoff = datetime.utcnow() - timedelta(hours=min_age)
+            blobs, recent, in_use = await self._blobs(cutoff)
+            files = await asyncio.to_thread(self._scan_local)
+            resources = None
+            if cloudinary_service.configured:
+                resources = [
+                    resource async for resource in
+                    cloudinary_service.list_resources(f"{self.cloudinary_folder}/")
+                ]
+
+            # Las URLs de todas las tablas solo hacen falta para imágenes sin blob registrado
+            untracked = any((LOCAL, blob_key(name)) not in blobs for name, _, _ in files) or any(
+                (CLOUDINARY, blob_key(resource["public_id"])) not in blobs for resource in resources or []
+            )
+            referenced_local, referenced_public_ids = await self._referenced() if untracked else (set(), set())
+
+            report = {
+                "dry_run": dry_run,
+                "min_age_hours": min_age,
+                "local": await self._collect_local(files, blobs, recent, in_use, referenced_local, cutoff, dry_run),
+                "cloudinary": None,
+            }
+            if resources is not None:
+                report["cloudinary"] = await self._collect_cloudinary(
+                    resources, blobs, recent, in_use, referenced_public_ids, cutoff, dry_run
+                )
+            report["elapsed_ms"] = round((time.perf_counter() - started) * 1000)
+
+        summary = ", ".join(
+            f"{storage}: {report[storage]['orphans']} huérfanas, {report[storage]['deleted']} borradas"
+            for storage in ("local", "cloudinary") if report[storage] is not None
+        )
+        print(f"[ImageGC] {'(dry run) ' if dry_run else ''}{summary} en {report['elapsed_ms']} ms")
+        self._last_report = report
+        return report
+
+    def stats(self) -> dict:
+        return {
+            "interval_hours": self.interval_hours,
+            "min_age_hours": self.min_age_hours,
+            "last_report": self._last_report,
+        }
+
+
+# Instancia singleton
+image_gc = ImageGC(
+    UPLOAD_DIR,
+    CLOUDINARY_FOLDER,
+    interval_hours=settings.IMAGE_GC_INTERVAL_HOURS,
+    min_age_hours=settings.IMAGE_GC_MIN_AGE_HOURS,
+    concurrency=settings.IMAGE_GC_CONCURRENCY,
+)
@@ -0,0 +1,271 @@
+"""
+Image Ingest
+Recibe las imágenes de un request multipart en streaming (python-multipart)
+en lugar de usar UploadFile: antes Starlette guardaba el cuerpo entero y
+recién después file.read() lo cargaba en memoria para validar el tamaño.
+
+- Cada archivo se escribe por bloques en un archivo temporal (las
+  escrituras van a un thread, no bloquean el event loop) mientras se calcula
+  su SHA-256 y se detecta el formato por los magic bytes.
+- Un archivo que cruza el máximo deja de escribirse en ese momento y vuelve
+  con su error; el request entero se corta con 413 si supera
+  max_files * max_file_size (o si el Content-Length ya lo anuncia).
+- Los archivos se entregan a medida que terminan de llegar (stream()), así
+  el endpoint puede empezar a subirlos mientras recibe el resto.
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import AsyncIterator
+from fastapi import Request, HTTPException, status
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+# Temporales fuera de uploads/ (StaticFiles sirve ese directorio)
+TMP_DIR = Path("tmp/uploads")
+
+# Margen por archivo para los headers de cada parte del multipart
+PART_OVERHEAD = 16 * 1024
+
+# Firma -> extensión con la que se guarda
+_SIGNATURES = [
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+]
+_SNIFF_BYTES = 12
+
+
+def sniff_image(head: bytes) -> str | None:
+    """Extensión según los primeros bytes del archivo (None si no es una imagen conocida)"""
+    for signature, ext in _SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+class IngestedImage:
+    """Un archivo recibido: temporal en disco, tamaño, hash y formato detectado"""
+
+    def __init__(self, field: str, filename: str, content_type: str | None):
+        self.field = field
+        self.filename = filename
+        self.content_type = content_type
+        self.path: Path | None = None
+        self.size = 0
+        self.sha256 = ""
+        self.ext: str | None = None
+        self.error: str | None = None
+        self._hash = hashlib.sha256()
+        self._head = b""
+        self._file = None
+
+    def discard(self) -> None:
+        """Borra el temporal (si todavía existe)"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+            self.path = None
+
+    async def adiscard(self) -> None:
+        await asyncio.to_thread(self.discard)
+
+
+class _PartReader:
+    """Callbacks de python-multipart: traducen el stream a eventos por parte"""
+
+    def __init__(self, boundary: bytes):
+        self.events: list[tuple] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._headers: dict[bytes, bytes] = {}
+        self.parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": lambda: self.events.append(("end",)),
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": lambda: self.events.append(("headers", self._headers)),
+        })
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        # Vista sobre el chunk recibido: sin copiar los bytes
+        self.events.append(("data", memoryview(data)[start:end]))
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+
+class ImageIngest:
+    def __init__(self, tmp_dir: Path, write_buffer: int = 256 * 1024):
+        self.tmp_dir = tmp_dir
+        self.write_buffer = write_buffer
+
+    def _create_temp(self) -> tuple[Path, object]:
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(dir=self.tmp_dir, suffix=".part")
+        return Path(name), os.fdopen(fd, "wb")
+
+    async def stream(
+        self,
+        request: Request,
+        fields: set[str],
+        max_files: int,
+        max_file_size: int,
+    ) -> AsyncIterator[IngestedImage]:
+        """
+        Lee el multipart del request y entrega cada archivo de los campos
+        `fields` cuando termina de llegar. Los que vienen con error (formato,
+        tamaño) no tienen temporal. Quien recibe un IngestedImage es dueño de
+        su temporal (debe moverlo o llamar a discard()).
+        """
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Se esperaba un formulario multipart con archivos"
+            )
+
+        max_body = max_files * (max_file_size + PART_OVERHEAD)
+        too_large = HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"El request es demasiado grande. Maximo: {max_file_size // (1024 * 1024)}MB por archivo"
+        )
+        declared = request.headers.get("content-length", "")
+        if declared.isdigit() and int(declared) > max_body:
+            raise too_large
+
+        reader = _PartReader(params[b"boundary"])
+        current: IngestedImage | None = None
+        pending: list[memoryview] = []
+        pending_size = 0
+        received = 0
+        files = 0
+
+        def add(data: memoryview) -> None:
+            nonlocal pending_size
+            pending.append(data)
+            pending_size += len(data)
+
+        def drop() -> None:
+            nonlocal pending_size
+            pending.clear()
+            pending_size = 0
+
+        async def flush() -> None:
+            if pending and current._file is not None:
+                await asyncio.to_thread(current._file.writelines, list(pending))
+            drop()
+
+        try:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > max_body:
+                    raise too_large
+                reader.parser.write(chunk)
+
+                for event in reader.events:
+                    kind = event[0]
+                    if kind == "headers":
+                        _, options = parse_options_header(event[1].get(b"content-disposition", b""))
+                        name = options.get(b"name", b"").decode("utf-8", "replace")
+                        if name not in fields or b"filename" not in options:
+                            current = None  # Otros campos se ignoran
+                            continue
+                        files += 1
+                        if files > max_files:
+                            raise HTTPException(
+                                status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"Demasiados archivos. Maximo: {max_files} por request"
+                            )
+                        current = IngestedImage(
+                            name,
+                            options[b"filename"].decode("utf-8", "replace"),
+                            event[1].get(b"content-type", b"").decode("latin-1") or None,
+                        )
+
+                    elif kind == "data" and current is not None and current.error is None:
+                        data = event[1]
+                        current.size += len(data)
+                        if current.size > max_file_size:
+                            current.error = f"El archivo es demasiado grande. Maximo: {max_file_size // (1024 * 1024)}MB"
+                            drop()
+                            await current.adiscard()
+                            continue
+                        current._hash.update(data)
+                        if current.ext is None:
+                            current._head += data[:_SNIFF_BYTES - len(current._head)]
+                            if len(current._head) < _SNIFF_BYTES:
+                                add(data)
+                                continue
+                            current.ext = sniff_image(current._head)
+                            if current.ext is None:
+                                current.error = "El archivo no es una imagen valida (JPG, PNG, GIF o WEBP)"
+                                drop()
+                                continue
+                            current.path, current._file = await asyncio.to_thread(self._create_temp)
+                        add(data)
+                        if pending_size >= self.write_buffer:
+                            await flush()
+
+                    elif kind == "end" and current is not None:
+                        if current.error is None and current.ext is None:
+                            # Archivo más corto que la firma
+                            current.ext = sniff_image(current._head)
+                            if current.ext is None:
+                                current.error = "El archivo no es una imagen valida (JPG, PNG, GIF o WEBP)"
+                            else:
+                                current.path, current._file = await asyncio.to_thread(self._create_temp)
+                        if current.error is None:
+                            await flush()
+                            await asyncio.to_thread(current._file.close)
+                            current._file = None
+                            current.sha256 = current._hash.hexdigest()
+                        drop()
+                        item, current = current, None
+                        yield item
+                reader.events.clear()
+
+            reader.parser.finalize()
+        finally:
+            # Request cortado o con error: el archivo a medio recibir no queda en disco
+            if current is not None:
+                await current.adiscard()
+
+    def purge_stale(self, max_age: float = 3600) -> int:
+        """Borra temporales viejos (de un proceso que murió a mitad de un upload)"""
+        if not self.tmp_dir.exists():
+            return 0
+        limit = time.time() - max_age
+        removed = 0
+        for path in self.tmp_dir.glob("*.part"):
+            try:
+                if path.stat().st_mtime < limit:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+# Instancia singleton
+image_ingest = ImageIngest(TMP_DIR)
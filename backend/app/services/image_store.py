@@ -0,0 +1,238 @@
+"""
+Image Store
+Almacenamiento de imágenes direccionado por contenido: la clave de cada
+imagen es el SHA-256 de sus bytes (calculado al recibirla, ver
+image_ingest.py), tanto en disco (uploads/products/<sha256>.<ext>) como en
+Cloudinary (public_id maldonado/products/<sha256>).
+
+- Antes de guardar se busca el blob en image_blobs: si la misma foto ya se
+  subió, se devuelve la URL existente sin escribir a disco ni llamar al
+  proveedor. Dos subidas simultáneas del mismo contenido en un proceso
+  hacen una sola escritura.
+- Cada fila que usa una imagen (producto, imagen de producto, banner,
+  categoría) guarda el sha256 en image_sha256 (ver models/image_ref.py):
+  las referencias a un blob se cuentan por igualdad sobre esa columna
+  indexada, en la transacción del que pregunta. No hay contador guardado
+  que mantener en cada escritura (ni que se desfase con escrituras
+  concurrentes).
+"""
+import asyncio
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, NamedTuple
+from sqlalchemy import select, update, func, union
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal
+from app.models.banner import Banner
+from app.models.category import Category
+from app.models.image_blob import ImageBlob
+from app.models.product import Product
+from app.models.product_image import ProductImage
+from app.services.cloudinary_service import cloudinary_service
+from app.services.image_ingest import IngestedImage
+from app.services.image_variants import image_variants
+from app.utils.image_urls import blob_key
+from app.utils.upsert import insert_for
+
+LOCAL = "local"
+CLOUDINARY = "cloudinary"
+
+UPLOAD_DIR = Path("uploads/products")
+CLOUDINARY_FOLDER = "maldonado/products"
+
+# Columnas que pueden apuntar a una imagen subida
+REFERENCE_COLUMNS = (
+    ProductImage.image_url,
+    Product.image_url,
+    Banner.image_url,
+    Category.image_url,
+)
+
+# sha256 de esas mismas URLs cuando son blobs (indexadas)
+REFERENCE_KEYS = (
+    ProductImage.image_sha256,
+    Product.image_sha256,
+    Banner.image_sha256,
+    Category.image_sha256,
+)
+
+
+class StoredImage(NamedTuple):
+    url: str
+    storage: str
+    sha256: str
+    deduplicated: bool  # Ya existía: no hubo escritura ni llamada al proveedor
+
+
+class ImageStore:
+    def __init__(self, upload_dir: Path, cloudinary_folder: str):
+        self.upload_dir = upload_dir
+        self.cloudinary_folder = cloudinary_folder
+        # (storage, sha256) -> URL de una escritura en curso (None si falló)
+        self._inflight: dict[tuple[str, str], asyncio.Future] = {}
+        # Métricas del proceso
+        self._stored = 0
+        self._deduplicated = 0
+        self._bytes_saved = 0
+
+    @property
+    def storage(self) -> str:
+        return CLOUDINARY if cloudinary_service.configured else LOCAL
+
+    async def _lookup(self, storage: str, sha256: str) -> ImageBlob | None:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(ImageBlob).where(ImageBlob.sha256 == sha256, ImageBlob.storage == storage)
+            )
+            return result.scalar_one_or_none()
+
+    async def _touch(self, blob_id: int) -> None:
+        """Marca el blob como recién usado (el GC respeta un tiempo mínimo desde el último uso)"""
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(ImageBlob).where(ImageBlob.id == blob_id).values(last_used_at=datetime.utcnow())
+            )
+            await db.commit()
+
+    async def _register(self, image: IngestedImage, storage: str, url: str, public_id: str | None) -> None:
+        async with AsyncSessionLocal() as db:
+            stmt = insert_for(db, ImageBlob).values(
+                sha256=image.sha256,
+                storage=storage,
+                url=url,
+                public_id=public_id,
+                size=image.size,
+                ext=image.ext,
+            )
+            await db.execute(stmt.on_conflict_do_nothing(index_elements=["sha256", "storage"]))
+            await db.commit()
+
+    def _reused(self, image: IngestedImage, url: str, storage: str) -> StoredImage:
+        self._deduplicated += 1
+        self._bytes_saved += image.size
+        return StoredImage(url, storage, image.sha256, True)
+
+    async def store(self, image: IngestedImage) -> StoredImage:
+        """
+        Guarda una imagen recibida (o reutiliza la existente con el mismo
+        contenido). El temporal de `image` se mueve o queda para descartar.
+
+        Raises:
+            CloudinaryError: Si Cloudinary rechaza la imagen o no responde
+        """
+        storage = self.storage
+        blob = await self._lookup(storage, image.sha256)
+        if blob is not None and (storage != LOCAL or await asyncio.to_thread(self._local_path(blob.sha256, blob.ext).exists)):
+            await self._touch(blob.id)
+            return self._reused(image, blob.url, storage)
+
+        key = (storage, image.sha256)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            url = await asyncio.shield(pending)
+            if url is not None:
+                return self._reused(image, url, storage)
+
+        pending = asyncio.get_running_loop().create_future()
+        self._inflight[key] = pending
+        url = None
+        try:
+            if storage == LOCAL:
+                url = await self._put_local(image)
+            else:
+                url = await self._put_cloudinary(image)
+        finally:
+            # Si falló, quienes esperaban lo intentan por su cuenta
+            pending.set_result(url)
+            self._inflight.pop(key, None)
+        self._stored += 1
+        return StoredImage(url, storage, image.sha256, False)
+
+    def _local_path(self, sha256: str, ext: str) -> Path:
+        return self.upload_dir / f"{sha256}{ext}"
+
+    async def _put_local(self, image: IngestedImage) -> str:
+        path = self._local_path(image.sha256, image.ext)
+
+        def move() -> None:
+            self.upload_dir.mkdir(parents=True, exist_ok=True)
+            if not path.exists():
+                shutil.move(image.path, path)
+
+        await asyncio.to_thread(move)
+        url = f"/uploads/products/{path.name}"
+        await self._register(image, LOCAL, url, None)
+        # Variantes reducidas (thumb/card/detail) en segundo plano
+        image_variants.schedule(path, image.sha256)
+        return url
+
+    async def _put_cloudinary(self, image: IngestedImage) -> str:
+        # Se envía desde el temporal, sin cargar la imagen entera en memoria
+        file = await asyncio.to_thread(image.path.open, "rb")
+        try:
+            result = await cloudinary_service.upload_bytes(
+                file,
+                image.filename,
+                folder=self.cloudinary_folder,
+                public_id=image.sha256,
+                transformation=[
+                    {"quality": "auto:good"},
+                    {"fetch_format": "auto"}
+                ]
+            )
+        finally:
+            await asyncio.to_thread(file.close)
+        await self._register(image, CLOUDINARY, result["url"], result["public_id"])
+        return result["url"]
+
+    @staticmethod
+    def _count(conditions) -> object:
+        """Suma de COUNT(*) de las tablas de referencias, una condición por columna"""
+        counts = [select(func.count()).where(condition).scalar_subquery() for condition in conditions]
+        total = counts[0]
+        for count in counts[1:]:
+            total = total + count
+        return total
+
+    async def referenced_keys(self, db: AsyncSession, keys: Iterable[str] | None = None) -> set[str]:
+        """sha256 en uso por alguna fila (de `keys`, o de todos los blobs si es None)"""
+        selects = []
+        for column in REFERENCE_KEYS:
+            stmt = select(column).where(column.is_not(None))
+            if keys is not None:
+                stmt = stmt.where(column.in_(set(keys)))
+            selects.append(stmt)
+        result = await db.execute(union(*selects))
+        return set(result.scalars())
+
+    async def references(self, db: AsyncSession, url: str) -> int:
+        """
+        Cuántas filas usan una imagen: por sha256 (igualdad sobre columnas
+        indexadas) o, para archivos anteriores al almacenamiento por
+        contenido, buscando la URL en cada tabla
+        """
+        digest = blob_key(url)
+        if digest:
+            total = self._count(column == digest for column in REFERENCE_KEYS)
+        else:
+            total = self._count(column.contains(url) for column in REFERENCE_COLUMNS)
+        result = await db.execute(select(total))
+        return result.scalar_one()
+
+    async def forget(self, db: AsyncSession, storage: str, sha256: str) -> None:
+        """Borra el registro de un blob (cuando se eliminó el archivo; no hace commit)"""
+        await db.execute(
+            ImageBlob.__table__.delete().where(ImageBlob.sha256 == sha256, ImageBlob.storage == storage)
+        )
+
+    def stats(self) -> dict:
+        return {
+            "stored": self._stored,
+            "deduplicated": self._deduplicated,
+            "bytes_saved": self._bytes_saved,
+        }
+
+
+# Instancia singleton
+image_store = ImageStore(UPLOAD_DIR, CLOUDINARY_FOLDER)
@@ -0,0 +1,183 @@
+"""
+Image Variants
+Versiones reducidas de las imágenes guardadas localmente (modo desarrollo /
+sin Cloudinary): antes el storefront bajaba la foto original en cada card.
+
+- Presets de tamaño fijo (thumb, card, detail) en WebP o JPEG, generados con
+  Pillow en un pool de procesos (el resize usa CPU y no debe frenar el event
+  loop ni competir por el GIL).
+- Cache en disco por hash del original + preset: la misma foto subida dos
+  veces comparte sus variantes, y un original reemplazado no sirve variantes
+  viejas.
+- Se generan al pedirlas por primera vez (GET /uploads/variants/...) y, en
+  segundo plano, apenas se sube la imagen.
+
+Las URLs de las variantes se derivan de la URL de la imagen, sin consultar
+nada (ver utils/image_urls.py).
+"""
+import asyncio
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from app.config import settings
+from app.utils.image_urls import PRESETS, DEFAULT_FORMAT
+
+# Formato de salida -> (formato de Pillow, media type, calidad)
+FORMATS = {
+    "webp": ("WEBP", "image/webp", 80),
+    "jpg": ("JPEG", "image/jpeg", 82),
+}
+
+CACHE_DIR = Path("cache/variants")
+
+
+def render_variant(source: str, target: str, size: int, fmt: str) -> int:
+    """Genera una variante (corre en el pool de procesos); retorna los bytes escritos"""
+    from PIL import Image, ImageOps
+
+    pil_format, _, quality = FORMATS[fmt]
+    with Image.open(source) as original:
+        # JPEG: decodificar directo a una escala cercana (mucho más rápido que decodificar entero)
+        original.draft("RGB", (size, size))
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        if fmt == "jpg" or not has_alpha:
+            if has_alpha:
+                # JPEG no tiene transparencia: fondo blanco
+                rgba = image.convert("RGBA")
+                image = Image.new("RGB", rgba.size, (255, 255, 255))
+                image.paste(rgba, mask=rgba.getchannel("A"))
+            elif image.mode != "RGB":
+                image = image.convert("RGB")
+        elif image.mode != "RGBA":
+            image = image.convert("RGBA")
+
+        partial = f"{target}.{os.getpid()}.tmp"
+        try:
+            if pil_format == "JPEG":
+                image.save(partial, pil_format, quality=quality, optimize=True, progressive=True)
+            else:
+                image.save(partial, pil_format, quality=quality, method=4)
+            os.replace(partial, target)  # Atómico: otro proceso nunca ve un archivo a medias
+        finally:
+            if os.path.exists(partial):
+                os.unlink(partial)
+    return os.path.getsize(target)
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ImageVariants:
+    def __init__(self, cache_dir: Path, workers: int, eager: bool = True):
+        self.cache_dir = cache_dir
+        self.workers = max(1, workers)
+        self.eager = eager
+        self._pool: ProcessPoolExecutor | None = None
+        # (ruta, mtime, tamaño) -> sha256 del original
+        self._hashes: dict[tuple, str] = {}
+        # Generaciones en curso (un solo render por variante aunque lleguen varios requests)
+        self._inflight: dict[Path, asyncio.Future] = {}
+        self._background: set[asyncio.Task] = set()
+        # Métricas del proceso
+        self._generated = 0
+        self._generated_bytes = 0
+        self._hits = 0
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: los workers no heredan threads ni conexiones del proceso de la app
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def shutdown(self) -> None:
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def source_hash(self, source: Path, known: str | None = None) -> str:
+        """sha256 del original, memorizado por ruta + mtime + tamaño"""
+        stat = await asyncio.to_thread(source.stat)
+        key = (str(source), stat.st_mtime_ns, stat.st_size)
+        digest = known or self._hashes.get(key)
+        if digest is None:
+            digest = await asyncio.to_thread(_sha256_file, str(source))
+        self._hashes[key] = digest
+        return digest
+
+    def cache_path(self, digest: str, preset: str, fmt: str) -> Path:
+        return self.cache_dir / digest[:2] / f"{digest}-{preset}.{fmt}"
+
+    async def get(self, source: Path, preset: str, fmt: str, digest: str | None = None) -> Path:
+        """Ruta de la variante, generándola si todavía no está en cache"""
+        target = self.cache_path(await self.source_hash(source, digest), preset, fmt)
+        if await asyncio.to_thread(target.exists):
+            self._hits += 1
+            return target
+
+        future = self._inflight.get(target)
+        if future is None:
+            future = asyncio.ensure_future(self._render(source, target, preset, fmt))
+            self._inflight[target] = future
+            future.add_done_callback(lambda _: self._inflight.pop(target, None))
+        await asyncio.shield(future)
+        return target
+
+    async def _render(self, source: Path, target: Path, preset: str, fmt: str) -> None:
+        await asyncio.to_thread(target.parent.mkdir, parents=True, exist_ok=True)
+        loop = asyncio.get_running_loop()
+        written = await loop.run_in_executor(
+            self.pool, render_variant, str(source), str(target), PRESETS[preset], fmt
+        )
+        self._generated += 1
+        self._generated_bytes += written
+
+    def schedule(self, source: Path, digest: str | None = None) -> None:
+        """Genera en segundo plano las variantes por defecto de una imagen recién subida"""
+        if not self.eager:
+            return
+
+        async def generate() -> None:
+            for preset in PRESETS:
+                try:
+                    await self.get(source, preset, DEFAULT_FORMAT, digest)
+                except Exception as e:
+                    print(f"[ImageVariants] No se pudo generar {preset} de {source.name}: {e!r}")
+                    return
+
+        task = asyncio.create_task(generate())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "generated": self._generated,
+            "generated_bytes": self._generated_bytes,
+            "cache_hits": self._hits,
+            "in_progress": len(self._inflight),
+        }
+
+
+# Instancia singleton (el pool de procesos se crea en el primer uso)
+image_variants = ImageVariants(
+    CACHE_DIR,
+    workers=settings.IMAGE_VARIANT_WORKERS or max(1, (os.cpu_count() or 2) // 2),
+    eager=settings.IMAGE_VARIANTS_EAGER,
+)
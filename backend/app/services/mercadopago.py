@@ -1,18 +1,110 @@
 """
 MercadoPago Integration Service
+Cliente async sobre la API REST de MercadoPago (httpx): un pool de conexiones
+compartido por worker, timeouts por llamada y reintentos con backoff
+exponencial + jitter ante 429/5xx y errores de red. Una respuesta lenta de
+MercadoPago ya no bloquea el event loop.
+
+MERCADOPAGO_API_URL permite apuntar a un servidor falso local
+(ver fake_mercadopago.py).
 """
-import mercadopago
-from decimal import Decimal
+import asyncio
+import random
+import uuid
+import httpx
 from app.config import settings
 from app.models.order import Order
 
 
+class MercadoPagoError(Exception):
+    """Error de la API de MercadoPago (status y cuerpo de la respuesta)"""
+
+    def __init__(self, message: str, status_code: int | None = None, body: str | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+
+def is_payment_id(value: str) -> bool:
+    """Los IDs de pago de MercadoPago son numéricos (van tal cual en la URL)"""
+    return value.isascii() and value.isdigit() and len(value) <= 20
+
+
 class MercadoPagoService:
-    def __init__(self):
-        self.sdk = mercadopago.SDK(settings.MERCADOPAGO_ACCESS_TOKEN)
-    
-    def create_preference(self, order: Order, items: list[dict]) -> dict:
-        """Create a MercadoPago payment preference"""
+    # Respuestas que vale la pena reintentar (además de timeouts y errores de red)
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        access_token: str,
+        base_url: str,
+        timeout: float,
+        max_retries: int,
+        backoff_base: float = 0.25,
+        backoff_max: float = 4.0,
+    ):
+        self.access_token = access_token
+        self.base_url = base_url.rstrip("/")
+        self.timeout = httpx.Timeout(timeout, connect=min(timeout, 5.0))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Cliente compartido (se crea en el primer uso, dentro del event loop)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                headers={"Authorization": f"Bearer {self.access_token}"} if self.access_token else None,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _backoff(self, attempt: int, retry_after: str | None = None) -> float:
+        """Full jitter: espera aleatoria en [0, base * 2^intento] (respeta Retry-After)"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _request(self, method: str, path: str, **kwargs) -> dict:
+        headers = kwargs.pop("headers", {})
+        if method == "POST":
+            # La misma clave en todos los intentos: MercadoPago no duplica la operación
+            headers.setdefault("X-Idempotency-Key", str(uuid.uuid4()))
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = await self.client.request(method, path, headers=headers, **kwargs)
+            except (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError) as e:
+                if last_attempt:
+                    raise MercadoPagoError(f"MercadoPago no responde: {e!r}")
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code in self.RETRY_STATUSES and not last_attempt:
+                await asyncio.sleep(self._backoff(attempt, response.headers.get("Retry-After")))
+                continue
+            if response.status_code >= 400:
+                raise MercadoPagoError(
+                    f"MercadoPago respondió {response.status_code} en {method} {path}",
+                    status_code=response.status_code,
+                    body=response.text,
+                )
+            return response.json()
+
+    def _preference_data(self, order: Order, items: list[dict]) -> dict:
         preference_data = {
             "items": [
                 {
@@ -39,39 +131,32 @@ class MercadoPagoService:
             "notification_url": f"{settings.FRONTEND_URL}/api/payments/webhook",
             "statement_descriptor": "MALDONADO REPUESTOS",
         }
-        
+
         # Add shipping if applicable
         if order.shipping_cost > 0:
             preference_data["shipments"] = {
                 "cost": float(order.shipping_cost),
                 "mode": "not_specified",
             }
-        
-        preference_response = self.sdk.preference().create(preference_data)
-        
-        if preference_response["status"] != 201:
-            raise Exception(f"Error creating preference: {preference_response}")
-        
-        return preference_response["response"]
-    
-    def get_payment(self, payment_id: str) -> dict:
+        return preference_data
+
+    async def create_preference(self, order: Order, items: list[dict]) -> dict:
+        """Create a MercadoPago payment preference"""
+        return await self._request(
+            "POST", "/checkout/preferences", json=self._preference_data(order, items)
+        )
+
+    async def get_payment(self, payment_id: str) -> dict:
         """Get payment details from MercadoPago"""
-        payment_response = self.sdk.payment().get(payment_id)
-        
-        if payment_response["status"] != 200:
-            raise Exception(f"Error getting payment: {payment_response}")
-        
-        return payment_response["response"]
-    
-    def process_webhook(self, data: dict) -> dict | None:
-        """Process MercadoPago webhook notification"""
-        if data.get("type") == "payment":
-            payment_id = data.get("data", {}).get("id")
-            if payment_id:
-                return self.get_payment(payment_id)
-        return None
+        if not is_payment_id(payment_id):
+            raise MercadoPagoError(f"ID de pago inválido: {payment_id!r}")
+        return await self._request("GET", f"/v1/payments/{payment_id}")
 
 
 # Singleton instance
-mercadopago_service = MercadoPagoService()
-
+mercadopago_service = MercadoPagoService(
+    access_token=settings.MERCADOPAGO_ACCESS_TOKEN,
+    base_url=settings.MERCADOPAGO_API_URL,
+    timeout=settings.MERCADOPAGO_TIMEOUT_SECONDS,
+    max_retries=settings.MERCADOPAGO_MAX_RETRIES,
+)
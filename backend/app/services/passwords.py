@@ -0,0 +1,55 @@
+"""
+Password Service
+bcrypt tarda ~250 ms por operación y bloquea el thread que lo llama. Este
+servicio lo corre en un pool de threads propio (bcrypt libera el GIL), con un
+máximo de operaciones simultáneas por worker y una espera máxima en cola:
+durante una ráfaga de logins el event loop sigue atendiendo el catálogo.
+Si no se libera un thread a tiempo lanza PasswordServiceBusy (la API
+responde 503).
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from app.config import settings
+from app.utils.security import verify_password, get_password_hash, password_needs_rehash
+
+
+class PasswordServiceBusy(Exception):
+    """Todos los threads de bcrypt siguieron ocupados durante queue_timeout"""
+
+
+class PasswordService:
+    """Hash y verificación de passwords sin bloquear el event loop"""
+
+    def __init__(self, max_workers: int, queue_timeout: float):
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        # Una operación por thread; el resto espera su turno hasta queue_timeout
+        self._slots = asyncio.Semaphore(max_workers)
+
+    async def _run(self, fn, *args):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise PasswordServiceBusy(f"Sin thread de bcrypt libre en {self.queue_timeout} s")
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, password, hashed_password)
+
+    @staticmethod
+    def needs_rehash(hashed_password: str) -> bool:
+        return password_needs_rehash(hashed_password)
+
+
+# Instancia singleton (un pool por worker)
+password_service = PasswordService(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    queue_timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT,
+)
@@ -0,0 +1,346 @@
+"""
+Payment Webhook Inbox
+El webhook de MercadoPago solo guarda la notificación (una fila por pago) y
+responde 200; un pool de workers en background consulta el pago y actualiza
+el pedido.
+
+- Deduplicación: notificaciones repetidas del mismo pago se agrupan en la
+  fila existente (INSERT ... ON CONFLICT sobre payment_id).
+- Varios procesos: cada worker toma una fila con UPDATE ... RETURNING
+  (FOR UPDATE SKIP LOCKED en PostgreSQL) y la marca PROCESSING con un lease;
+  si el proceso muere, la fila vuelve a la cola al vencer el lease.
+- Reintentos: backoff exponencial con jitter hasta PAYMENT_WEBHOOK_MAX_ATTEMPTS;
+  después queda FAILED (una nueva notificación del pago la reactiva).
+- Idempotencia: el estado se toma siempre del pago actual en MercadoPago y
+  las transiciones del pedido no retroceden (un rechazo tardío no cancela un
+  pedido pagado). Cancelar libera el stock del pedido (ver services/stock.py).
+"""
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, func, case, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.order import Order, OrderStatus
+from app.models.payment_webhook import PaymentWebhook, WebhookStatus
+from app.services.dashboard import dashboard_stats
+from app.services.mercadopago import mercadopago_service, is_payment_id
+from app.services.product_count import product_counter
+from app.services.response_cache import response_cache, CATALOG_PRODUCTS
+from app.services.stock import stock_service, shortage_message
+from app.utils.upsert import insert_for
+
+
+PW = PaymentWebhook
+_QUEUED = [WebhookStatus.PENDING, WebhookStatus.PROCESSING]
+_FINISHED = [WebhookStatus.DONE, WebhookStatus.FAILED]
+
+
+def _status(value: WebhookStatus):
+    """Estado como literal del tipo de la columna (dentro de CASE no se infiere)"""
+    return literal(value, PW.status.type)
+
+
+def payment_id_from_webhook(data: object) -> str | None:
+    """ID del pago de una notificación (None si no es de un pago o el cuerpo no es válido)"""
+    if not isinstance(data, dict) or data.get("type") != "payment":
+        return None
+    payload = data.get("data")
+    if not isinstance(payload, dict):
+        return None
+    payment_id = payload.get("id")
+    if isinstance(payment_id, bool) or not isinstance(payment_id, (int, str)):
+        return None
+    payment_id = str(payment_id)
+    return payment_id if is_payment_id(payment_id) else None
+
+
+async def apply_payment(db: AsyncSession, order: Order, payment: dict) -> bool:
+    """
+    Actualiza el pedido según el estado actual del pago (sin retroceder estados).
+    Devuelve True si cambió el stock (cancelación o reactivación).
+    """
+    payment_status = payment.get("status")
+    order.payment_id = str(payment.get("id"))
+    order.payment_status = payment_status
+
+    if payment_status == "approved":
+        if order.paid_at is None:
+            order.paid_at = datetime.utcnow()
+        if order.status in (OrderStatus.PENDING, OrderStatus.PAYMENT_PENDING):
+            order.status = OrderStatus.PAID
+        elif order.status == OrderStatus.CANCELLED:
+            # Un reintento de pago aprobado reactiva el pedido si todavía hay stock
+            shortages = await stock_service.set_order_status(db, order, OrderStatus.PAID)
+            if shortages:
+                print(f"[PaymentInbox] Pedido {order.order_number} pagado pero cancelado sin stock: "
+                      f"{shortage_message(shortages)}")
+                return False
+            return True
+    elif payment_status in ["rejected", "cancelled"]:
+        if order.status in (OrderStatus.PENDING, OrderStatus.PAYMENT_PENDING):
+            await stock_service.set_order_status(db, order, OrderStatus.CANCELLED)
+            return True
+    elif payment_status == "pending":
+        if order.status == OrderStatus.PENDING:
+            order.status = OrderStatus.PAYMENT_PENDING
+    return False
+
+
+class PaymentInbox:
+    def __init__(
+        self,
+        workers: int,
+        max_attempts: int,
+        retry_base: float,
+        retry_max: float,
+        lease_seconds: float,
+        poll_interval: float = 2.0,
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.lease = timedelta(seconds=lease_seconds)
+        self.poll_interval = poll_interval
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+        # Métricas del proceso (las de la cola salen de la base en stats())
+        self._processed = 0
+        self._retried = 0
+        self._failed = 0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+
+    # --- Recepción ---
+
+    async def enqueue(self, db: AsyncSession, payment_id: str, payload: dict) -> None:
+        """Guarda la notificación (o la agrupa con la pendiente del mismo pago) y hace commit"""
+        now = datetime.utcnow()
+        stmt = insert_for(db, PW).values(
+            payment_id=payment_id,
+            payload=json.dumps(payload),
+            notifications=1,
+            status=WebhookStatus.PENDING,
+            attempts=0,
+            received_at=now,
+            next_attempt_at=now,
+        )
+        finished = PW.status.in_(_FINISHED)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PW.payment_id],
+            set_={
+                "payload": stmt.excluded.payload,
+                "notifications": PW.notifications + 1,
+                # Una fila en proceso vuelve a PENDING: el worker la reencola al terminar
+                "status": WebhookStatus.PENDING,
+                # Las pendientes conservan su espera (backoff o lease); las terminadas arrancan de nuevo
+                "attempts": case((finished, 0), else_=PW.attempts),
+                "received_at": case((finished, now), else_=PW.received_at),
+                "next_attempt_at": case((finished, now), else_=PW.next_attempt_at),
+            },
+        )
+        await db.execute(stmt)
+        await db.commit()
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # --- Workers ---
+
+    async def start(self) -> None:
+        if self._tasks or self.workers <= 0:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._run(n), name=f"payment-inbox-{n}")
+            for n in range(self.workers)
+        ]
+        print(f"[PaymentInbox] {self.workers} workers iniciados")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeup = None
+
+    async def _run(self, n: int) -> None:
+        while True:
+            # Limpiar antes de leer la cola: un enqueue() durante la lectura no se pierde
+            self._wakeup.clear()
+            try:
+                claimed = await self._claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[PaymentInbox] Error leyendo la cola: {e!r}")
+                claimed = None
+
+            if claimed is None:
+                # Sin trabajo: esperar una notificación de este proceso o el próximo poll
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._handle(*claimed)
+
+    async def _claim(self) -> tuple[int, str, int, datetime] | None:
+        """Toma la próxima fila lista (pendiente o con lease vencido) y la marca PROCESSING"""
+        now = datetime.utcnow()
+        ready = (PW.status.in_(_QUEUED)) & (PW.next_attempt_at <= now)
+        candidate = (
+            select(PW.id)
+            .where(ready)
+            .order_by(PW.next_attempt_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(PW)
+            .where(PW.id == candidate, ready)
+            .values(
+                status=WebhookStatus.PROCESSING,
+                attempts=PW.attempts + 1,
+                next_attempt_at=now + self.lease,
+            )
+            .returning(PW.id, PW.payment_id, PW.attempts, PW.received_at)
+            .execution_options(synchronize_session=False)
+        )
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(stmt)).first()
+            await db.commit()
+        return tuple(row) if row else None
+
+    async def _process(self, payment_id: str) -> None:
+        payment = await mercadopago_service.get_payment(payment_id)
+        external_reference = payment.get("external_reference")
+        if not external_reference:
+            return
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Order).where(Order.order_number == external_reference)
+            )
+            order = result.scalar_one_or_none()
+            if order:
+                stock_changed = await apply_payment(db, order, payment)
+                await db.commit()
+                dashboard_stats.invalidate()
+                if stock_changed:
+                    product_counter.invalidate()
+                    await response_cache.invalidate(CATALOG_PRODUCTS)
+
+    def _backoff(self, attempts: int) -> float:
+        """Exponencial con jitter: entre la mitad y el total de base * 2^(intentos-1)"""
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def _handle(self, webhook_id: int, payment_id: str, attempts: int, received_at: datetime) -> None:
+        try:
+            await self._process(payment_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            give_up = attempts >= self.max_attempts
+            retry_at = datetime.utcnow() + timedelta(seconds=self._backoff(attempts))
+            values = {
+                "status": case(
+                    (PW.status == WebhookStatus.PROCESSING,
+                     _status(WebhookStatus.FAILED if give_up else WebhookStatus.PENDING)),
+                    else_=PW.status,
+                ),
+                "next_attempt_at": case(
+                    (PW.status == WebhookStatus.PROCESSING, retry_at),
+                    else_=datetime.utcnow(),
+                ),
+                "last_error": error[:1000],
+            }
+            if give_up:
+                self._failed += 1
+                print(f"[PaymentInbox] Pago {payment_id}: FAILED tras {attempts} intentos ({error})")
+            else:
+                self._retried += 1
+                print(f"[PaymentInbox] Pago {payment_id}: intento {attempts} falló ({error}), reintento {retry_at:%H:%M:%S}")
+        else:
+            now = datetime.utcnow()
+            lag = (now - received_at).total_seconds()
+            self._processed += 1
+            self._lag_total += lag
+            self._lag_max = max(self._lag_max, lag)
+            # Si llegó otra notificación durante el proceso, la fila quedó PENDING: se reprocesa ya
+            values = {
+                "status": case(
+                    (PW.status == WebhookStatus.PROCESSING, _status(WebhookStatus.DONE)),
+                    else_=PW.status,
+                ),
+                "next_attempt_at": now,
+                "processed_at": now,
+                "last_error": None,
+            }
+
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(PW)
+                    .where(PW.id == webhook_id)
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+        except Exception as e:
+            # La fila vuelve a la cola cuando vence el lease
+            print(f"[PaymentInbox] Error actualizando webhook {webhook_id}: {e!r}")
+
+    # --- Métricas ---
+
+    async def stats(self, db: AsyncSession) -> dict:
+        """Profundidad de la cola (global) y lag de procesamiento (de este proceso)"""
+        now = datetime.utcnow()
+        result = await db.execute(
+            select(
+                func.count().filter(PW.status == WebhookStatus.PENDING).label("pending"),
+                func.count().filter(
+                    (PW.status == WebhookStatus.PENDING) & (PW.next_attempt_at <= now)
+                ).label("ready"),
+                func.count().filter(PW.status == WebhookStatus.PROCESSING).label("processing"),
+                func.count().filter(PW.status == WebhookStatus.FAILED).label("failed"),
+                func.min(PW.received_at).filter(PW.status.in_(_QUEUED)).label("oldest"),
+            )
+        )
+        row = result.one()
+        oldest = row.oldest
+        if isinstance(oldest, str):  # SQLite devuelve texto en agregados
+            oldest = datetime.fromisoformat(oldest)
+        return {
+            "queue": {
+                "pending": row.pending,
+                "ready": row.ready,
+                "processing": row.processing,
+                "failed": row.failed,
+                "oldest_pending_seconds": round((now - oldest).total_seconds(), 3) if oldest else 0.0,
+            },
+            "worker": {
+                "workers": len(self._tasks),
+                "processed": self._processed,
+                "retried": self._retried,
+                "failed": self._failed,
+                "avg_lag_seconds": round(self._lag_total / self._processed, 3) if self._processed else 0.0,
+                "max_lag_seconds": round(self._lag_max, 3),
+            },
+        }
+
+
+# Instancia singleton (los workers se inician en el lifespan de la app)
+payment_inbox = PaymentInbox(
+    workers=settings.PAYMENT_WEBHOOK_WORKERS,
+    max_attempts=settings.PAYMENT_WEBHOOK_MAX_ATTEMPTS,
+    retry_base=settings.PAYMENT_WEBHOOK_RETRY_SECONDS,
+    retry_max=settings.PAYMENT_WEBHOOK_RETRY_MAX_SECONDS,
+    lease_seconds=settings.PAYMENT_WEBHOOK_LEASE_SECONDS,
+)
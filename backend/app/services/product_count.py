@@ -0,0 +1,116 @@
+"""
+Product Count Service
+Estrategias para el total de los listados de productos (evita el COUNT(*)
+duplicado en cada request):
+- exact: COUNT(*) cacheado por conjunto de filtros normalizado
+- estimate: filas estimadas por el planner de PostgreSQL (EXPLAIN), sin recorrer la tabla
+- none: sin total (clientes con scroll infinito)
+También arma la query de categorías con su cantidad de productos (un solo GROUP BY).
+"""
+import json
+from sqlalchemy import Select, select, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models.category import Category
+from app.models.product import Product
+from app.utils.cache import TTLCache
+
+
+COUNT_EXACT = "exact"
+COUNT_ESTIMATE = "estimate"
+COUNT_NONE = "none"
+
+# Filtros que la query compara sin distinguir mayúsculas ni espacios (el
+# resto, como category_slug, se compara tal cual y va a la clave sin cambios)
+CASE_INSENSITIVE_FILTERS = frozenset({"q", "codes"})
+
+
+def filters_key(scope: str, **filters) -> tuple:
+    """Clave normalizada: ignora filtros vacíos y el orden de los parámetros"""
+    normalized = []
+    for name, value in sorted(filters.items()):
+        if value is None or value == "":
+            continue
+        if name in CASE_INSENSITIVE_FILTERS:
+            value = value.strip().lower()
+        normalized.append((name, value))
+    return (scope, *normalized)
+
+
+def categories_with_counts(active_products_only: bool = True) -> Select:
+    """
+    (Category, products_count) en una sola query, en lugar de un COUNT por categoría.
+    El LEFT JOIN mantiene las categorías sin productos (count 0).
+    """
+    join_condition = Product.category_id == Category.id
+    if active_products_only:
+        join_condition = and_(join_condition, Product.is_active == True)
+    return (
+        select(Category, func.count(Product.id).label("products_count"))
+        .outerjoin(Product, join_condition)
+        .group_by(Category.id)
+    )
+
+
+class ProductCounter:
+    """Calcula (o estima) el total de un listado de productos"""
+
+    def __init__(self, ttl: int, maxsize: int = 2048):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def invalidate(self) -> None:
+        """Llamar cuando cambian productos (alta, edición, baja, stock)"""
+        self._cache.clear()
+
+    async def count(
+        self,
+        db: AsyncSession,
+        query: Select,
+        key: tuple,
+        mode: str = COUNT_EXACT,
+    ) -> tuple[int | None, str]:
+        """
+        Returns:
+            (total, modo efectivamente usado)
+        """
+        if mode == COUNT_NONE:
+            return None, COUNT_NONE
+
+        if mode == COUNT_ESTIMATE and db.bind.dialect.name == "postgresql":
+            estimate = await self._estimate(db, query)
+            if estimate is not None:
+                return estimate, COUNT_ESTIMATE
+
+        total = self._cache.get(key)
+        if total is None:
+            result = await db.execute(
+                select(func.count()).select_from(query.order_by(None).subquery())
+            )
+            total = result.scalar() or 0
+            self._cache.set(key, total)
+        return total, COUNT_EXACT
+
+    @staticmethod
+    async def _estimate(db: AsyncSession, query: Select) -> int | None:
+        """Filas estimadas por el planner (usa las estadísticas de ANALYZE)"""
+        try:
+            compiled = query.order_by(None).compile(
+                dialect=db.bind.dialect,
+                compile_kwargs={"literal_binds": True},
+            )
+            # Savepoint: un error no debe abortar la transacción del request
+            async with db.begin_nested():
+                conn = await db.connection()
+                result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+                plan = result.scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+        except Exception as e:
+            # Si el plan no se puede obtener, se cae al conteo exacto
+            print(f"[Count] No se pudo estimar el total: {e}")
+            return None
+
+
+# Instancia singleton (una cache por worker)
+product_counter = ProductCounter(ttl=settings.PRODUCT_COUNT_CACHE_SECONDS)
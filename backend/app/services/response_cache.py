@@ -0,0 +1,286 @@
+"""
+Response Cache Service
+Cache de respuestas del catálogo público (productos, categorías, banners).
+Guarda el JSON ya serializado, con el path + query string normalizado como clave,
+y se invalida por namespace desde los endpoints del admin que modifican datos.
+
+Cada namespace tiene un número de versión que sube con cada invalidación. El
+ETag sale de la versión + la clave, así un If-None-Match se contesta con 304
+antes de consultar la base (y aunque la respuesta ya no esté en la cache).
+
+Backends:
+- memoria (default): LRU con TTL por worker; el TTL acota cuánto puede quedar
+  desactualizado un worker que no recibió la invalidación. La versión es del
+  worker (un ETag de otro worker no coincide) y se renueva al pasar el TTL.
+- Redis (opcional, RESPONSE_CACHE_URL=redis://...): compartida entre workers
+  (también la versión, así cualquier worker responde 304), requiere el
+  paquete `redis`. El backend en memoria implementa la misma interfaz
+  y sirve como reemplazo local.
+"""
+import hashlib
+import os
+import time
+from fastapi import Request, Response
+from app.config import settings
+from app.utils.cache import TTLCache
+
+
+# Namespaces (se invalidan juntos)
+CATALOG_PRODUCTS = "products"
+CATALOG_CATEGORIES = "categories"
+CATALOG_BANNERS = "banners"
+
+# ETag: hash de 16 bytes en hex, entre comillas
+ETAG_BYTES = 16
+ETAG_LENGTH = ETAG_BYTES * 2 + 2
+
+# Atributo de request.state con el ETag calculado en get() (lo usa store())
+_STATE_ETAG = "response_cache_etag"
+
+
+class MemoryBackend:
+    """Una TTLCache por namespace (invalidar = vaciar el namespace y subir su versión)"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._namespaces: dict[str, TTLCache] = {}
+        # namespace -> (versión, cuándo empezó); el prefijo distingue a este worker
+        self._versions: dict[str, tuple[int, float]] = {}
+        self._worker = os.urandom(4).hex()
+
+    async def version(self, namespace: str, ttl: int) -> str:
+        """
+        Versión actual del namespace. Vence a los `ttl` segundos: este worker
+        no se entera de las invalidaciones de los otros, y así no responde
+        304 (ni sirve la cache) por más tiempo que el TTL.
+        """
+        now = time.monotonic()
+        current = self._versions.get(namespace)
+        if current is None or now - current[1] >= ttl:
+            current = self._bump(namespace, now)
+        return f"{self._worker}.{current[0]}"
+
+    def _bump(self, namespace: str, now: float) -> tuple[int, float]:
+        previous = self._versions.get(namespace)
+        current = self._versions[namespace] = ((previous[0] if previous else 0) + 1, now)
+        cache = self._namespaces.get(namespace)
+        if cache is not None:
+            cache.clear()
+        return current
+
+    async def get(self, namespace: str, key: str) -> bytes | None:
+        cache = self._namespaces.get(namespace)
+        return cache.get(key) if cache is not None else None
+
+    async def set(self, namespace: str, key: str, value: bytes, ttl: int) -> None:
+        cache = self._namespaces.get(namespace)
+        if cache is None:
+            cache = self._namespaces[namespace] = TTLCache(maxsize=self.maxsize, ttl=ttl)
+        cache.set(key, value, ttl)
+
+    async def invalidate(self, namespace: str) -> None:
+        self._bump(namespace, time.monotonic())
+
+
+class RedisBackend:
+    """
+    Un hash de Redis por namespace y un contador con su versión: invalidar
+    es un DEL + INCR. Cada valor lleva su vencimiento (epoch) adelante:
+    'vence|json'.
+    """
+
+    def __init__(self, url: str, maxsize: int, prefix: str = "maldonado:resp"):
+        import redis.asyncio as redis  # Dependencia opcional
+
+        self._client = redis.from_url(url)
+        self.maxsize = maxsize
+        self.prefix = prefix
+
+    def _hash(self, namespace: str) -> str:
+        return f"{self.prefix}:{namespace}"
+
+    async def version(self, namespace: str, ttl: int) -> str:
+        """Versión compartida por todos los workers (la invalidación les llega a todos)"""
+        value = await self._client.get(f"{self._hash(namespace)}:version")
+        return value.decode("ascii") if value is not None else "0"
+
+    async def get(self, namespace: str, key: str) -> bytes | None:
+        raw = await self._client.hget(self._hash(namespace), key)
+        if raw is None:
+            return None
+        expires_at, _, value = raw.partition(b"|")
+        if float(expires_at) < time.time():
+            return None
+        return value
+
+    async def set(self, namespace: str, key: str, value: bytes, ttl: int) -> None:
+        name = self._hash(namespace)
+        expires_at = f"{time.time() + ttl:.3f}|".encode("ascii")
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.hset(name, key, expires_at + value)
+            pipe.expire(name, ttl)
+            pipe.hlen(name)
+            _, _, size = await pipe.execute()
+        # Sin LRU por campo: si el namespace crece de más, se descarta entero
+        if size > self.maxsize:
+            await self._client.delete(name)
+
+    async def invalidate(self, namespace: str) -> None:
+        name = self._hash(namespace)
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.delete(name)
+            pipe.incr(f"{name}:version")
+            await pipe.execute()
+
+
+class ResponseCache:
+    """
+    Cache de respuestas JSON serializadas con contadores de hits/misses.
+    Cada respuesta lleva un ETag fuerte derivado de la versión del namespace
+    y de la clave: un If-None-Match que coincide se responde 304 antes de
+    leer la cache o la base. El ETag también va guardado adelante del JSON;
+    si no es el de la versión actual (se guardó durante una invalidación),
+    la entrada no se usa.
+    """
+
+    def __init__(self, backend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self._hits: dict[str, int] = {}
+        self._misses: dict[str, int] = {}
+        self._not_modified: dict[str, int] = {}
+
+    @staticmethod
+    def key(request: Request) -> str:
+        """Path + query string con los parámetros ordenados"""
+        params = "&".join(
+            f"{name}={value}" for name, value in sorted(request.query_params.multi_items())
+        )
+        return f"{request.url.path}?{params}"
+
+    @staticmethod
+    def _digest(data: bytes) -> str:
+        return '"' + hashlib.blake2b(data, digest_size=ETAG_BYTES).hexdigest() + '"'
+
+    @classmethod
+    def etag(cls, namespace: str, version: str, key: str) -> str:
+        return cls._digest(f"{namespace}:{version}:{key}".encode("utf-8"))
+
+    @staticmethod
+    def _matches(request: Request, etag: str) -> bool:
+        """If-None-Match (comparación débil, como pide el RFC 9110)"""
+        header = request.headers.get("if-none-match")
+        if not header:
+            return False
+        if header.strip() == "*":
+            return True
+        return any(
+            candidate.strip().removeprefix("W/") == etag
+            for candidate in header.split(",")
+        )
+
+    async def get(
+        self,
+        namespace: str,
+        request: Request,
+        ttl: int,
+        headers: dict[str, str] | None = None,
+    ) -> Response | None:
+        """Respuesta cacheada (200 o 304), o None si hay que generarla"""
+        if not self.enabled:
+            return None
+        key = self.key(request)
+        try:
+            version = await self.backend.version(namespace, ttl)
+        except Exception as e:
+            # Si el backend falla se sirve desde la base de datos
+            print(f"[ResponseCache] Error leyendo {namespace}: {e}")
+            return None
+        etag = self.etag(namespace, version, key)
+        setattr(request.state, _STATE_ETAG, etag)
+        if self._matches(request, etag):
+            # El cliente ya tiene esta versión: ni cache ni base
+            return self._response(namespace, request, b"", etag, headers, "HIT")
+
+        try:
+            value = await self.backend.get(namespace, key)
+        except Exception as e:
+            print(f"[ResponseCache] Error leyendo {namespace}: {e}")
+            value = None
+        # El ETag va adelante del JSON, con largo fijo
+        if value is None or value[:ETAG_LENGTH] != etag.encode("ascii"):
+            self._misses[namespace] = self._misses.get(namespace, 0) + 1
+            return None
+        self._hits[namespace] = self._hits.get(namespace, 0) + 1
+        return self._response(namespace, request, value[ETAG_LENGTH:], etag, headers, "HIT")
+
+    async def store(
+        self,
+        namespace: str,
+        request: Request,
+        body: bytes,
+        ttl: int,
+        headers: dict[str, str] | None = None,
+    ) -> Response:
+        """Guarda el JSON serializado y devuelve la respuesta a enviar"""
+        etag = getattr(request.state, _STATE_ETAG, None)
+        if etag is None:
+            # Cache deshabilitada o backend caído: ETag por contenido, sin guardar
+            etag = self._digest(body)
+        else:
+            try:
+                await self.backend.set(namespace, self.key(request), etag.encode("ascii") + body, ttl)
+            except Exception as e:
+                print(f"[ResponseCache] Error guardando {namespace}: {e}")
+        return self._response(namespace, request, body, etag, headers, "MISS")
+
+    async def invalidate(self, *namespaces: str) -> None:
+        """Llamar después de cada alta/edición/baja que afecte al catálogo"""
+        for namespace in namespaces:
+            try:
+                await self.backend.invalidate(namespace)
+            except Exception as e:
+                print(f"[ResponseCache] Error invalidando {namespace}: {e}")
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Hits, misses y 304 por namespace (de este worker)"""
+        return {
+            namespace: {
+                "hits": self._hits.get(namespace, 0),
+                "misses": self._misses.get(namespace, 0),
+                "not_modified": self._not_modified.get(namespace, 0),
+            }
+            for namespace in sorted(set(self._hits) | set(self._misses) | set(self._not_modified))
+        }
+
+    def _response(
+        self,
+        namespace: str,
+        request: Request,
+        body: bytes,
+        etag: str,
+        headers: dict[str, str] | None,
+        status: str,
+    ) -> Response:
+        if self._matches(request, etag):
+            self._not_modified[namespace] = self._not_modified.get(namespace, 0) + 1
+            response = Response(status_code=304, headers=headers)
+        else:
+            response = Response(content=body, media_type="application/json", headers=headers)
+        response.headers["ETag"] = etag
+        response.headers["X-Cache"] = status
+        return response
+
+
+def _create_backend():
+    url = settings.RESPONSE_CACHE_URL.strip()
+    if url.startswith(("redis://", "rediss://")):
+        try:
+            return RedisBackend(url, settings.RESPONSE_CACHE_MAX_ENTRIES)
+        except ImportError:
+            print("[ResponseCache] Paquete 'redis' no instalado, usando cache en memoria")
+    return MemoryBackend(settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+
+# Instancia singleton
+response_cache = ResponseCache(_create_backend(), enabled=settings.RESPONSE_CACHE_ENABLED)
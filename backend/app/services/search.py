@@ -0,0 +1,200 @@
+"""
+Product Search Service
+Búsqueda full-text de productos, elegida automáticamente según el motor:
+- PostgreSQL: columna tsvector (config 'spanish' + unaccent) con índice GIN
+- SQLite (desarrollo): tabla virtual FTS5 sincronizada por triggers
+- Otros motores: ILIKE sobre nombre, código, marca y descripción (fallback)
+"""
+import re
+from sqlalchemy import Select, select, func, or_, case, false, table, column, text, literal_column
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.database import engine
+from app.models.product import Product
+from app.services.code_index import code_index
+
+
+# Máximo de términos que se envían al motor (evita queries gigantes)
+MAX_TERMS = 8
+
+# Máximo de coincidencias del índice de códigos que se suman al full-text
+CODE_STAGE_LIMIT = 50
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+# Configuración de text search (literal: también se usa en EXPLAIN con literal_binds)
+TS_CONFIG = literal_column("'spanish'::regconfig")
+
+# Tabla virtual FTS5 (solo SQLite)
+products_fts = table(
+    "products_fts",
+    column("rowid"),
+    column("products_fts"),
+)
+
+# DDL idempotente para PostgreSQL (también aplicado por la migración de Alembic)
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    # unaccent() es STABLE: el wrapper IMMUTABLE permite usarlo en triggers e índices
+    """
+    CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """,
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    """
+    CREATE OR REPLACE FUNCTION products_search_vector_update() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('spanish', immutable_unaccent(coalesce(NEW.code, ''))), 'A') ||
+            setweight(to_tsvector('spanish', immutable_unaccent(coalesce(NEW.name, ''))), 'A') ||
+            setweight(to_tsvector('spanish', immutable_unaccent(coalesce(NEW.brand, ''))), 'B') ||
+            setweight(to_tsvector('spanish', immutable_unaccent(coalesce(NEW.description, ''))), 'C');
+        RETURN NEW;
+    END
+    $$
+    """,
+    "DROP TRIGGER IF EXISTS products_search_vector_trigger ON products",
+    """
+    CREATE TRIGGER products_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF code, name, brand, description ON products
+    FOR EACH ROW EXECUTE FUNCTION products_search_vector_update()
+    """,
+    # Backfill de filas existentes (dispara el trigger)
+    "UPDATE products SET name = name WHERE search_vector IS NULL",
+    "CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING GIN (search_vector)",
+]
+
+# DDL para SQLite: índice FTS5 con contenido externo (la tabla products)
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        code, name, brand, description,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, code, name, brand, description)
+        VALUES (new.id, new.code, new.name, new.brand, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, code, name, brand, description)
+        VALUES ('delete', old.id, old.code, old.name, old.brand, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF code, name, brand, description ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, code, name, brand, description)
+        VALUES ('delete', old.id, old.code, old.name, old.brand, old.description);
+        INSERT INTO products_fts(rowid, code, name, brand, description)
+        VALUES (new.id, new.code, new.name, new.brand, new.description);
+    END
+    """,
+]
+
+
+class ProductSearchService:
+    """Aplica el filtro de búsqueda y el orden por relevancia según el dialecto"""
+
+    def __init__(self, dialect: str):
+        self.dialect = dialect
+
+    @staticmethod
+    def terms(q: str) -> list[str]:
+        """Normaliza la consulta a una lista de términos alfanuméricos"""
+        return _TERM_RE.findall(q.lower())[:MAX_TERMS]
+
+    async def ensure_schema(self, conn: AsyncConnection) -> None:
+        """Crea (si falta) la infraestructura de búsqueda para el motor actual"""
+        if self.dialect == "postgresql":
+            for statement in POSTGRES_DDL:
+                await conn.execute(text(statement))
+        elif self.dialect == "sqlite":
+            exists = await conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'")
+            )
+            is_new = exists.scalar() is None
+            for statement in SQLITE_DDL:
+                await conn.execute(text(statement))
+            if is_new:
+                # Indexar los productos que ya existían
+                await conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+
+    def apply(self, query: Select, q: str) -> tuple[Select, list]:
+        """
+        Filtra la query por el texto buscado.
+        Primera etapa: coincidencias del índice de códigos en memoria (prefijo,
+        infijo y errores de tipeo), que se suman al full-text y van primero.
+
+        Returns:
+            (query filtrada, cláusulas ORDER BY por relevancia)
+        """
+        code_ids = [product_id for product_id, _ in code_index.lookup(q, CODE_STAGE_LIMIT)]
+        code_match = Product.id.in_(code_ids) if code_ids else false()
+        # Posición en el ranking del índice de códigos; el resto después
+        code_order = case(
+            {product_id: pos for pos, product_id in enumerate(code_ids)},
+            value=Product.id,
+            else_=len(code_ids),
+        ) if code_ids else None
+
+        terms = self.terms(q)
+        if not terms:
+            query = query.where(code_match)
+            order = [Product.id]
+
+        elif self.dialect == "postgresql":
+            # Prefijo en cada término: "rodam skf" -> rodam:* & skf:*
+            ts_query = func.to_tsquery(
+                TS_CONFIG,
+                func.immutable_unaccent(" & ".join(f"{t}:*" for t in terms)),
+            )
+            # search_vector no está mapeada en el modelo (la mantiene un trigger)
+            search_vector = literal_column("products.search_vector")
+            query = query.where(or_(code_match, search_vector.op("@@")(ts_query)))
+            rank = func.ts_rank_cd(search_vector, ts_query)
+            order = [rank.desc(), Product.id]
+
+        elif self.dialect == "sqlite":
+            # Cada término entre comillas (escapa la sintaxis FTS5) y con prefijo
+            match = " ".join('"' + t.replace('"', '""') + '"*' for t in terms)
+            # bm25: menor = más relevante. Pesos: code, name, brand, description
+            fts_hits = (
+                select(
+                    products_fts.c.rowid,
+                    func.bm25(literal_column("products_fts"), 10.0, 10.0, 5.0, 1.0).label("rank"),
+                )
+                .where(products_fts.c.products_fts.op("MATCH")(match))
+                .subquery()
+            )
+            query = (
+                query
+                .outerjoin(fts_hits, fts_hits.c.rowid == Product.id)
+                .where(or_(code_match, fts_hits.c.rowid.is_not(None)))
+            )
+            order = [fts_hits.c.rank, Product.id]
+
+        else:
+            search_term = f"%{q}%"
+            query = query.where(
+                or_(
+                    code_match,
+                    Product.name.ilike(search_term),
+                    Product.code.ilike(search_term),
+                    Product.brand.ilike(search_term),
+                    Product.description.ilike(search_term),
+                )
+            )
+            order = [Product.name, Product.id]
+
+        if code_order is not None:
+            order.insert(0, code_order)
+        return query, order
+
+
+# Instancia singleton (el dialecto se detecta a partir del engine configurado)
+product_search = ProductSearchService(engine.dialect.name)
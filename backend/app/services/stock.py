@@ -0,0 +1,140 @@
+"""
+Stock Reservation Service
+Descuenta stock con un UPDATE condicional en la base en lugar de leer, validar
+en Python y escribir el valor nuevo (dos checkouts simultáneos podían pasar
+la validación y sobrevender).
+
+- reserve(): un solo UPDATE products SET stock = stock - q WHERE stock >= q
+  para todas las líneas (CASE por id) con RETURNING; las líneas que no
+  vuelven no tenían stock. Es todo o nada: si falta alguna se devuelven
+  las ya descontadas en la misma transacción y se informan los faltantes.
+- En PostgreSQL las filas se bloquean antes en orden de id (SELECT ... FOR
+  UPDATE), así dos pedidos con productos en común no se bloquean mutuamente.
+- Cancelar un pedido libera su stock una sola vez: el cambio de estado es un
+  UPDATE condicional sobre orders, y solo quien lo gana devuelve el stock.
+"""
+from typing import NamedTuple
+from sqlalchemy import select, update, case
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.product import Product
+
+
+class StockShortage(NamedTuple):
+    product_id: int
+    name: str
+    requested: int
+    available: int
+
+
+def shortage_message(shortages: list[StockShortage]) -> str:
+    return "Stock insuficiente. " + "; ".join(
+        f"'{s.name}': disponible {s.available}" for s in shortages
+    )
+
+
+class StockService:
+    async def _adjust(self, db: AsyncSession, lines: dict[int, int], sign: int) -> set[int]:
+        """stock += sign * q para cada línea (si sign < 0, solo donde alcanza); ids actualizados"""
+        if not lines:
+            return set()
+        quantity = case(lines, value=Product.id)
+        stmt = (
+            update(Product)
+            .where(Product.id.in_(lines))
+            .values(stock=Product.stock + sign * quantity)
+            .returning(Product.id)
+            .execution_options(synchronize_session=False)
+        )
+        if sign < 0:
+            stmt = stmt.where(Product.stock >= quantity)
+        result = await db.execute(stmt)
+        return set(result.scalars().all())
+
+    async def reserve(self, db: AsyncSession, lines: dict[int, int]) -> list[StockShortage]:
+        """Descuenta product_id -> cantidad; lista vacía si se reservó todo (no hace commit)"""
+        # Bloqueo en orden de id (SQLite no lo necesita: las escrituras ya son seriales)
+        if db.bind.dialect.name == "postgresql":
+            await db.execute(
+                select(Product.id).where(Product.id.in_(lines)).order_by(Product.id).with_for_update()
+            )
+        reserved = await self._adjust(db, lines, -1)
+        if len(reserved) == len(lines):
+            return []
+
+        # Todo o nada: devolver lo descontado e informar lo que faltó
+        await self._adjust(db, {pid: lines[pid] for pid in reserved}, 1)
+        missing = [pid for pid in lines if pid not in reserved]
+        result = await db.execute(
+            select(Product.id, Product.name, Product.stock).where(Product.id.in_(missing))
+        )
+        found = {row.id: row for row in result.all()}
+        return [
+            StockShortage(
+                product_id=pid,
+                name=found[pid].name if pid in found else str(pid),
+                requested=lines[pid],
+                available=found[pid].stock if pid in found else 0,
+            )
+            for pid in sorted(missing)
+        ]
+
+    async def release(self, db: AsyncSession, lines: dict[int, int]) -> None:
+        """Devuelve product_id -> cantidad al stock (no hace commit)"""
+        await self._adjust(db, lines, 1)
+
+    async def _order_lines(self, db: AsyncSession, order_id: int) -> dict[int, int]:
+        # Items de productos eliminados (product_id NULL) ya no tienen stock que mover
+        result = await db.execute(
+            select(OrderItem.product_id, OrderItem.quantity).where(
+                OrderItem.order_id == order_id, OrderItem.product_id.is_not(None)
+            )
+        )
+        lines: dict[int, int] = {}
+        for product_id, quantity in result.all():
+            lines[product_id] = lines.get(product_id, 0) + quantity
+        return lines
+
+    async def set_order_status(
+        self, db: AsyncSession, order: Order, new_status: OrderStatus
+    ) -> list[StockShortage]:
+        """
+        Cambia el estado del pedido ajustando el stock: al cancelar lo libera y
+        al reactivar un cancelado lo vuelve a reservar. Si no alcanza el stock
+        devuelve los faltantes y no cambia nada (no hace commit).
+        """
+        cancelling = new_status == OrderStatus.CANCELLED and order.status != OrderStatus.CANCELLED
+        restoring = order.status == OrderStatus.CANCELLED and new_status != OrderStatus.CANCELLED
+        if not (cancelling or restoring):
+            order.status = new_status
+            return []
+
+        # Solo un request/worker gana la transición (y mueve el stock)
+        was_cancelled = Order.status == OrderStatus.CANCELLED
+        result = await db.execute(
+            update(Order)
+            .where(Order.id == order.id, was_cancelled if restoring else ~was_cancelled)
+            .values(status=new_status)
+            .returning(Order.id)
+            .execution_options(synchronize_session=False)
+        )
+        if result.scalar_one_or_none() is not None:
+            lines = await self._order_lines(db, order.id)
+            if cancelling:
+                await self.release(db, lines)
+            else:
+                shortages = await self.reserve(db, lines)
+                if shortages:
+                    await db.execute(
+                        update(Order)
+                        .where(Order.id == order.id)
+                        .values(status=OrderStatus.CANCELLED)
+                        .execution_options(synchronize_session=False)
+                    )
+                    return shortages
+        order.status = new_status
+        return []
+
+
+# Instancia singleton
+stock_service = StockService()
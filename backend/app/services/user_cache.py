@@ -0,0 +1,56 @@
+"""
+User Cache Service
+Cache-aside del usuario autenticado: evita el SELECT de users en cada request
+con JWT. Solo guarda el principal (id, email, nombre, rol y estado), nunca la
+fila completa (password_hash, teléfono, fechas). Los endpoints que necesitan
+el usuario completo, como /auth/me, lo cargan ellos.
+
+Cada worker tiene su cache: los cambios hechos desde la API invalidan la del
+worker que los atiende y USER_CACHE_SECONDS acota el resto (por ejemplo,
+un usuario desactivado deja de pasar get_current_active_user a más tardar
+en ese tiempo).
+"""
+from typing import NamedTuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models.user import User, UserRole
+from app.utils.cache import TTLCache
+
+
+class Principal(NamedTuple):
+    """Usuario autenticado (lo que devuelven get_current_user y compañía)"""
+    id: int
+    email: str
+    name: str
+    role: UserRole
+    is_active: bool
+
+
+class UserCache:
+    """user_id -> Principal"""
+
+    def __init__(self, ttl: int, maxsize: int = 4096):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def invalidate(self, user_id: int) -> None:
+        """Llamar después de modificar un usuario (rol, estado, datos)"""
+        self._cache.delete(user_id)
+
+    async def get(self, db: AsyncSession, user_id: int) -> Principal | None:
+        """Principal del usuario (de la cache o de la base)"""
+        principal = self._cache.get(user_id)
+        if principal is None:
+            result = await db.execute(
+                select(User.id, User.email, User.name, User.role, User.is_active).where(User.id == user_id)
+            )
+            row = result.one_or_none()
+            if row is None:
+                return None
+            principal = Principal(*row)
+            self._cache.set(user_id, principal)
+        return principal
+
+
+# Instancia singleton (una cache por worker)
+user_cache = UserCache(ttl=settings.USER_CACHE_SECONDS)
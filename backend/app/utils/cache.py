@@ -0,0 +1,44 @@
+"""
+In-process TTL cache
+Cache LRU en memoria con expiración por entrada. Cada worker de uvicorn
+tiene la suya: el TTL acota cuánto puede quedar desactualizado un worker
+que no recibió la invalidación explícita.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class TTLCache:
+    """Cache LRU con expiración (no thread-safe: pensada para el event loop)"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -4,9 +4,9 @@ FastAPI Dependencies
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from app.database import get_db
-from app.models.user import User, UserRole
+from app.models.user import UserRole
+from app.services.user_cache import Principal, user_cache
 from app.utils.security import decode_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
@@ -15,7 +15,7 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db)
-) -> User:
+) -> Principal:
     """Get current authenticated user from JWT token"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -27,10 +27,8 @@ async def get_current_user(
     if token_data is None or token_data.user_id is None:
         raise credentials_exception
     
-    result = await db.execute(
-        select(User).where(User.id == token_data.user_id)
-    )
-    user = result.scalar_one_or_none()
+    # Cache-aside: solo consulta users si el usuario no está en la cache
+    user = await user_cache.get(db, token_data.user_id)
     
     if user is None:
         raise credentials_exception
@@ -39,8 +37,8 @@ async def get_current_user(
 
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: Principal = Depends(get_current_user)
+) -> Principal:
     """Get current active user"""
     if not current_user.is_active:
         raise HTTPException(
@@ -51,8 +49,8 @@ async def get_current_active_user(
 
 
 async def get_admin_user(
-    current_user: User = Depends(get_current_active_user)
-) -> User:
+    current_user: Principal = Depends(get_current_active_user)
+) -> Principal:
     """Get current user if they are an admin"""
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
@@ -65,7 +63,7 @@ async def get_admin_user(
 async def get_optional_user(
     token: str | None = Depends(OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)),
     db: AsyncSession = Depends(get_db)
-) -> User | None:
+) -> Principal | None:
     """Get current user if authenticated, otherwise None"""
     if not token:
         return None
@@ -74,8 +72,5 @@ async def get_optional_user(
     if token_data is None or token_data.user_id is None:
         return None
     
-    result = await db.execute(
-        select(User).where(User.id == token_data.user_id)
-    )
-    return result.scalar_one_or_none()
+    return await user_cache.get(db, token_data.user_id)
 
@@ -0,0 +1,53 @@
+"""
+URLs de las variantes de una imagen (thumb, card, detail)
+Se derivan de la URL de la imagen, sin consultar nada:
+/uploads/products/<nombre>.jpg -> /uploads/variants/<preset>/<nombre>.webp.
+Para Cloudinary se devuelven URLs con la transformación equivalente.
+Los archivos locales los genera services/image_variants.py.
+
+blob_key() saca el sha256 de la URL de una imagen guardada por contenido
+(ver services/image_store.py).
+"""
+import re
+from typing import Iterable
+
+# Lado máximo en px de cada preset (se conserva la proporción)
+PRESETS = {"thumb": 160, "card": 400, "detail": 1200}
+
+DEFAULT_FORMAT = "webp"
+
+_LOCAL_PREFIX = "/uploads/products/"
+_VARIANTS_PREFIX = "/uploads/variants/"
+_CLOUDINARY_UPLOAD = "/image/upload/"
+
+# <sha256>.<ext> al final de la URL (local o Cloudinary)
+_BLOB_URL = re.compile(r"(?:^|/)([0-9a-f]{64})(?:\.[A-Za-z0-9]+)?$")
+
+
+def blob_key(url: str | None) -> str | None:
+    """sha256 de una URL de imagen direccionada por contenido (None para otras URLs)"""
+    if not url:
+        return None
+    match = _BLOB_URL.search(url.split("?", 1)[0])
+    return match.group(1) if match else None
+
+
+def blob_keys(urls: Iterable[str | None]) -> set[str]:
+    return {key for key in map(blob_key, urls) if key}
+
+
+def variant_urls(image_url: str | None, fmt: str = DEFAULT_FORMAT) -> dict[str, str] | None:
+    """URLs de cada preset para una imagen local o de Cloudinary (None para otras URLs)"""
+    if not image_url:
+        return None
+    base, sep, name = image_url.rpartition(_LOCAL_PREFIX)
+    if sep and name and "/" not in name:
+        stem = name.rsplit(".", 1)[0]
+        return {preset: f"{base}{_VARIANTS_PREFIX}{preset}/{stem}.{fmt}" for preset in PRESETS}
+    if "res.cloudinary.com" in image_url and _CLOUDINARY_UPLOAD in image_url:
+        head, _, tail = image_url.partition(_CLOUDINARY_UPLOAD)
+        return {
+            preset: f"{head}{_CLOUDINARY_UPLOAD}c_limit,w_{size},h_{size},q_auto,f_auto/{tail}"
+            for preset, size in PRESETS.items()
+        }
+    return None
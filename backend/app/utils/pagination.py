@@ -0,0 +1,92 @@
+"""
+Keyset (cursor) pagination helpers
+En lugar de OFFSET, el cursor guarda la clave de orden + id de la última fila
+y la página siguiente busca directamente con WHERE (col, id) < (valor, id),
+aprovechando los índices sobre la columna de orden.
+"""
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any
+from fastapi import HTTPException, status
+from sqlalchemy import Select, literal, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+
+
+def _dump_value(value: Any) -> list:
+    if isinstance(value, datetime):
+        return ["dt", value.isoformat()]
+    if isinstance(value, Decimal):
+        return ["dec", str(value)]
+    return ["raw", value]
+
+
+def _load_value(tagged: list) -> Any:
+    kind, value = tagged
+    if kind == "dt":
+        return datetime.fromisoformat(value)
+    if kind == "dec":
+        return Decimal(value)
+    return value
+
+
+def encode_cursor(sort_by: str, sort_order: str, value: Any, row_id: int) -> str:
+    """Token opaco con la clave de orden y el id de la última fila entregada"""
+    payload = {"k": sort_by, "o": sort_order, "v": _dump_value(value), "id": row_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_order: str) -> tuple[Any, int] | None:
+    """
+    Decodifica un cursor. Un cursor vacío ('?cursor=') pide la primera página.
+
+    Raises:
+        HTTPException 400 si el cursor es inválido o no corresponde al orden pedido
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload["k"] != sort_by or payload["o"] != sort_order:
+            raise ValueError("orden distinto")
+        return _load_value(payload["v"]), int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
+        )
+
+
+def apply_keyset(
+    query: Select,
+    sort_column: InstrumentedAttribute,
+    id_column: InstrumentedAttribute,
+    descending: bool,
+    position: tuple[Any, int] | None,
+    page_size: int,
+) -> Select:
+    """
+    Ordena por (columna, id) y busca a partir de la posición del cursor.
+    Pide page_size + 1 filas para saber si hay página siguiente.
+    """
+    if position is not None:
+        key = tuple_(sort_column, id_column)
+        value = tuple_(literal(position[0], sort_column.type), literal(position[1], id_column.type))
+        query = query.where(key < value if descending else key > value)
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+    return query.limit(page_size + 1)
+
+
+def split_page(rows: list, page_size: int, sort_by: str, sort_order: str) -> tuple[list, str | None]:
+    """Recorta la fila extra y arma el cursor de la página siguiente (si la hay)"""
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(sort_by, sort_order, getattr(last, sort_by), last.id)
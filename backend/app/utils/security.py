@@ -1,5 +1,7 @@
 """
 Security utilities for JWT and password hashing
+Las funciones de bcrypt son bloqueantes: desde los endpoints usar
+app.services.passwords (las corre en un pool de threads acotado).
 """
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
@@ -18,11 +20,20 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 
 def get_password_hash(password: str) -> str:
-    """Hash a password"""
-    salt = bcrypt.gensalt()
+    """Hash a password (costo configurable con BCRYPT_ROUNDS)"""
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True si el hash usa un costo menor al configurado ('$2b$12$...' -> 12)"""
+    try:
+        rounds = int(hashed_password.split('$')[2])
+    except (IndexError, ValueError):
+        return False
+    return rounds < settings.BCRYPT_ROUNDS
+
+
 def create_access_token(
     data: dict, 
     expires_delta: timedelta | None = None
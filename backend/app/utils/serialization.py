@@ -0,0 +1,42 @@
+"""
+Product serialization
+Un solo camino ORM -> JSON para productos: el TypeAdapter lee los atributos
+de los modelos (from_attributes) de toda la página en una sola llamada al
+núcleo de Pydantic y la serializa directo a bytes. Los endpoints devuelven
+esos bytes, sin la segunda validación de response_model.
+
+Requiere category e images precargados (selectinload). Las cards se
+serializan desde filas de columnas (Row), sin entidades.
+"""
+from typing import Sequence
+from fastapi import Response
+from pydantic import TypeAdapter
+from app.models.product import Product
+from app.schemas.product import ProductResponse, ProductListResponse, ProductCardListResponse
+
+
+_product = TypeAdapter(ProductResponse)
+_product_list = TypeAdapter(ProductListResponse)
+_card_list = TypeAdapter(ProductCardListResponse)
+
+
+def dump_product(product: Product) -> bytes:
+    """JSON de un ProductResponse"""
+    return _product.dump_json(_product.validate_python(product, from_attributes=True))
+
+
+def dump_product_list(products: Sequence[Product], **page) -> bytes:
+    """JSON de un ProductListResponse (page: total, page, page_size, etc.)"""
+    data = _product_list.validate_python({"items": products, **page}, from_attributes=True)
+    return _product_list.dump_json(data)
+
+
+def dump_product_cards(rows: Sequence, **page) -> bytes:
+    """JSON de un ProductCardListResponse a partir de filas de columnas"""
+    data = _card_list.validate_python({"items": rows, **page}, from_attributes=True)
+    return _card_list.dump_json(data)
+
+
+def json_response(body: bytes, status_code: int = 200) -> Response:
+    """Respuesta con el JSON ya serializado"""
+    return Response(content=body, status_code=status_code, media_type="application/json")
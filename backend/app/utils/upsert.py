@@ -0,0 +1,15 @@
+"""
+Upsert helpers
+INSERT ... ON CONFLICT según el dialecto del engine (PostgreSQL en producción,
+SQLite en desarrollo; ambos soportan on_conflict_do_update y RETURNING).
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def insert_for(db: AsyncSession, model):
+    """insert() del dialecto de la sesión, con on_conflict_do_update/do_nothing"""
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
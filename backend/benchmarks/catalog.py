@@ -0,0 +1,200 @@
+"""
+Catálogo sintético para los benchmarks
+Genera N productos con nombres, marcas, códigos y descripciones parecidos a
+los reales (repuestos para semirremolques) y, para los benchmarks del
+admin, N pedidos de clientes sintéticos. Los scripts de benchmarks/ lo
+usan contra la base de DATABASE_URL (por defecto un SQLite temporal).
+
+La base se reutiliza entre corridas si ya tiene N productos (o pedidos).
+"""
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# DATABASE_URL antes de importar la app (por defecto un SQLite aparte, no maldonado.db).
+# timeout: con escrituras simultáneas (pedidos) SQLite las hace esperar su turno
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite+aiosqlite:///{os.path.join(tempfile.gettempdir(), 'maldonado-bench.db')}?timeout=60",
+)
+os.environ.setdefault("RESPONSE_CACHE_ENABLED", "false")
+
+from sqlalchemy import select, func, insert, text
+from app.database import AsyncSessionLocal, engine, create_tables
+from app.models.category import Category
+from app.models.order import Order, OrderStatus
+from app.models.product import Product
+from app.models.quote import Quote, QuoteStatus
+from app.models.user import User
+from app.services.search import product_search
+
+PARTS = [
+    "Rodamiento cónico", "Rodamiento de rodillos", "Maza de rueda", "Buje de elástico",
+    "Pulmón de freno", "Válvula relé", "Válvula niveladora", "Tambor de freno",
+    "Zapata de freno", "Cinta de freno", "Perno de rueda", "Tuerca de rueda",
+    "Elástico trasero", "Balancín", "Grillete", "Faro trasero LED", "Baliza lateral",
+    "Ficha eléctrica 7 polos", "Cable espiralado", "Lona de carpa", "Tensor de lona",
+    "Paragolpes", "Guardabarros", "Pata de apoyo", "Perno rey", "Plato de enganche",
+    "Retén de maza", "Junta de maza", "Cámara de aire", "Manguera de aire",
+]
+QUALIFIERS = [
+    "reforzado", "doble", "simple", "24 pulgadas", "30/30", "para eje Randon",
+    "para eje Fruehauf", "alta resistencia", "con sensor", "universal", "22.5",
+    "izquierdo", "derecho", "kit completo", "sellado", "cromado",
+]
+BRANDS = [
+    "SKF", "Timken", "Wabco", "Haldex", "Randon", "Fras-le", "Knorr", "Bosch",
+    "Hella", "Sampel", "Suspensys", "Master", "Meritor", "Jost", "FAG", "NTN",
+]
+CATEGORIES = [
+    ("Ejes y Mazas", "ejes-mazas"), ("Sistema de Frenos", "frenos"),
+    ("Suspensión", "suspension"), ("Iluminación", "iluminacion"),
+    ("Lonas y Carpas", "lonas-carpas"), ("Enganche", "enganche"),
+]
+
+BATCH = 5000
+
+
+def _rows(n: int, category_ids: list[int], rng: random.Random):
+    start = datetime(2024, 1, 1)
+    for i in range(n):
+        part = rng.choice(PARTS)
+        brand = rng.choice(BRANDS)
+        qualifier = rng.choice(QUALIFIERS)
+        price = Decimal(rng.randint(1500, 950000)) / 100
+        yield {
+            "category_id": rng.choice(category_ids),
+            "name": f"{part} {qualifier}",
+            "code": f"{brand[:3].upper()}-{i:06d}-{rng.randint(10, 99)}",
+            "brand": brand,
+            "description": f"{part} {brand} {qualifier}. Repuesto para semirremolques y acoplados.",
+            "price": price,
+            "stock": rng.randint(0, 40),
+            "is_active": rng.random() > 0.05,
+            "is_featured": rng.random() < 0.02,
+            "is_new": rng.random() < 0.05,
+            "is_on_promotion": rng.random() < 0.05,
+            "rating": Decimal(rng.randint(0, 50)) / 10,
+            "reviews_count": rng.randint(0, 200),
+            "created_at": start + timedelta(minutes=i * 3 + rng.randint(0, 2)),
+            "updated_at": start,
+        }
+
+
+async def build_catalog(n: int, seed: int = 42) -> None:
+    """Crea las tablas y carga N productos (si la base ya los tiene, no hace nada)"""
+    await create_tables()
+    async with engine.begin() as conn:
+        await product_search.ensure_schema(conn)
+
+    async with AsyncSessionLocal() as db:
+        if await db.scalar(select(func.count(Product.id))) == n:
+            return
+        await db.execute(text("DELETE FROM products"))
+        await db.execute(text("DELETE FROM categories"))
+        db.add_all(Category(name=name, slug=slug) for name, slug in CATEGORIES)
+        await db.flush()
+        category_ids = list((await db.execute(select(Category.id))).scalars())
+
+        rng = random.Random(seed)
+        batch = []
+        for row in _rows(n, category_ids, rng):
+            batch.append(row)
+            if len(batch) == BATCH:
+                await db.execute(insert(Product), batch)
+                batch = []
+        if batch:
+            await db.execute(insert(Product), batch)
+        await db.commit()
+
+    if engine.dialect.name == "sqlite":
+        async with engine.begin() as conn:
+            await conn.execute(text("ANALYZE"))
+    elif engine.dialect.name == "postgresql":
+        async with engine.begin() as conn:
+            await conn.execute(text("ANALYZE products"))
+
+
+# Estados de pedidos con su peso aproximado (la mayoría ya entregados)
+ORDER_STATUSES = [
+    (OrderStatus.DELIVERED, 60), (OrderStatus.SHIPPED, 8), (OrderStatus.PAID, 10),
+    (OrderStatus.PROCESSING, 5), (OrderStatus.PENDING, 7), (OrderStatus.PAYMENT_PENDING, 4),
+    (OrderStatus.CANCELLED, 6),
+]
+
+
+def _order_rows(n: int, user_ids: list[int], rng: random.Random):
+    statuses, weights = zip(*ORDER_STATUSES)
+    # Un año de pedidos que termina ahora (incluye pedidos de hoy)
+    end = datetime.utcnow()
+    step = timedelta(days=365) / n
+    for i in range(n):
+        subtotal = Decimal(rng.randint(5000, 5_000_000)) / 100
+        shipping = Decimal(rng.choice([0, 0, 2500, 4800]))
+        created = end - step * (n - i)
+        yield {
+            "user_id": rng.choice(user_ids),
+            "order_number": f"MR-BENCH-{i:08d}",
+            "status": rng.choices(statuses, weights)[0],
+            "subtotal": subtotal,
+            "shipping_cost": shipping,
+            "total": subtotal + shipping,
+            "created_at": created,
+            "updated_at": created,
+        }
+
+
+async def build_orders(n: int, users: int = 5000, quotes: int = 20000, seed: int = 42) -> None:
+    """Crea las tablas y carga N pedidos, sus clientes y cotizaciones (si ya están, no hace nada)"""
+    await create_tables()
+
+    async with AsyncSessionLocal() as db:
+        if await db.scalar(select(func.count(Order.id))) == n:
+            return
+        await db.execute(text("DELETE FROM order_items"))
+        await db.execute(text("DELETE FROM orders"))
+        await db.execute(text("DELETE FROM quote_items"))
+        await db.execute(text("DELETE FROM quotes"))
+        await db.execute(text("DELETE FROM users WHERE email LIKE '%@bench.test'"))
+        await db.execute(insert(User), [
+            {"email": f"cliente{i}@bench.test", "password_hash": "x", "name": f"Cliente {i}"}
+            for i in range(users)
+        ])
+        user_ids = list((await db.execute(select(User.id).where(User.email.like("%@bench.test")))).scalars())
+
+        rng = random.Random(seed)
+        batch = []
+        for row in _order_rows(n, user_ids, rng):
+            batch.append(row)
+            if len(batch) == BATCH:
+                await db.execute(insert(Order), batch)
+                batch = []
+        if batch:
+            await db.execute(insert(Order), batch)
+
+        quote_statuses = list(QuoteStatus)
+        await db.execute(insert(Quote), [
+            {
+                "name": f"Cliente {i}",
+                "email": f"cliente{i}@bench.test",
+                "phone": "099000000",
+                "status": rng.choice(quote_statuses),
+            }
+            for i in range(quotes)
+        ])
+        await db.commit()
+
+    if engine.dialect.name == "sqlite":
+        async with engine.begin() as conn:
+            await conn.execute(text("ANALYZE"))
+    elif engine.dialect.name == "postgresql":
+        async with engine.begin() as conn:
+            await conn.execute(text("ANALYZE orders"))
+            await conn.execute(text("ANALYZE quotes"))
+
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
@@ -0,0 +1,91 @@
+"""
+Benchmark: GET /api/admin/dashboard sobre 1M de pedidos sintéticos
+
+Compara las ocho consultas secuenciales de antes (con date(created_at) =
+hoy, que no usa el índice) con la sentencia única de DashboardStatsService
+(FILTER + rango de fechas) y con el snapshot en memoria.
+
+Uso (desde backend/):
+    python -m benchmarks.dashboard_stats                 # 1M pedidos, SQLite temporal
+    python -m benchmarks.dashboard_stats --orders 200000 --rounds 10
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.dashboard_stats
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from benchmarks.catalog import build_catalog, build_orders, percentile
+from sqlalchemy import select, func
+from app.database import engine, AsyncSessionLocal
+from app.models.order import Order, OrderStatus
+from app.models.product import Product
+from app.models.quote import Quote, QuoteStatus
+from app.models.user import User
+from app.services.dashboard import DashboardStatsService, PENDING_ORDER_STATUSES
+
+
+async def sequential(db) -> dict:
+    """Las ocho consultas que hacía get_dashboard_stats antes de la sentencia única"""
+    today = datetime.utcnow().date()
+    queries = {
+        "total_products": select(func.count(Product.id)),
+        "total_orders": select(func.count(Order.id)),
+        "total_users": select(func.count(User.id)),
+        "total_quotes": select(func.count(Quote.id)),
+        "pending_orders": select(func.count(Order.id)).where(Order.status.in_(PENDING_ORDER_STATUSES)),
+        "pending_quotes": select(func.count(Quote.id)).where(Quote.status == QuoteStatus.PENDING),
+        "total_revenue": select(func.sum(Order.total)).where(Order.status == OrderStatus.PAID),
+        "orders_today": select(func.count(Order.id)).where(func.date(Order.created_at) == today),
+    }
+    stats = {key: (await db.execute(query)).scalar() or 0 for key, query in queries.items()}
+    stats["total_revenue"] = float(stats["total_revenue"])
+    return stats
+
+
+async def measure(get, rounds: int) -> tuple[list[float], dict]:
+    samples, stats = [], {}
+    async with AsyncSessionLocal() as db:
+        for _ in range(rounds):
+            started = time.perf_counter()
+            stats = await get(db)
+            samples.append((time.perf_counter() - started) * 1000)
+    return samples, stats
+
+
+def report(label: str, samples: list[float]) -> None:
+    print(
+        f"{label:<16} n={len(samples):<4} p50={percentile(samples, 50):9.3f} ms  "
+        f"p95={percentile(samples, 95):9.3f} ms  max={max(samples):9.3f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    await build_catalog(args.products)
+    await build_orders(args.orders)
+    print(f"Base: {args.orders} pedidos ({engine.dialect.name}), lista en {time.perf_counter() - started:.1f} s")
+
+    single = DashboardStatsService(ttl=0)
+    snapshot = DashboardStatsService(ttl=3600)
+
+    await measure(sequential, 1)  # Calentar caches de páginas de la base
+    before, expected = await measure(sequential, args.rounds)
+    report("8 consultas", before)
+    after, stats = await measure(single.get, args.rounds)
+    report("1 sentencia", after)
+    assert stats == expected, (stats, expected)
+    await measure(snapshot.get, 1)  # Primer request: arma el snapshot
+    cached, _ = await measure(snapshot.get, args.rounds)
+    report("snapshot (hit)", cached)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
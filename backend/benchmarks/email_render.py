@@ -0,0 +1,79 @@
+"""
+Benchmark: renderizar los emails de 10k cotizaciones (notificación al admin y
+confirmación al cliente, HTML + texto, con items)
+
+Compara los templates precompilados de email_templates (un Environment y
+cada template compilado una sola vez) con compilar los templates en cada
+email, que es lo que pasa con un Environment nuevo por envío o con
+auto_reload y sin cache. Las cotizaciones son entidades en memoria.
+
+Uso (desde backend/):
+    python -m benchmarks.email_render
+    python -m benchmarks.email_render --quotes 10000 --items 5
+"""
+import argparse
+import time
+from benchmarks.catalog import percentile
+from app.models.quote import Quote, QuoteItem
+from app.services.email_templates import EmailTemplates, TEMPLATES_DIR, email_templates
+
+NAMES = EmailTemplates.NAMES
+
+
+def build_quotes(count: int, items: int) -> list[tuple[Quote, list[QuoteItem]]]:
+    quotes = []
+    for i in range(count):
+        quote = Quote(
+            name=f"Cliente <{i}>", email=f"cliente{i}@maldonado-bench.com", phone="0341555000",
+            vehicle_info="Scania R440" if i % 2 else None, message=f"Necesito cotizar & confirmar stock {i}",
+        )
+        quote_items = [
+            QuoteItem(product_code=f"PF-{i:05d}-{n}", product_name=f"Pulmón de freno \"{n}\" 30/30", quantity=n + 1)
+            for n in range(items)
+        ]
+        quotes.append((quote, quote_items))
+    return quotes
+
+
+def precompiled(quote: Quote, items: list[QuoteItem]) -> None:
+    for name in NAMES:
+        email_templates.render(name, quote=quote, items=items)
+
+
+def compiled_per_email(quote: Quote, items: list[QuoteItem]) -> None:
+    templates = EmailTemplates(TEMPLATES_DIR)
+    for name in NAMES:
+        templates.render(name, quote=quote, items=items)
+
+
+def measure(render, quotes: list) -> list[float]:
+    samples = []
+    for quote, items in quotes:
+        started = time.perf_counter()
+        render(quote, items)
+        samples.append((time.perf_counter() - started) * 1000 / len(NAMES))
+    return samples
+
+
+def report(label: str, samples: list[float]) -> None:
+    print(f"{label:<20} {len(samples) * len(NAMES):>6} emails en {sum(samples) * len(NAMES) / 1000:6.2f} s  "
+          f"p50={percentile(samples, 50):6.3f} ms  p95={percentile(samples, 95):6.3f} ms  (por email)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quotes", type=int, default=10_000)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--compiled-quotes", type=int, default=500,
+                        help="cotizaciones para el caso que compila en cada email (es mucho más lento)")
+    args = parser.parse_args()
+
+    quotes = build_quotes(args.quotes, args.items)
+    print(f"{args.quotes} cotizaciones x {len(NAMES)} emails, {args.items} items cada una")
+    measure(precompiled, quotes[:100])  # Calentar
+    report("precompilados", measure(precompiled, quotes))
+    report("compilar por email", measure(compiled_per_email, quotes[:args.compiled_quotes]))
+
+
+if __name__ == "__main__":
+    main()
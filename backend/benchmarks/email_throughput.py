@@ -0,0 +1,90 @@
+"""
+Benchmark: emails/segundo por una SMTPSession reutilizada contra una conexión
+nueva por mensaje (lo que hacía send_email antes del outbox)
+
+Corre contra fake_smtp.py (aiosmtpd, en este proceso). --connect-latency
+simula el costo de abrir la conexión con un servidor remoto (TCP + STARTTLS
++ login), que es lo que la reutilización ahorra.
+
+Uso (desde backend/):
+    python -m benchmarks.email_throughput
+    python -m benchmarks.email_throughput --messages 500 --connect-latency 0.3
+"""
+import argparse
+import asyncio
+import socket
+import time
+import fake_smtp
+from app.services.email import email_service, SMTPSession
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def new_session(port: int, max_messages: int) -> SMTPSession:
+    return SMTPSession(host="127.0.0.1", port=port, user="noreply@localhost", password="",
+                       start_tls=False, timeout=30, max_messages=max_messages)
+
+
+def messages(count: int) -> list:
+    return [
+        email_service.build_message(f"cliente{n}@test.com", f"Pedido {n}", f"<p>Pedido {n}</p>", f"Pedido {n}")
+        for n in range(count)
+    ]
+
+
+async def reused(port: int, batch: list, max_messages: int) -> None:
+    session = new_session(port, max_messages)
+    try:
+        for message in batch:
+            await session.send(message)
+    finally:
+        await session.close()
+
+
+async def one_per_message(port: int, batch: list) -> None:
+    for message in batch:
+        session = new_session(port, 1)
+        try:
+            await session.send(message)
+        finally:
+            await session.close()
+
+
+def report(label: str, count: int, seconds: float, connections: int) -> None:
+    print(f"{label:<22} {count / seconds:8.1f} msgs/s  ({count} mensajes, {connections} conexiones, {seconds:.2f} s)")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--connect-latency", type=float, default=0.1, help="segundos extra por conexión")
+    parser.add_argument("--max-messages", type=int, default=100, help="SMTP_MAX_MESSAGES_PER_CONNECTION")
+    args = parser.parse_args()
+
+    fake_smtp.CONNECT_LATENCY = args.connect_latency
+    email_service.user = "noreply@localhost"
+    port = free_port()
+    controller, handler = fake_smtp.start(port)
+    batch = messages(args.messages)
+    try:
+        for label, run in (
+            ("SMTPSession reutilizada", lambda: reused(port, batch, args.max_messages)),
+            ("conexión por mensaje", lambda: one_per_message(port, batch)),
+        ):
+            handler.connections = 0
+            handler.messages.clear()
+            started = time.perf_counter()
+            await run()
+            elapsed = time.perf_counter() - started
+            assert len(handler.messages) == args.messages
+            report(label, args.messages, elapsed, handler.connections)
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
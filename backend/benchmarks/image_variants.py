@@ -0,0 +1,139 @@
+"""
+Benchmark: variantes de imágenes locales (thumb, card, detail)
+
+- Bytes servidos: lo que baja una página del catálogo (--images cards) con la
+  foto original contra la variante card en WebP.
+- Generación: variantes por segundo con el pool de procesos de
+  ImageVariants para 1..N workers, y por worker (por core).
+- Cache: GET /uploads/variants/... por segundo con las variantes ya en disco.
+
+Las fotos son sintéticas (formas, degradé y ruido; 4000x3000 en JPEG
+calidad 90, parecidas en peso a las de un celular).
+
+Uso (desde backend/):
+    python -m benchmarks.image_variants
+    python -m benchmarks.image_variants --images 24 --workers 1 2 4 --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from benchmarks.catalog import percentile
+import httpx
+from PIL import Image, ImageDraw
+from app.main import app
+from app.api import uploads
+from app.services.image_variants import ImageVariants, image_variants, DEFAULT_FORMAT
+from app.utils.image_urls import PRESETS
+
+
+def build_photos(directory: Path, count: int, size: tuple[int, int]) -> list[Path]:
+    """Formas de todos los tamaños (detalle que sobrevive a la reducción) más ruido de sensor"""
+    rng = random.Random(42)
+    width, height = size
+    paths = []
+    for n in range(count):
+        photo = Image.linear_gradient("L").resize(size).convert("RGB")
+        draw = ImageDraw.Draw(photo)
+        for _ in range(400):
+            x, y = rng.randrange(width), rng.randrange(height)
+            radius = int(rng.paretovariate(1.2) * 20)
+            color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+            box = (x - radius, y - radius, x + radius, y + radius)
+            (draw.ellipse if rng.random() < 0.5 else draw.rectangle)(box, fill=color)
+        noise = Image.effect_noise(size, 24).convert("RGB")
+        photo = Image.blend(photo, noise, 0.15)
+        path = directory / f"foto{n:03d}.jpg"
+        photo.save(path, "JPEG", quality=90)
+        paths.append(path)
+    return paths
+
+
+async def generate(photos: list[Path], workers: int, cache_dir: Path) -> tuple[int, float]:
+    """(variantes generadas, segundos) para todos los presets de todas las fotos"""
+    variants = ImageVariants(cache_dir, workers=workers, eager=False)
+    try:
+        # Arrancar el pool fuera de la medición (spawn tarda)
+        await asyncio.gather(*(
+            asyncio.get_running_loop().run_in_executor(variants.pool, os.getpid) for _ in range(workers)
+        ))
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            variants.get(photo, preset, DEFAULT_FORMAT) for photo in photos for preset in PRESETS
+        ))
+        return variants._generated, time.perf_counter() - started
+    finally:
+        await variants.shutdown()
+
+
+async def serve(photos: list[Path], requests: int, concurrency: int) -> tuple[float, list[float], int]:
+    """Requests/segundo, latencias (ms) y bytes servidos desde la cache"""
+    transport = httpx.ASGITransport(app=app)
+    urls = [f"/uploads/variants/card/{photo.stem}.{DEFAULT_FORMAT}" for photo in photos]
+    samples: list[float] = []
+    served = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for url in urls:  # Generar (y calentar) antes de medir
+            (await client.get(url)).raise_for_status()
+
+        async def worker(share: list[str]) -> None:
+            nonlocal served
+            for url in share:
+                started = time.perf_counter()
+                response = await client.get(url)
+                samples.append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+                served += len(response.content)
+
+        plan = [urls[n % len(urls)] for n in range(requests)]
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(plan[n::concurrency]) for n in range(concurrency)))
+        return requests / (time.perf_counter() - started), samples, served
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=24, help="fotos (una página del catálogo)")
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="maldonado-variants-"))
+    try:
+        originals = workdir / "products"
+        originals.mkdir()
+        photos = build_photos(originals, args.images, (4000, 3000))
+
+        original_bytes = sum(photo.stat().st_size for photo in photos)
+        print(f"{args.images} fotos 4000x3000, {original_bytes / args.images / 1024:.0f} KB promedio "
+              f"(cpu_count={os.cpu_count()})")
+
+        print("Generación (todos los presets, webp)")
+        for workers in args.workers:
+            generated, elapsed = await generate(photos, workers, workdir / f"variants-{workers}")
+            rate = generated / elapsed
+            print(f"  workers={workers:<3} {generated} variantes en {elapsed:6.2f} s  "
+                  f"{rate:6.1f} variantes/s  {rate / workers:6.1f} por worker")
+
+        uploads.UPLOAD_DIR = originals
+        image_variants.cache_dir = workdir / "variants-app"
+        rps, samples, served = await serve(photos, args.requests, args.concurrency)
+        print(f"Cache en disco (card)  {rps:8.1f} req/s  p50={percentile(samples, 50):6.2f} ms  "
+              f"p95={percentile(samples, 95):6.2f} ms")
+
+        card_bytes = served / args.requests * args.images
+        print(f"Bytes por página de {args.images} cards: original={original_bytes / 1024 / 1024:6.2f} MB  "
+              f"card.{DEFAULT_FORMAT}={card_bytes / 1024:6.1f} KB  ({original_bytes / card_bytes:.0f}x menos)")
+    finally:
+        await image_variants.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+"""
+Load test: ráfaga de logins mientras se navega el catálogo
+
+Lanza --logins POST /api/auth/login simultáneos (bcrypt con BCRYPT_ROUNDS)
+y, mientras duran, mide la latencia de GET /api/categories. Compara bcrypt
+en el event loop (como antes) con PasswordService (pool de threads con cupo
+y espera máxima: lo que no entra a tiempo responde 503).
+
+Uso (desde backend/):
+    python -m benchmarks.login_storm
+    python -m benchmarks.login_storm --logins 200
+    PASSWORD_HASH_WORKERS=4 PASSWORD_HASH_QUEUE_TIMEOUT=2 python -m benchmarks.login_storm
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from benchmarks.catalog import build_catalog, percentile
+import httpx
+from sqlalchemy import delete
+from app.main import app
+from app.config import settings
+from app.database import engine, AsyncSessionLocal
+from app.models.user import User
+from app.services.passwords import password_service
+from app.utils.security import get_password_hash
+
+EMAIL = "storm@maldonado-bench.com"
+PASSWORD = "secreta123"
+
+
+async def storm(client: httpx.AsyncClient, logins: int) -> tuple[Counter, list[float], list[float]]:
+    """Status de los logins, su latencia y la del catálogo mientras duran (ms)"""
+    done = asyncio.Event()
+    catalog: list[float] = []
+    login_times: list[float] = []
+
+    async def probe() -> None:
+        while not done.is_set():
+            started = time.perf_counter()
+            response = await client.get("/api/categories")
+            catalog.append((time.perf_counter() - started) * 1000)
+            response.raise_for_status()
+            await asyncio.sleep(0.01)
+
+    async def login() -> int:
+        started = time.perf_counter()
+        response = await client.post("/api/auth/login", data={"username": EMAIL, "password": PASSWORD})
+        login_times.append((time.perf_counter() - started) * 1000)
+        return response.status_code
+
+    prober = asyncio.create_task(probe())
+    statuses = Counter(await asyncio.gather(*(login() for _ in range(logins))))
+    done.set()
+    await prober
+    return statuses, login_times, catalog
+
+
+def report(label: str, statuses: Counter, logins: list[float], catalog: list[float]) -> None:
+    print(f"{label}")
+    print(f"  logins    {dict(sorted(statuses.items()))}  p50={percentile(logins, 50):8.1f} ms  "
+          f"max={max(logins):8.1f} ms")
+    print(f"  catálogo  n={len(catalog):<5} p50={percentile(catalog, 50):8.1f} ms  "
+          f"p95={percentile(catalog, 95):8.1f} ms  max={max(catalog):8.1f} ms")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--products", type=int, default=2000)
+    args = parser.parse_args()
+
+    await build_catalog(args.products)
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(User).where(User.email == EMAIL))
+        db.add(User(email=EMAIL, password_hash=get_password_hash(PASSWORD), name="Storm"))
+        await db.commit()
+    print(
+        f"{args.logins} logins simultáneos, BCRYPT_ROUNDS={settings.BCRYPT_ROUNDS}, "
+        f"PASSWORD_HASH_WORKERS={settings.PASSWORD_HASH_WORKERS}, "
+        f"PASSWORD_HASH_QUEUE_TIMEOUT={settings.PASSWORD_HASH_QUEUE_TIMEOUT}"
+    )
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await client.get("/api/categories")  # Calentar
+
+        # Antes: bcrypt corría en el event loop
+        run = password_service._run
+        async def inline(fn, *fn_args):
+            return fn(*fn_args)
+        password_service._run = inline
+        try:
+            report("bcrypt en el event loop", *await storm(client, args.logins))
+        finally:
+            password_service._run = run
+
+        report("PasswordService", *await storm(client, args.logins))
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
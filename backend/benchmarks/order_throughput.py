@@ -0,0 +1,123 @@
+"""
+Benchmark: pedidos/segundo de POST /api/orders con carritos de 1, 10 y 100 líneas
+
+Cada cliente sintético tiene su carrito cargado de antemano (fuera de la
+medición) y todos confirman a la vez, hasta --concurrency simultáneos. Mide
+el camino completo: SELECT carrito + productos, reserva de stock, INSERT del
+pedido, INSERT multi-fila de los items con RETURNING y borrado del carrito.
+
+Uso (desde backend/):
+    python -m benchmarks.order_throughput               # SQLite temporal
+    python -m benchmarks.order_throughput --orders 500 --concurrency 20
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.order_throughput
+"""
+import argparse
+import asyncio
+import random
+import time
+from benchmarks.catalog import build_catalog, percentile
+import httpx
+from sqlalchemy import select, insert, update, delete
+from app.main import app
+from app.database import engine, AsyncSessionLocal
+from app.models.cart import CartItem
+from app.models.order import Order, OrderItem
+from app.models.product import Product
+from app.models.user import User
+from app.utils.security import create_access_token
+
+SHIPPING = {
+    "shipping_name": "Cliente Bench",
+    "shipping_address": "Ruta 5 km 120",
+    "shipping_city": "Rosario",
+    "shipping_state": "Santa Fe",
+    "shipping_zip": "2000",
+    "shipping_phone": "0341555000",
+}
+
+
+async def customers(count: int) -> list[int]:
+    """Clientes sintéticos (se reutilizan entre corridas)"""
+    async with AsyncSessionLocal() as db:
+        existing = list((await db.execute(
+            select(User.id).where(User.email.like("%@maldonado-bench.com")).order_by(User.id)
+        )).scalars())
+        if len(existing) < count:
+            await db.execute(insert(User), [
+                {"email": f"comprador{n}@maldonado-bench.com", "password_hash": "x", "name": f"Comprador {n}"}
+                for n in range(len(existing), count)
+            ])
+            await db.commit()
+            return await customers(count)
+    return existing[:count]
+
+
+async def fill_carts(user_ids: list[int], product_ids: list[int], lines: int, rng: random.Random) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(CartItem).where(CartItem.user_id.in_(user_ids)))
+        rows = [
+            {"user_id": user_id, "product_id": product_id, "quantity": rng.randint(1, 3)}
+            for user_id in user_ids
+            for product_id in rng.sample(product_ids, lines)
+        ]
+        for start in range(0, len(rows), 5000):
+            await db.execute(insert(CartItem), rows[start:start + 5000])
+        await db.commit()
+
+
+async def run(client: httpx.AsyncClient, user_ids: list[int], concurrency: int) -> tuple[float, list[float]]:
+    slots = asyncio.Semaphore(concurrency)
+    samples: list[float] = []
+
+    async def checkout(user_id: int) -> None:
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id), 'role': 'user'})}"}
+        async with slots:
+            started = time.perf_counter()
+            response = await client.post("/api/orders", json=SHIPPING, headers=headers)
+            samples.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 201, response.text
+
+    started = time.perf_counter()
+    await asyncio.gather(*(checkout(user_id) for user_id in user_ids))
+    return len(user_ids) / (time.perf_counter() - started), samples
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--orders", type=int, default=200, help="pedidos por tamaño de carrito")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--lines", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+
+    await build_catalog(args.products)
+    rng = random.Random(11)
+    async with AsyncSessionLocal() as db:
+        product_ids = list((await db.execute(select(Product.id).limit(1000))).scalars())
+        # Stock de sobra: el benchmark no mide faltantes
+        await db.execute(update(Product).where(Product.id.in_(product_ids)).values(stock=10_000_000, is_active=True))
+        await db.commit()
+    user_ids = await customers(args.orders)
+    print(f"{args.orders} pedidos por tamaño, {args.concurrency} simultáneos ({engine.dialect.name})")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for lines in args.lines:
+            await fill_carts(user_ids, product_ids, lines, rng)
+            rate, samples = await run(client, user_ids, args.concurrency)
+            print(
+                f"{lines:>3} líneas  {rate:7.1f} pedidos/s  {rate * lines:8.1f} items/s  "
+                f"p50={percentile(samples, 50):7.1f} ms  p95={percentile(samples, 95):7.1f} ms"
+            )
+
+    # Los pedidos del benchmark no quedan en la base
+    async with AsyncSessionLocal() as db:
+        orders = select(Order.id).where(Order.user_id.in_(user_ids))
+        await db.execute(delete(OrderItem).where(OrderItem.order_id.in_(orders)))
+        await db.execute(delete(Order).where(Order.user_id.in_(user_ids)))
+        await db.commit()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+Benchmark: página 500 de GET /api/products con OFFSET vs cursor
+
+Mide la misma página (mismo orden y tamaño) pedida con ?page=500 y con el
+cursor que devolvería la página 499. El total se pide con count=false para
+medir solo la paginación.
+
+Uso (desde backend/):
+    python -m benchmarks.pagination                      # 200k productos, SQLite temporal
+    python -m benchmarks.pagination --page-size 100 --sort-by price
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.pagination
+"""
+import argparse
+import asyncio
+import time
+from benchmarks.catalog import build_catalog, percentile
+import httpx
+from sqlalchemy import select
+from app.main import app
+from app.database import engine, AsyncSessionLocal
+from app.models.product import Product
+from app.utils.pagination import encode_cursor
+
+
+async def cursor_for_page(page: int, page_size: int, sort_by: str, sort_order: str) -> str:
+    """Cursor de la última fila de la página anterior (lo que devolvería next_cursor)"""
+    column = getattr(Product, sort_by)
+    order = [column.desc(), Product.id.desc()] if sort_order == "desc" else [column.asc(), Product.id.asc()]
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(column, Product.id)
+            .where(Product.is_active == True)
+            .order_by(*order)
+            .offset((page - 1) * page_size - 1)
+            .limit(1)
+        )
+        value, row_id = result.one()
+    return encode_cursor(sort_by, sort_order, value, row_id)
+
+
+async def measure(client: httpx.AsyncClient, params: dict, rounds: int) -> tuple[list[float], list[int]]:
+    samples, ids = [], []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        response = await client.get("/api/products", params=params)
+        samples.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+        ids = [product["id"] for product in response.json()["items"]]
+    return samples, ids
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--page", type=int, default=500)
+    parser.add_argument("--page-size", type=int, default=24)
+    parser.add_argument("--sort-by", default="created_at", choices=["created_at", "price"])
+    parser.add_argument("--sort-order", default="desc", choices=["asc", "desc"])
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    await build_catalog(args.products)
+    common = {
+        "page_size": args.page_size, "sort_by": args.sort_by, "sort_order": args.sort_order,
+        "count": "false", "fields": "card",
+    }
+    cursor = await cursor_for_page(args.page, args.page_size, args.sort_by, args.sort_order)
+    print(
+        f"Catálogo: {args.products} productos ({engine.dialect.name}); página {args.page} de "
+        f"{args.page_size} por {args.sort_by} {args.sort_order}"
+    )
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        results = {}
+        for label, params in (("offset", {**common, "page": args.page}), ("cursor", {**common, "cursor": cursor})):
+            await measure(client, params, 3)  # Calentar
+            samples, ids = await measure(client, params, args.rounds)
+            results[label] = ids
+            print(
+                f"{label:<7} p50={percentile(samples, 50):7.1f} ms  "
+                f"p95={percentile(samples, 95):7.1f} ms  max={max(samples):7.1f} ms"
+            )
+        print("Misma página en los dos modos:", results["offset"] == results["cursor"])
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
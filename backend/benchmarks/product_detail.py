@@ -0,0 +1,83 @@
+"""
+Load test: requests/segundo de GET /api/products/{id} sin y con la cache
+de respuestas
+
+N clientes concurrentes piden productos al azar de un conjunto de
+--hot productos (las fichas más visitadas). Sin cache cada request hace las
+consultas y la serialización; con cache, los repetidos salen del JSON
+guardado. Con RESPONSE_CACHE_URL=redis://... se mide el backend Redis.
+
+Uso (desde backend/):
+    python -m benchmarks.product_detail                 # 200k productos, SQLite temporal
+    python -m benchmarks.product_detail --concurrency 50 --requests 5000
+    RESPONSE_CACHE_URL=redis://localhost:6379/0 python -m benchmarks.product_detail
+"""
+import argparse
+import asyncio
+import random
+import time
+from benchmarks.catalog import build_catalog, percentile
+import httpx
+from sqlalchemy import select
+from app.main import app
+from app.database import engine, AsyncSessionLocal
+from app.models.product import Product
+from app.services.response_cache import response_cache, CATALOG_PRODUCTS
+
+
+async def load(client: httpx.AsyncClient, ids: list[int], requests: int, concurrency: int) -> tuple[float, list[float]]:
+    """Requests/segundo y latencias (ms) de `requests` GET repartidos entre `concurrency` clientes"""
+    rng = random.Random(7)
+    plan = [rng.choice(ids) for _ in range(requests)]
+    samples: list[float] = []
+
+    async def worker(share: list[int]) -> None:
+        for product_id in share:
+            started = time.perf_counter()
+            response = await client.get(f"/api/products/{product_id}")
+            samples.append((time.perf_counter() - started) * 1000)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(plan[n::concurrency]) for n in range(concurrency)))
+    return requests / (time.perf_counter() - started), samples
+
+
+def report(label: str, rps: float, samples: list[float]) -> None:
+    print(
+        f"{label:<14} {rps:8.1f} req/s  p50={percentile(samples, 50):7.2f} ms  "
+        f"p95={percentile(samples, 95):7.2f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--hot", type=int, default=500, help="productos distintos pedidos")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    await build_catalog(args.products)
+    async with AsyncSessionLocal() as db:
+        ids = list((await db.execute(select(Product.id).limit(args.hot))).scalars())
+    print(f"Catálogo: {args.products} productos ({engine.dialect.name}), {len(ids)} distintos pedidos")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response_cache.enabled = False
+        await load(client, ids, min(args.requests, 200), args.concurrency)  # Calentar
+        report("sin cache", *await load(client, ids, args.requests, args.concurrency))
+
+        response_cache.enabled = True
+        await response_cache.invalidate(CATALOG_PRODUCTS)
+        report("cache (fría)", *await load(client, ids, args.requests, args.concurrency))
+        report("cache", *await load(client, ids, args.requests, args.concurrency))
+        print(f"Contadores: {response_cache.stats().get(CATALOG_PRODUCTS)}")
+        await response_cache.invalidate(CATALOG_PRODUCTS)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
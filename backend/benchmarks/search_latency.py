@@ -0,0 +1,81 @@
+"""
+Benchmark: latencia de GET /api/products/search sobre un catálogo sintético
+
+Compara el path full-text (FTS5 en SQLite, tsvector en PostgreSQL) con el
+filtro anterior (ILIKE '%q%' sobre nombre, código, marca y descripción, que
+sigue siendo el fallback para otros motores). El total (COUNT) se recalcula
+en cada request: la cache de totales se invalida antes de cada uno.
+
+Uso (desde backend/):
+    python -m benchmarks.search_latency                 # 200k productos, SQLite temporal
+    python -m benchmarks.search_latency --products 50000 --rounds 5
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.search_latency
+"""
+import argparse
+import asyncio
+import time
+from benchmarks.catalog import build_catalog, percentile
+import httpx
+from app.main import app
+from app.database import engine, AsyncSessionLocal
+from app.services.code_index import code_index
+from app.services.product_count import product_counter
+from app.services.search import product_search
+
+QUERIES = [
+    "rodamiento", "rodamiento conico skf", "pulmon freno", "valvula rele wabco",
+    "faro led", "maza", "elastico reforzado", "lona", "perno rey jost", "zapata",
+    "balancin", "ficha 7 polos", "timken", "tambor 30", "guardabarros derecho",
+]
+
+
+async def measure(client: httpx.AsyncClient, rounds: int) -> list[float]:
+    samples = []
+    for _ in range(rounds):
+        for q in QUERIES:
+            product_counter.invalidate()
+            started = time.perf_counter()
+            response = await client.get("/api/products/search", params={"q": q, "page_size": 24})
+            samples.append((time.perf_counter() - started) * 1000)
+            response.raise_for_status()
+    return samples
+
+
+def report(label: str, samples: list[float]) -> None:
+    print(
+        f"{label:<10} n={len(samples):<4} p50={percentile(samples, 50):7.1f} ms  "
+        f"p95={percentile(samples, 95):7.1f} ms  max={max(samples):7.1f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    await build_catalog(args.products)
+    async with AsyncSessionLocal() as db:
+        await code_index.ensure_fresh(db)
+    print(f"Catálogo: {args.products} productos ({engine.dialect.name}), listo en {time.perf_counter() - started:.1f} s")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await measure(client, 1)  # Calentar caches de páginas de la base
+        report("full-text", await measure(client, args.rounds))
+
+        # Filtro anterior: ILIKE sin el índice de códigos
+        dialect, lookup = product_search.dialect, code_index.lookup
+        product_search.dialect, code_index.lookup = "ilike", lambda q, limit: []
+        try:
+            await measure(client, 1)
+            report("ILIKE", await measure(client, args.rounds))
+        finally:
+            product_search.dialect, code_index.lookup = dialect, lookup
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+"""
+Micro-benchmark: serializar una página de 1000 productos x 5 imágenes
+
+Compara el camino anterior (product_to_response campo por campo, validación
+de cada imagen y después la segunda validación + encode de response_model
+que hacía FastAPI) con dump_product_list (un TypeAdapter, directo a bytes).
+Los productos son entidades en memoria: no hay base de datos de por medio.
+
+Uso (desde backend/):
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --products 1000 --images 5 --rounds 50
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+from decimal import Decimal
+from benchmarks.catalog import percentile
+from pydantic import TypeAdapter
+from app.models.category import Category
+from app.models.product import Product
+from app.models.product_image import ProductImage
+from app.schemas.product import ProductResponse, ProductImageResponse, ProductListResponse
+from app.utils.serialization import dump_product_list
+
+_list_adapter = TypeAdapter(ProductListResponse)
+
+
+def build_page(products: int, images: int) -> list[Product]:
+    now = datetime(2025, 1, 1)
+    category = Category(id=1, name="Frenos", slug="frenos", is_active=True, display_order=0, created_at=now)
+    page = []
+    for i in range(products):
+        sha = f"{i:064x}"
+        product = Product(
+            id=i + 1, category_id=1, category=category, name=f"Pulmón de freno {i}", code=f"PF-{i:06d}",
+            brand="Wabco", description="Pulmón de freno doble para semirremolque.", price=Decimal("15990.00"),
+            original_price=Decimal("18990.00"), stock=i % 7, image_url=f"/uploads/products/{sha}.jpg",
+            is_active=True, is_featured=False, is_new=False, is_on_promotion=i % 3 == 0,
+            rating=Decimal("4.5"), reviews_count=12, created_at=now, updated_at=now,
+        )
+        product.images = [
+            ProductImage(id=i * images + n + 1, product_id=i + 1, image_url=f"/uploads/products/{sha[:-1]}{n}.jpg",
+                         display_order=n, is_primary=n == 0, alt_text=None, created_at=now)
+            for n in range(images)
+        ]
+        page.append(product)
+    return page
+
+
+def product_to_response(p: Product) -> ProductResponse:
+    """El helper de antes (duplicado en products.py y admin.py)"""
+    return ProductResponse(
+        id=p.id, category_id=p.category_id, category=p.category, name=p.name, code=p.code, brand=p.brand,
+        description=p.description, price=p.price, original_price=p.original_price, stock=p.stock,
+        image_url=p.image_url,
+        images=[ProductImageResponse.model_validate(img) for img in (p.images or [])],
+        is_active=p.is_active, is_featured=p.is_featured, is_new=p.is_new, is_on_promotion=p.is_on_promotion,
+        rating=p.rating, reviews_count=p.reviews_count, in_stock=p.in_stock,
+        discount_percent=p.discount_percent, created_at=p.created_at, updated_at=p.updated_at,
+    )
+
+
+def previous(page: list[Product], meta: dict) -> bytes:
+    """Respuesta del endpoint + lo que hacía FastAPI con response_model"""
+    response = ProductListResponse(items=[product_to_response(p) for p in page], **meta)
+    validated = _list_adapter.validate_python(response.model_dump())
+    return json.dumps(_list_adapter.dump_python(validated, mode="json"), separators=(",", ":")).encode()
+
+
+def current(page: list[Product], meta: dict) -> bytes:
+    return dump_product_list(page, **meta)
+
+
+def measure(serialize, page: list[Product], meta: dict, rounds: int) -> list[float]:
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        serialize(page, meta)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(label: str, samples: list[float]) -> None:
+    print(f"{label:<20} p50={percentile(samples, 50):7.1f} ms  p95={percentile(samples, 95):7.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--images", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=30)
+    args = parser.parse_args()
+
+    page = build_page(args.products, args.images)
+    meta = {"total": args.products, "page": 1, "page_size": args.products, "total_pages": 1}
+    # Mismo contenido por los dos caminos
+    assert json.loads(previous(page, meta)) == json.loads(current(page, meta))
+
+    print(f"{args.products} productos x {args.images} imágenes")
+    for label, serialize in (("product_to_response", previous), ("dump_product_list", current)):
+        measure(serialize, page, meta, 3)  # Calentar
+        report(label, measure(serialize, page, meta, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark: memoria al subir 50 imágenes de ~5MB en un solo POST /api/uploads/images
+
+Compara el endpoint actual (image_ingest: el multipart se lee en streaming
+y cada archivo va por bloques a un temporal) con el anterior (UploadFile:
+Starlette parsea el formulario entero y file.read() carga cada archivo en
+memoria, hasta UPLOAD_CONCURRENCY a la vez). El cliente genera el cuerpo
+por bloques de 64KB, así que lo que se mide es lo que retiene el servidor:
+el pico de memoria de Python (tracemalloc) durante el request.
+
+Uso (desde backend/):
+    python -m benchmarks.upload_memory
+    python -m benchmarks.upload_memory --files 50 --size-mb 5
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from benchmarks.catalog import build_catalog
+import httpx
+from fastapi import FastAPI, UploadFile, File
+from sqlalchemy import delete
+from app.main import app
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.image_blob import ImageBlob
+from app.models.user import User, UserRole
+from app.services.image_ingest import image_ingest
+from app.services.image_store import image_store
+from app.services.image_variants import image_variants
+from app.utils.security import create_access_token, get_password_hash
+
+EMAIL = "uploads@maldonado-bench.com"
+CHUNK = 64 * 1024
+BOUNDARY = "limite-benchmark"
+
+
+def previous_app(upload_dir: Path) -> FastAPI:
+    """El endpoint anterior: UploadFile, file.read() y escritura bloqueante"""
+    previous = FastAPI()
+
+    @previous.post("/api/uploads/images")
+    async def upload_images(files: list[UploadFile] = File(...)):
+        slots = asyncio.Semaphore(settings.UPLOAD_CONCURRENCY)
+
+        async def upload_one(file: UploadFile) -> bool:
+            async with slots:
+                contents = await file.read()
+                with open(upload_dir / f"{os.urandom(8).hex()}.jpg", "wb") as f:
+                    f.write(contents)
+                return True
+
+        results = await asyncio.gather(*(upload_one(file) for file in files))
+        return {"uploaded": sum(results)}
+
+    return previous
+
+
+async def body(files: int, size: int):
+    """Multipart generado por bloques: el cliente nunca tiene un archivo entero"""
+    for n in range(files):
+        yield (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"files\"; filename=\"foto{n}.jpg\"\r\n"
+               f"Content-Type: image/jpeg\r\n\r\n").encode() + b"\xff\xd8\xff\xe0"
+        remaining = size - 4
+        while remaining > 0:
+            yield os.urandom(min(CHUNK, remaining))
+            remaining -= CHUNK
+        yield b"\r\n"
+    yield f"--{BOUNDARY}--\r\n".encode()
+
+
+async def measure(target: FastAPI, headers: dict, files: int, size: int) -> tuple[float, float, dict]:
+    """(pico de memoria en MB, segundos, respuesta)"""
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=target), base_url="http://bench",
+                                 timeout=None) as client:
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = await client.post(
+            "/api/uploads/images", content=body(files, size),
+            headers=headers | {"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"},
+        )
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    response.raise_for_status()
+    return peak / (1024 * 1024), elapsed, response.json()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--size-mb", type=float, default=5)
+    args = parser.parse_args()
+    # Justo por debajo del máximo por archivo
+    size = int(args.size_mb * 1024 * 1024) - 1024
+
+    await build_catalog(100)
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(User).where(User.email == EMAIL))
+        await db.execute(delete(ImageBlob))
+        admin = User(email=EMAIL, password_hash=get_password_hash("secreta123"), name="Uploads", role=UserRole.ADMIN)
+        db.add(admin)
+        await db.commit()
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': str(admin.id)})}"}
+
+    workdir = Path(tempfile.mkdtemp(prefix="maldonado-uploads-"))
+    image_store.upload_dir = workdir / "products"
+    image_ingest.tmp_dir = workdir / "tmp"
+    image_variants.eager = False  # Solo la recepción: sin generar variantes
+    (workdir / "previous").mkdir()
+    print(f"{args.files} archivos x {size / (1024 * 1024):.2f}MB, UPLOAD_CONCURRENCY={settings.UPLOAD_CONCURRENCY}")
+    try:
+        for label, target in (("UploadFile + read()", previous_app(workdir / "previous")), ("image_ingest", app)):
+            peak, elapsed, result = await measure(target, headers, args.files, size)
+            uploaded = result.get("uploaded")
+            print(f"{label:<20} pico={peak:7.1f} MB  tiempo={elapsed:6.2f} s  subidos={uploaded}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,191 @@
+"""
+Servidor falso de Cloudinary para desarrollo y pruebas
+Implementa lo que usa app/services/cloudinary_service.py:
+- POST /v1_1/{cloud}/image/upload
+- POST /v1_1/{cloud}/image/destroy
+- GET /v1_1/{cloud}/resources/image/upload (Admin API: listado por prefix)
+- DELETE /v1_1/{cloud}/resources/image/upload (Admin API: hasta 100 public_ids)
+y sirve las imágenes subidas en GET /{cloud}/image/upload/{public_id}.{format}
+(la secure_url que devuelve el upload). Las imágenes quedan en memoria.
+
+Uso:
+    FAKE_CLOUDINARY_LATENCY=0.5 uvicorn fake_cloudinary:app --port 8098
+    CLOUDINARY_API_URL=http://localhost:8098 CLOUDINARY_CLOUD_NAME=demo \\
+        CLOUDINARY_API_KEY=key CLOUDINARY_API_SECRET=secret uvicorn app.main:app
+
+Variables:
+    FAKE_CLOUDINARY_LATENCY    segundos de demora por request a la API (default 0)
+    FAKE_CLOUDINARY_FAIL_RATE  fracción de respuestas 503 (default 0)
+    FAKE_CLOUDINARY_SECRET     si se define, se verifica la firma de cada request
+"""
+import asyncio
+import base64
+import os
+import random
+import time
+import uuid
+from pathlib import PurePosixPath
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from cloudinary.utils import api_sign_request
+
+LATENCY = float(os.getenv("FAKE_CLOUDINARY_LATENCY", "0"))
+FAIL_RATE = float(os.getenv("FAKE_CLOUDINARY_FAIL_RATE", "0"))
+SECRET = os.getenv("FAKE_CLOUDINARY_SECRET", "")
+
+app = FastAPI(title="Fake Cloudinary")
+
+# public_id -> {"content", "format", "bytes", "created_at"}
+_resources: dict[str, dict] = {}
+
+# "METODO /ruta" -> cantidad de requests a la API
+_calls: dict[str, int] = {}
+
+DELETE_LIMIT = 100
+
+CONTENT_TYPES = {"jpg": "image/jpeg", "png": "image/png", "gif": "image/gif", "webp": "image/webp"}
+
+
+def _error(message: str, status_code: int) -> JSONResponse:
+    return JSONResponse({"error": {"message": message}}, status_code=status_code)
+
+
+@app.middleware("http")
+async def simulate_upstream(request: Request, call_next):
+    """Demora y fallas simuladas (solo en la API, no en la entrega)"""
+    if request.url.path.startswith("/v1_1/"):
+        route = f"{request.method} /{request.url.path.split('/', 3)[-1]}"
+        _calls[route] = _calls.get(route, 0) + 1
+        if LATENCY:
+            await asyncio.sleep(LATENCY)
+        if FAIL_RATE and random.random() < FAIL_RATE:
+            return _error("simulated failure", 503)
+    return await call_next(request)
+
+
+async def _signed_params(request: Request) -> tuple[dict, object]:
+    form = await request.form()
+    params = {k: v for k, v in form.items() if k not in ("file", "signature", "api_key", "resource_type")}
+    if SECRET and form.get("signature") != api_sign_request(params, SECRET):
+        raise ValueError("Invalid Signature")
+    return params, form.get("file")
+
+
+@app.post("/v1_1/{cloud}/image/upload")
+async def upload(cloud: str, request: Request):
+    try:
+        params, file = await _signed_params(request)
+    except ValueError as e:
+        return _error(str(e), 401)
+    if file is None or isinstance(file, str):
+        return _error("Missing required parameter - file", 400)
+
+    content = await file.read()
+    fmt = PurePosixPath(file.filename or "").suffix.lstrip(".").lower() or "jpg"
+    fmt = "jpg" if fmt == "jpeg" else fmt
+    # Como la API real: folder + public_id -> "<folder>/<public_id>"
+    public_id = f"{params.get('folder', '')}/{params.get('public_id') or uuid.uuid4().hex[:20]}".lstrip("/")
+    _resources[public_id] = {
+        "content": content,
+        "format": fmt,
+        "bytes": len(content),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    base = str(request.base_url).rstrip("/")
+    return {
+        "public_id": public_id,
+        "version": 1,
+        "format": fmt,
+        "resource_type": "image",
+        "bytes": len(content),
+        "width": None,
+        "height": None,
+        "secure_url": f"{base}/{cloud}/image/upload/v1/{public_id}.{fmt}",
+    }
+
+
+@app.post("/v1_1/{cloud}/image/destroy")
+async def destroy(cloud: str, request: Request):
+    try:
+        params, _ = await _signed_params(request)
+    except ValueError as e:
+        return _error(str(e), 401)
+    found = _resources.pop(params.get("public_id", ""), None)
+    return {"result": "ok" if found else "not found"}
+
+
+def _admin_authorized(request: Request) -> bool:
+    """Admin API: basic auth api_key:api_secret (solo se verifica el secret)"""
+    if not SECRET:
+        return True
+    scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "basic":
+        return False
+    try:
+        _, _, secret = base64.b64decode(credentials).decode().partition(":")
+    except ValueError:
+        return False
+    return secret == SECRET
+
+
+@app.get("/v1_1/{cloud}/resources/image/upload")
+async def list_resources(cloud: str, request: Request, prefix: str = "", max_results: int = 10, next_cursor: str = ""):
+    if not _admin_authorized(request):
+        return _error("Invalid credentials", 401)
+    max_results = min(max(max_results, 1), 500)
+    matching = sorted(public_id for public_id in _resources if public_id.startswith(prefix))
+    start = int(next_cursor or 0)
+    page = matching[start:start + max_results]
+    base = str(request.base_url).rstrip("/")
+    body = {
+        "resources": [
+            {
+                "public_id": public_id,
+                "format": _resources[public_id]["format"],
+                "bytes": _resources[public_id]["bytes"],
+                "created_at": _resources[public_id]["created_at"],
+                "secure_url": f"{base}/{cloud}/image/upload/v1/{public_id}.{_resources[public_id]['format']}",
+            }
+            for public_id in page
+        ]
+    }
+    if start + max_results < len(matching):
+        body["next_cursor"] = str(start + max_results)
+    return body
+
+
+@app.delete("/v1_1/{cloud}/resources/image/upload")
+async def delete_resources(cloud: str, request: Request):
+    if not _admin_authorized(request):
+        return _error("Invalid credentials", 401)
+    public_ids = request.query_params.getlist("public_ids[]")
+    if not public_ids:
+        return _error("Missing required parameter - public_ids", 400)
+    if len(public_ids) > DELETE_LIMIT:
+        return _error(f"Too many public_ids (max {DELETE_LIMIT})", 400)
+    deleted = {
+        public_id: "deleted" if _resources.pop(public_id, None) else "not_found"
+        for public_id in public_ids
+    }
+    return {"deleted": deleted, "partial": False}
+
+
+@app.get("/{cloud}/image/upload/v1/{path:path}")
+async def deliver(cloud: str, path: str):
+    public_id, _, _ = path.rpartition(".")
+    resource = _resources.get(public_id)
+    if resource is None:
+        return Response(status_code=404)
+    return Response(resource["content"], media_type=CONTENT_TYPES.get(resource["format"], "image/jpeg"))
+
+
+@app.get("/_resources")
+async def resources():
+    """Para inspección en pruebas: public_id -> tamaño"""
+    return {public_id: r["bytes"] for public_id, r in _resources.items()}
+
+
+@app.get("/_calls")
+async def calls():
+    """Para inspección en pruebas: requests recibidos por ruta de la API"""
+    return _calls
@@ -0,0 +1,81 @@
+"""
+Servidor falso de MercadoPago para desarrollo y pruebas
+Implementa lo que usa app/services/mercadopago.py:
+- POST /checkout/preferences
+- GET  /v1/payments/{id}
+y POST /v1/payments para registrar pagos simulados (el webhook luego los consulta).
+
+Uso:
+    FAKE_MP_LATENCY=2 FAKE_MP_FAIL_RATE=0.1 uvicorn fake_mercadopago:app --port 8099
+    MERCADOPAGO_API_URL=http://localhost:8099 uvicorn app.main:app
+
+Variables:
+    FAKE_MP_LATENCY    segundos de demora por respuesta (default 0)
+    FAKE_MP_FAIL_RATE  fracción de respuestas 503 (default 0)
+"""
+import asyncio
+import itertools
+import os
+import random
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+LATENCY = float(os.getenv("FAKE_MP_LATENCY", "0"))
+FAIL_RATE = float(os.getenv("FAKE_MP_FAIL_RATE", "0"))
+
+app = FastAPI(title="Fake MercadoPago")
+
+_ids = itertools.count(1000)
+_payments: dict[str, dict] = {}
+_preferences_by_key: dict[str, dict] = {}
+
+
+@app.middleware("http")
+async def simulate_upstream(request: Request, call_next):
+    """Demora y fallas simuladas"""
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+    if FAIL_RATE and random.random() < FAIL_RATE:
+        return JSONResponse({"message": "simulated failure"}, status_code=503)
+    return await call_next(request)
+
+
+@app.post("/checkout/preferences", status_code=201)
+async def create_preference(request: Request):
+    # Misma X-Idempotency-Key -> misma preferencia (como la API real)
+    key = request.headers.get("x-idempotency-key")
+    if key and key in _preferences_by_key:
+        return _preferences_by_key[key]
+    data = await request.json()
+    preference_id = f"fake-pref-{next(_ids)}"
+    preference = {
+        "id": preference_id,
+        "init_point": f"http://localhost:8099/checkout?pref_id={preference_id}",
+        "sandbox_init_point": f"http://localhost:8099/sandbox/checkout?pref_id={preference_id}",
+        "external_reference": data.get("external_reference"),
+        "items": data.get("items", []),
+    }
+    if key:
+        _preferences_by_key[key] = preference
+    return preference
+
+
+@app.post("/v1/payments", status_code=201)
+async def register_payment(request: Request):
+    """Registra un pago simulado: {"external_reference": "...", "status": "approved"}"""
+    data = await request.json()
+    payment_id = str(next(_ids))
+    _payments[payment_id] = {
+        "id": int(payment_id),
+        "status": data.get("status", "approved"),
+        "external_reference": data.get("external_reference"),
+    }
+    return _payments[payment_id]
+
+
+@app.get("/v1/payments/{payment_id}")
+async def get_payment(payment_id: str):
+    payment = _payments.get(payment_id)
+    if payment is None:
+        raise HTTPException(status_code=404, detail="Payment not found")
+    return payment
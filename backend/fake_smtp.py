@@ -0,0 +1,72 @@
+"""
+Servidor SMTP falso para desarrollo y pruebas (requiere aiosmtpd: pip install aiosmtpd)
+Acepta todo sin TLS ni login y cuenta los mensajes recibidos.
+
+Uso:
+    FAKE_SMTP_CONNECT_LATENCY=0.2 python fake_smtp.py --port 8025
+    SMTP_HOST=localhost SMTP_PORT=8025 SMTP_USER=noreply@localhost SMTP_STARTTLS=false uvicorn app.main:app
+
+Variables:
+    FAKE_SMTP_CONNECT_LATENCY  segundos extra en el EHLO (simula TLS + login remotos; default 0)
+    FAKE_SMTP_LATENCY          segundos de demora por mensaje (default 0)
+    FAKE_SMTP_FAIL_RATE        fracción de mensajes rechazados con 451 temporal (default 0)
+Los destinatarios @invalid.test se rechazan con 550 (error permanente).
+"""
+import argparse
+import asyncio
+import os
+import random
+from aiosmtpd.controller import Controller
+
+CONNECT_LATENCY = float(os.getenv("FAKE_SMTP_CONNECT_LATENCY", "0"))
+LATENCY = float(os.getenv("FAKE_SMTP_LATENCY", "0"))
+FAIL_RATE = float(os.getenv("FAKE_SMTP_FAIL_RATE", "0"))
+
+
+class Handler:
+    def __init__(self):
+        self.connections = 0
+        self.messages = []
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        if CONNECT_LATENCY:
+            await asyncio.sleep(CONNECT_LATENCY)
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.endswith("@invalid.test"):
+            return "550 5.1.1 Mailbox does not exist"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if LATENCY:
+            await asyncio.sleep(LATENCY)
+        if FAIL_RATE and random.random() < FAIL_RATE:
+            return "451 4.3.0 Simulated temporary failure"
+        self.messages.append(envelope)
+        return "250 Message accepted"
+
+
+def start(port: int = 8025) -> tuple[Controller, Handler]:
+    handler = Handler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    return controller, handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+    controller, handler = start(args.port)
+    print(f"Fake SMTP en 127.0.0.1:{args.port} (Ctrl+C para salir)")
+    try:
+        asyncio.run(asyncio.Event().wait())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        controller.stop()
+        print(f"{handler.connections} conexiones, {len(handler.messages)} mensajes")
@@ -0,0 +1,68 @@
+"""
+Fixtures de los tests
+Cada test corre contra una base SQLite nueva (en un directorio temporal) y
+llama a la app en proceso, sin el lifespan (no arrancan los workers).
+"""
+import os
+import tempfile
+
+_workdir = tempfile.mkdtemp(prefix="maldonado-tests-")
+# timeout: con muchos requests simultáneos las escrituras de SQLite esperan su turno
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_workdir}/test.db?timeout=60"
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+
+import httpx
+import pytest
+from app.database import engine, create_tables, drop_tables, AsyncSessionLocal
+from app.main import app
+from app.models.user import User, UserRole
+from app.services.cart_summary import cart_summary
+from app.services.dashboard import dashboard_stats
+from app.services.product_count import product_counter
+from app.services.search import product_search
+from app.services.user_cache import user_cache
+from app.utils.security import create_access_token
+
+
+@pytest.fixture(autouse=True)
+async def database():
+    await drop_tables()
+    await create_tables()
+    async with engine.begin() as conn:
+        await product_search.ensure_schema(conn)
+    yield
+    # Las caches por worker guardan ids que se reusan en el próximo test
+    user_cache._cache.clear()
+    cart_summary._cache.clear()
+    dashboard_stats.invalidate()
+    product_counter.invalidate()
+    # Las conexiones quedan atadas al event loop de este test
+    await engine.dispose()
+
+
+@pytest.fixture
+async def db():
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+async def client():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        yield http
+
+
+def auth_headers(user: User) -> dict:
+    token = create_access_token({"sub": str(user.id), "role": user.role.value})
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def create_users(db, count: int, role: UserRole = UserRole.USER) -> list[User]:
+    users = [
+        User(email=f"{role.value}{n}@test.com", password_hash="x", name=f"Usuario {n}", role=role)
+        for n in range(count)
+    ]
+    db.add_all(users)
+    await db.commit()
+    return users
@@ -0,0 +1,77 @@
+"""
+Usuario autenticado: la cache guarda solo el principal y /auth/me carga la
+fila completa. Con bcrypt saturado, login y registro responden 503.
+"""
+import pytest
+from app.models.user import UserRole
+from app.services.passwords import PasswordService, PasswordServiceBusy, password_service
+from app.services.user_cache import Principal, user_cache
+from tests.conftest import auth_headers, create_users
+
+
+async def test_user_cache_keeps_only_the_principal(client, db):
+    (user,) = await create_users(db, 1)
+
+    response = await client.get("/api/cart/summary", headers=auth_headers(user))
+    assert response.status_code == 200
+
+    cached = user_cache._cache.get(user.id)
+    assert cached == Principal(user.id, user.email, user.name, UserRole.USER, True)
+    assert "password_hash" not in cached._fields
+
+
+async def test_me_loads_and_updates_the_full_user(client, db):
+    (user,) = await create_users(db, 1)
+    headers = auth_headers(user)
+
+    response = await client.get("/api/auth/me", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["email"] == user.email
+
+    response = await client.put("/api/auth/me", json={"name": "Nuevo nombre", "phone": "099123456"},
+                                headers=headers)
+    assert response.status_code == 200
+    assert response.json()["name"] == "Nuevo nombre"
+    assert response.json()["phone"] == "099123456"
+
+    # La actualización invalida la cache: el próximo request ve el nombre nuevo
+    await client.get("/api/auth/me", headers=headers)
+    assert user_cache._cache.get(user.id).name == "Nuevo nombre"
+
+
+async def test_admin_endpoints_check_the_cached_role(client, db):
+    (user,) = await create_users(db, 1)
+    (admin,) = await create_users(db, 1, role=UserRole.ADMIN)
+
+    response = await client.get("/api/admin/users", headers=auth_headers(user))
+    assert response.status_code == 403
+    response = await client.get("/api/admin/users", headers=auth_headers(admin))
+    assert response.status_code == 200
+
+
+async def test_password_service_raises_busy_when_queue_times_out():
+    service = PasswordService(max_workers=1, queue_timeout=0.01)
+    await service._slots.acquire()  # El único thread, ocupado
+
+    with pytest.raises(PasswordServiceBusy):
+        await service.hash("secreta123")
+
+    service._slots.release()
+    assert await service.verify("secreta123", await service.hash("secreta123"))
+
+
+async def test_busy_password_service_returns_503(client, db, monkeypatch):
+    await create_users(db, 1, role=UserRole.ADMIN)
+
+    async def busy(*args):
+        raise PasswordServiceBusy("ocupado")
+    monkeypatch.setattr(password_service, "_run", busy)
+
+    responses = [
+        await client.post("/api/auth/login", data={"username": "admin0@test.com", "password": "secreta123"}),
+        await client.post("/api/auth/register",
+                          json={"email": "nuevo@test.com", "password": "secreta123", "name": "Nuevo"}),
+    ]
+    for response in responses:
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "5"
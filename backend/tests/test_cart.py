@@ -0,0 +1,36 @@
+"""
+Resumen del carrito: borrar un producto desde el admin invalida el resumen
+cacheado de los usuarios que lo tenían en el carrito
+"""
+from decimal import Decimal
+from app.models.category import Category
+from app.models.product import Product
+from app.models.user import UserRole
+from tests.conftest import auth_headers, create_users
+
+
+async def test_deleting_product_refreshes_cart_summaries(client, db):
+    category = Category(name="Frenos", slug="frenos")
+    db.add(category)
+    await db.flush()
+    product = Product(category_id=category.id, name="Pulmón de freno", code="PF-1", brand="Wabco",
+                      price=Decimal(1000), stock=10)
+    db.add(product)
+    await db.commit()
+    users = await create_users(db, 2)
+    (admin,) = await create_users(db, 1, role=UserRole.ADMIN)
+
+    for user in users:
+        response = await client.post("/api/cart/add", json={"product_id": product.id, "quantity": 2},
+                                     headers=auth_headers(user))
+        assert response.status_code == 200
+        summary = (await client.get("/api/cart/summary", headers=auth_headers(user))).json()
+        assert summary["items_count"] == 1
+
+    response = await client.delete(f"/api/admin/products/{product.id}", headers=auth_headers(admin))
+    assert response.status_code == 204
+
+    for user in users:
+        summary = (await client.get("/api/cart/summary", headers=auth_headers(user))).json()
+        assert summary["items_count"] == 0
+        assert summary["total_quantity"] == 0
@@ -0,0 +1,53 @@
+"""
+GET /api/categories: la cantidad de queries no depende de la cantidad de
+categorías (antes se hacía un COUNT por categoría)
+"""
+from contextlib import contextmanager
+from decimal import Decimal
+from sqlalchemy import event
+from app.database import engine
+from app.models.category import Category
+from app.models.product import Product
+
+
+@contextmanager
+def count_statements():
+    statements: list[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def create_categories(db, start: int, count: int) -> None:
+    categories = [Category(name=f"Categoría {n}", slug=f"categoria-{n}") for n in range(start, start + count)]
+    db.add_all(categories)
+    await db.flush()
+    db.add_all(
+        Product(category_id=category.id, name=f"Producto {n}", code=f"P-{n}", brand="SKF", price=Decimal(100))
+        for n, category in enumerate(categories, start)
+    )
+    await db.commit()
+
+
+async def list_categories_statements(client) -> tuple[int, int]:
+    with count_statements() as statements:
+        response = await client.get("/api/categories")
+    assert response.status_code == 200
+    return len(response.json()), len(statements)
+
+
+async def test_list_categories_query_count_is_constant(client, db):
+    await create_categories(db, 0, 1)
+    categories, single = await list_categories_statements(client)
+    assert categories == 1 and single >= 1
+
+    await create_categories(db, 1, 24)
+    categories, many = await list_categories_statements(client)
+    assert categories == 25
+    assert many == single
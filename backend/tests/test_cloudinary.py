@@ -0,0 +1,131 @@
+"""
+Subidas a Cloudinary contra fake_cloudinary.py (con verificación de firma):
+la imagen se envía por bloques desde el temporal, se reintenta ante 5xx y
+el mismo contenido se sube una sola vez
+"""
+import hashlib
+import os
+import httpx
+import pytest
+import fake_cloudinary
+from app.models.user import UserRole
+from app.services.cloudinary_service import cloudinary_service
+from app.services.image_store import CLOUDINARY_FOLDER
+from tests.conftest import auth_headers, create_users
+
+UPLOAD = "POST /image/upload"
+
+
+class FailFirst:
+    """Reemplaza a random en fake_cloudinary: los primeros `count` requests reciben 503"""
+
+    def __init__(self, count: int):
+        self.count = count
+
+    def random(self) -> float:
+        self.count -= 1
+        return 0.0 if self.count >= 0 else 1.0
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """fake_cloudinary en proceso; guarda el tamaño de los bloques de cada request"""
+
+    def __init__(self):
+        self.upstream = httpx.ASGITransport(app=fake_cloudinary.app)
+        self.chunks: list[list[int]] = []
+
+    async def handle_async_request(self, request):
+        chunks = [chunk async for chunk in request.stream]
+        self.chunks.append([len(chunk) for chunk in chunks])
+        body = httpx.Request(request.method, request.url, headers=request.headers, content=b"".join(chunks))
+        return await self.upstream.handle_async_request(body)
+
+
+@pytest.fixture
+async def cloudinary(monkeypatch):
+    monkeypatch.setattr(fake_cloudinary, "SECRET", "secret")
+    monkeypatch.setattr(fake_cloudinary, "_calls", {})
+    monkeypatch.setattr(fake_cloudinary, "_resources", {})
+    transport = RecordingTransport()
+    client = httpx.AsyncClient(transport=transport, base_url="http://fake-cloudinary/v1_1/demo")
+    monkeypatch.setattr(cloudinary_service, "cloud_name", "demo")
+    monkeypatch.setattr(cloudinary_service, "api_key", "key")
+    monkeypatch.setattr(cloudinary_service, "api_secret", "secret")
+    monkeypatch.setattr(cloudinary_service, "_client", client)
+    monkeypatch.setattr(cloudinary_service, "_backoff", lambda attempt: 0)
+    yield transport
+    await client.aclose()
+
+
+@pytest.fixture
+async def admin_headers(db):
+    (admin,) = await create_users(db, 1, role=UserRole.ADMIN)
+    return auth_headers(admin)
+
+
+def jpeg(size: int) -> bytes:
+    return b"\xff\xd8\xff\xe0" + os.urandom(size - 4)
+
+
+async def test_upload_is_signed_and_streamed(client, admin_headers, cloudinary):
+    content = jpeg(300 * 1024)
+    response = await client.post("/api/uploads/image", files={"file": ("foto.jpg", content, "image/jpeg")},
+                                 headers=admin_headers)
+
+    assert response.status_code == 200
+    assert response.json()["storage"] == "cloudinary"
+    public_id = f"{CLOUDINARY_FOLDER}/{hashlib.sha256(content).hexdigest()}"
+    assert fake_cloudinary._resources[public_id]["content"] == content
+    # Sale del temporal de a bloques: ningún bloque lleva la imagen entera
+    (chunks,) = cloudinary.chunks
+    assert max(chunks) < len(content)
+
+
+async def test_wrong_signature_is_rejected(client, admin_headers, cloudinary, monkeypatch):
+    monkeypatch.setattr(cloudinary_service, "api_secret", "otro")
+    response = await client.post("/api/uploads/image", files={"file": ("foto.jpg", jpeg(1024), "image/jpeg")},
+                                 headers=admin_headers)
+
+    assert response.status_code == 500
+    assert "Invalid Signature" in response.json()["detail"]
+    assert fake_cloudinary._resources == {}
+
+
+async def test_upload_is_retried_on_5xx(client, admin_headers, cloudinary, monkeypatch):
+    monkeypatch.setattr(fake_cloudinary, "FAIL_RATE", 0.5)
+    monkeypatch.setattr(fake_cloudinary, "random", FailFirst(2))
+    content = jpeg(200 * 1024)
+
+    response = await client.post("/api/uploads/image", files={"file": ("foto.jpg", content, "image/jpeg")},
+                                 headers=admin_headers)
+
+    assert response.status_code == 200
+    assert fake_cloudinary._calls[UPLOAD] == 3
+    # Cada reintento vuelve a enviar el archivo completo
+    (resource,) = fake_cloudinary._resources.values()
+    assert resource["content"] == content
+
+
+async def test_same_content_is_uploaded_once(client, admin_headers, cloudinary):
+    content = jpeg(64 * 1024)
+    urls = []
+    for name in ("foto.jpg", "copia.jpg"):
+        response = await client.post("/api/uploads/image", files={"file": (name, content, "image/jpeg")},
+                                     headers=admin_headers)
+        urls.append(response.json()["image_url"])
+
+    assert urls[0] == urls[1]
+    assert fake_cloudinary._calls[UPLOAD] == 1
+
+
+async def test_same_content_in_one_request_is_uploaded_once(client, admin_headers, cloudinary):
+    content = jpeg(64 * 1024)
+    files = [("files", (f"foto{n}.jpg", content, "image/jpeg")) for n in range(3)]
+    files.append(("files", ("otra.jpg", jpeg(64 * 1024), "image/jpeg")))
+
+    response = await client.post("/api/uploads/images", files=files, headers=admin_headers)
+
+    results = response.json()["results"]
+    assert [result["success"] for result in results] == [True] * 4
+    assert sum(result["deduplicated"] for result in results) == 2
+    assert fake_cloudinary._calls[UPLOAD] == 2
@@ -0,0 +1,39 @@
+"""
+Snapshot de las estadísticas del dashboard: registrar un usuario y crear o
+borrar un producto lo descartan (no solo pedidos y cotizaciones)
+"""
+from app.models.category import Category
+from app.models.user import UserRole
+from tests.conftest import auth_headers, create_users
+
+
+async def test_snapshot_follows_users_and_products(client, db):
+    category = Category(name="Frenos", slug="frenos")
+    db.add(category)
+    await db.commit()
+    (admin,) = await create_users(db, 1, role=UserRole.ADMIN)
+    headers = auth_headers(admin)
+
+    async def stats() -> dict:
+        response = await client.get("/api/admin/stats", headers=headers)
+        assert response.status_code == 200
+        return response.json()
+
+    assert (await stats())["total_users"] == 1
+
+    response = await client.post("/api/auth/register", json={
+        "email": "nuevo@test.com", "password": "secreta123", "name": "Cliente nuevo",
+    })
+    assert response.status_code == 201
+    assert (await stats())["total_users"] == 2
+
+    response = await client.post("/api/admin/products", json={
+        "category_id": category.id, "name": "Pulmón de freno", "code": "PF-1", "brand": "Wabco",
+        "price": "1000", "stock": 5,
+    }, headers=headers)
+    assert response.status_code == 201
+    assert (await stats())["total_products"] == 1
+
+    response = await client.delete(f"/api/admin/products/{response.json()['id']}", headers=headers)
+    assert response.status_code == 204
+    assert (await stats())["total_products"] == 0
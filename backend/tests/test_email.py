@@ -0,0 +1,142 @@
+"""
+Outbox de emails contra fake_smtp.py (aiosmtpd): toma de lotes con lease,
+envío por una sola conexión, 4xx reintentable contra 5xx definitivo y filas
+que vuelven a la cola al vencer el lease
+"""
+import socket
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import select, update
+import fake_smtp
+from app.models.email_outbox import OutboxEmail, EmailStatus
+from app.services.email import email_service, SMTPSession
+from app.services.email_outbox import EmailOutbox
+
+
+class FailFirst:
+    """Reemplaza a random en fake_smtp: los primeros `count` mensajes reciben 451"""
+
+    def __init__(self, count: int):
+        self.count = count
+
+    def random(self) -> float:
+        self.count -= 1
+        return 0.0 if self.count >= 0 else 1.0
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    controller, handler = fake_smtp.start(port)
+    monkeypatch.setattr(email_service, "user", "noreply@localhost")
+    yield port, handler
+    controller.stop()
+
+
+def session_for(port: int) -> SMTPSession:
+    return SMTPSession(host="127.0.0.1", port=port, user="noreply@localhost", password="",
+                       start_tls=False, timeout=5, max_messages=100)
+
+
+def outbox(batch_size: int = 10) -> EmailOutbox:
+    return EmailOutbox(workers=1, batch_size=batch_size, max_attempts=3, retry_base=30,
+                       retry_max=3600, lease_seconds=300)
+
+
+async def queue(db, *recipients: str) -> list[OutboxEmail]:
+    emails = [OutboxEmail(to_email=to, subject=f"Pedido {n}", html_content=f"<p>{n}</p>", text_content=str(n))
+              for n, to in enumerate(recipients)]
+    db.add_all(emails)
+    await db.commit()
+    return emails
+
+
+async def rows(db) -> dict[str, OutboxEmail]:
+    db.expire_all()
+    return {email.to_email: email for email in (await db.execute(select(OutboxEmail))).scalars()}
+
+
+async def test_claim_leases_a_batch(db):
+    await queue(db, "a@test.com", "b@test.com", "c@test.com")
+    worker = outbox(batch_size=2)
+
+    first = await worker._claim()
+    second = await worker._claim()
+
+    assert len(first) == 2 and len(second) == 1
+    assert {row.id for row in first}.isdisjoint(row.id for row in second)
+    assert await worker._claim() == []
+    for email in (await rows(db)).values():
+        assert email.status == EmailStatus.SENDING
+        assert email.attempts == 1
+        assert email.next_attempt_at > datetime.utcnow() + timedelta(seconds=250)
+
+
+async def test_expired_lease_returns_rows_to_the_queue(db):
+    await queue(db, "a@test.com")
+    worker = outbox()
+    (claimed,) = await worker._claim()
+    assert await worker._claim() == []
+
+    # El worker murió sin registrar el envío: el lease vence
+    await db.execute(update(OutboxEmail).values(next_attempt_at=datetime.utcnow() - timedelta(seconds=1)))
+    await db.commit()
+
+    (reclaimed,) = await worker._claim()
+    assert reclaimed.id == claimed.id
+    assert reclaimed.attempts == 2
+
+
+async def test_batch_is_sent_over_one_connection(db, smtp):
+    port, handler = smtp
+    recipients = [f"cliente{n}@test.com" for n in range(5)]
+    await queue(db, *recipients)
+    worker, session = outbox(), session_for(port)
+
+    await worker._send_batch(session, await worker._claim())
+    await session.close()
+
+    assert handler.connections == 1
+    assert sorted(envelope.rcpt_tos[0] for envelope in handler.messages) == recipients
+    for email in (await rows(db)).values():
+        assert email.status == EmailStatus.SENT
+        assert email.sent_at is not None
+
+
+async def test_temporary_failure_is_retried_and_permanent_one_fails(db, smtp, monkeypatch):
+    port, handler = smtp
+    monkeypatch.setattr(fake_smtp, "FAIL_RATE", 0.5)
+    monkeypatch.setattr(fake_smtp, "random", FailFirst(1))
+    await queue(db, "a@test.com", "nadie@invalid.test", "c@test.com")
+    worker, session = outbox(), session_for(port)
+
+    await worker._send_batch(session, await worker._claim())
+    await session.close()
+
+    emails = await rows(db)
+    retried = emails["a@test.com"]
+    assert retried.status == EmailStatus.PENDING
+    assert "451" in retried.last_error
+    assert retried.next_attempt_at > datetime.utcnow()
+    failed = emails["nadie@invalid.test"]
+    assert failed.status == EmailStatus.FAILED
+    assert "550" in failed.last_error
+    assert emails["c@test.com"].status == EmailStatus.SENT
+    assert [envelope.rcpt_tos for envelope in handler.messages] == [["c@test.com"]]
+
+
+async def test_temporary_failure_on_last_attempt_fails(db, smtp, monkeypatch):
+    port, _ = smtp
+    monkeypatch.setattr(fake_smtp, "FAIL_RATE", 0.5)
+    monkeypatch.setattr(fake_smtp, "random", FailFirst(1))
+    await queue(db, "a@test.com")
+    await db.execute(update(OutboxEmail).values(attempts=2))
+    await db.commit()
+    worker, session = outbox(), session_for(port)
+
+    await worker._send_batch(session, await worker._claim())
+    await session.close()
+
+    assert (await rows(db))["a@test.com"].status == EmailStatus.FAILED
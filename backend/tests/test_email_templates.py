@@ -0,0 +1,70 @@
+"""
+Templates de email: el HTML escapa lo que viene del usuario (también los
+nombres de producto de la tabla de items) y el texto plano no
+"""
+from app.models.quote import Quote, QuoteItem
+from app.services.email import email_service
+from app.services.email_templates import email_templates
+
+XSS = '<script>alert("x")</script>'
+
+
+def build_quote(**overrides) -> Quote:
+    fields = {
+        "name": "Juan Pérez", "email": "juan@test.com", "phone": "0341555000",
+        "vehicle_info": "Scania R440", "message": "Necesito cotizar estos repuestos",
+    }
+    return Quote(**(fields | overrides))
+
+
+def build_items() -> list[QuoteItem]:
+    return [
+        QuoteItem(product_code="PF-001", product_name="Pulmón de freno 30/30", quantity=2),
+        QuoteItem(product_code="KR-7", product_name=f"Kit <reparación> & {XSS}", quantity=1),
+    ]
+
+
+def test_notification_renders_the_items_table():
+    subject, rendered = email_service.quote_notification(build_quote(), build_items())
+
+    assert subject == "Nueva Cotización - Juan Pérez"
+    assert 'class="items"' in rendered.html
+    assert rendered.html.count("<tr><td>") == 2
+    assert "<tr><td>PF-001</td><td>Pulmón de freno 30/30</td><td class=\"qty\">2</td></tr>" in rendered.html
+    assert "Productos (2):" in rendered.html
+    assert "- 2 x Pulmón de freno 30/30 (PF-001)" in rendered.text
+    assert "- 1 x Kit <reparación> & " in rendered.text
+
+
+def test_product_names_are_escaped_in_html():
+    _, rendered = email_service.quote_notification(build_quote(), build_items())
+
+    assert XSS not in rendered.html
+    assert "Kit &lt;reparación&gt; &amp; &lt;script&gt;alert(&#34;x&#34;)&lt;/script&gt;" in rendered.html
+    # El texto plano va tal cual
+    assert XSS in rendered.text
+
+
+def test_quote_fields_are_escaped_in_html():
+    quote = build_quote(name=f"Juan {XSS}", vehicle_info="<b>Volvo</b>", message=XSS)
+    for render in (email_service.quote_notification, email_service.quote_confirmation):
+        _, rendered = render(quote)
+        assert "<script>" not in rendered.html
+        assert "&lt;script&gt;" in rendered.html
+        assert XSS in rendered.text
+    _, rendered = email_service.quote_notification(quote)
+    assert "&lt;b&gt;Volvo&lt;/b&gt;" in rendered.html
+
+
+def test_confirmation_with_and_without_items():
+    _, rendered = email_service.quote_confirmation(build_quote(), build_items())
+    assert "¡Hola Juan Pérez!" in rendered.html
+    assert rendered.html.count("<tr><td>") == 2
+    assert "Productos:" in rendered.text
+    # Los estilos compartidos van sin escapar
+    assert str(email_templates.env.globals["styles"]) in rendered.html
+
+    _, rendered = email_service.quote_confirmation(build_quote(message=None))
+    assert 'class="items"' not in rendered.html
+    assert "Resumen de tu consulta:\n" not in rendered.text
+    assert "Productos:" not in rendered.text
@@ -0,0 +1,122 @@
+"""
+Variantes de imágenes locales (GET /uploads/variants/<preset>/<nombre>.<formato>):
+se generan en el pool de procesos la primera vez, después se sirven desde la
+cache en disco, y un preset o formato desconocido es 404
+"""
+import asyncio
+import io
+import pytest
+from PIL import Image
+from app.api import uploads
+from app.services.image_variants import image_variants
+from app.utils.image_urls import PRESETS
+
+
+@pytest.fixture(scope="module", autouse=True)
+def variant_pool():
+    # Un solo pool de procesos para todo el módulo (arrancar uno con spawn tarda)
+    yield
+    asyncio.run(image_variants.shutdown())
+
+
+@pytest.fixture
+def variants(tmp_path, monkeypatch):
+    upload_dir = tmp_path / "products"
+    upload_dir.mkdir()
+    monkeypatch.setattr(uploads, "UPLOAD_DIR", upload_dir)
+    monkeypatch.setattr(image_variants, "cache_dir", tmp_path / "variants")
+    monkeypatch.setattr(image_variants, "_hashes", {})
+    return upload_dir
+
+
+def photo(path, size=(1600, 1200), mode="RGB", fmt="JPEG") -> bytes:
+    image = Image.new(mode, size, (200, 40, 40, 255) if mode == "RGBA" else (200, 40, 40))
+    buffer = io.BytesIO()
+    image.save(buffer, fmt)
+    path.write_bytes(buffer.getvalue())
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("preset", list(PRESETS))
+@pytest.mark.parametrize("fmt, media_type, pil_format", [("webp", "image/webp", "WEBP"), ("jpg", "image/jpeg", "JPEG")])
+async def test_variant_is_generated(client, variants, preset, fmt, media_type, pil_format):
+    photo(variants / "foto.jpg")
+
+    response = await client.get(f"/uploads/variants/{preset}/foto.{fmt}")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == media_type
+    assert "immutable" in response.headers["cache-control"]
+    with Image.open(io.BytesIO(response.content)) as variant:
+        assert variant.format == pil_format
+        # Se conserva la proporción 4:3 con el lado mayor del preset
+        assert variant.size == (PRESETS[preset], PRESETS[preset] * 3 // 4)
+
+
+async def test_transparent_png_gets_a_white_background_as_jpeg(client, variants):
+    photo(variants / "logo.png", size=(800, 800), mode="RGBA", fmt="PNG")
+
+    response = await client.get("/uploads/variants/thumb/logo.jpg")
+
+    assert response.status_code == 200
+    with Image.open(io.BytesIO(response.content)) as variant:
+        assert variant.mode == "RGB"
+
+
+async def test_second_request_is_served_from_the_disk_cache(client, variants, monkeypatch):
+    photo(variants / "foto.jpg")
+    first = await client.get("/uploads/variants/card/foto.webp")
+    generated, hits = image_variants._generated, image_variants._hits
+
+    async def no_render(*args):
+        raise AssertionError("la variante ya estaba en cache")
+    monkeypatch.setattr(image_variants, "_render", no_render)
+    # Otro worker (sin la memoria de hashes) también la encuentra en disco
+    monkeypatch.setattr(image_variants, "_hashes", {})
+
+    second = await client.get("/uploads/variants/card/foto.webp")
+
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert image_variants._generated == generated
+    assert image_variants._hits == hits + 1
+    (cached,) = image_variants.cache_dir.rglob("*.webp")
+    assert cached.read_bytes() == first.content
+
+
+async def test_same_content_shares_the_cached_variant(client, variants):
+    content = photo(variants / "foto.jpg")
+    (variants / "copia.jpg").write_bytes(content)
+    await client.get("/uploads/variants/thumb/foto.webp")
+    generated = image_variants._generated
+
+    response = await client.get("/uploads/variants/thumb/copia.webp")
+
+    assert response.status_code == 200
+    assert image_variants._generated == generated
+    assert len(list(image_variants.cache_dir.rglob("*.webp"))) == 1
+
+
+@pytest.mark.parametrize("path", [
+    "/uploads/variants/huge/foto.webp",      # Preset desconocido
+    "/uploads/variants/card/foto.png",       # Formato desconocido
+    "/uploads/variants/card/foto",           # Sin formato
+    "/uploads/variants/card/otra.webp",      # Original inexistente
+    "/uploads/variants/card/..foto.webp",    # Nombre inválido
+])
+async def test_unknown_variant_is_404(client, variants, path):
+    photo(variants / "foto.jpg")
+
+    response = await client.get(path)
+
+    assert response.status_code == 404
+    assert not image_variants.cache_dir.exists()
+
+
+async def test_unreadable_image_redirects_to_the_original(client, variants):
+    (variants / "rota.jpg").write_bytes(b"\xff\xd8\xff\xe0 no es un jpeg")
+
+    response = await client.get("/uploads/variants/card/rota.webp")
+
+    assert response.status_code == 307
+    assert response.headers["location"] == "/uploads/products/rota.jpg"
@@ -0,0 +1,281 @@
+"""
+Imágenes por contenido: las filas que usan una imagen guardan su sha256
+(image_sha256), y el GC y DELETE /uploads/image cuentan las referencias por
+esa columna. El GC periódico corre en un solo worker por ciclo.
+
+La recepción en streaming valida tamaño y formato mientras llega el archivo
+y no deja temporales ante un error o un cliente que se desconecta.
+"""
+import asyncio
+import hashlib
+import os
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import update
+from starlette.requests import ClientDisconnect, Request
+from app.api import uploads
+from app.config import settings
+from app.models.banner import Banner
+from app.models.image_blob import ImageBlob
+from app.models.job_lease import JobLease
+from app.models.user import UserRole
+from app.services.image_gc import image_gc
+from app.services.image_ingest import IngestedImage, image_ingest
+from app.services.image_store import LOCAL, image_store
+from tests.conftest import auth_headers, create_users
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_gc, "upload_dir", tmp_path)
+    monkeypatch.setattr(uploads, "UPLOAD_DIR", tmp_path)
+    return tmp_path
+
+
+async def create_blob(db, upload_dir, content: bytes) -> str:
+    """Archivo + fila en image_blobs, con fecha vieja (fuera del tiempo mínimo del GC)"""
+    sha256 = hashlib.sha256(content).hexdigest()
+    path = upload_dir / f"{sha256}.jpg"
+    path.write_bytes(content)
+    os.utime(path, (0, 0))
+    db.add(ImageBlob(sha256=sha256, storage=LOCAL, url=f"/uploads/products/{path.name}", size=len(content), ext=".jpg"))
+    await db.commit()
+    return path.name
+
+
+async def test_gc_and_delete_count_references_by_key(client, db, upload_dir, monkeypatch):
+    (admin,) = await create_users(db, 1, role=UserRole.ADMIN)
+    headers = auth_headers(admin)
+    used = await create_blob(db, upload_dir, b"banner")
+    unused = await create_blob(db, upload_dir, b"huerfana")
+
+    response = await client.post(
+        "/api/banners", json={"title": "Promo", "image_url": f"/uploads/products/{used}"}, headers=headers
+    )
+    assert response.status_code == 201
+    banner_id = response.json()["id"]
+
+    # Todo está registrado: no hace falta leer las URLs de cada tabla
+    async def no_scan():
+        raise AssertionError("escaneo de URLs innecesario")
+    monkeypatch.setattr(image_gc, "_referenced", no_scan)
+
+    report = await image_gc.collect(dry_run=False, min_age_hours=0)
+    assert [item["name"] for item in report["local"]["items"]] == [unused]
+    assert not (upload_dir / unused).exists()
+    assert (upload_dir / used).exists()
+
+    response = await client.delete(f"/api/uploads/image/{used}", headers=headers)
+    assert response.status_code == 409
+
+    response = await client.delete(f"/api/banners/{banner_id}", headers=headers)
+    assert response.status_code == 204
+    response = await client.delete(f"/api/uploads/image/{used}", headers=headers)
+    assert response.status_code == 200
+    assert not (upload_dir / used).exists()
+
+
+async def test_shared_image_stays_in_use_until_last_reference(client, db, upload_dir):
+    (admin,) = await create_users(db, 1, role=UserRole.ADMIN)
+    headers = auth_headers(admin)
+    shared = await create_blob(db, upload_dir, b"compartida")
+    url = f"/uploads/products/{shared}"
+
+    banner_ids = []
+    for title in ("Uno", "Dos"):
+        response = await client.post("/api/banners", json={"title": title, "image_url": url}, headers=headers)
+        banner_ids.append(response.json()["id"])
+
+    response = await client.put(f"/api/banners/{banner_ids[0]}", json={"image_url": None}, headers=headers)
+    assert response.status_code == 200
+    response = await client.delete(f"/api/uploads/image/{shared}", headers=headers)
+    assert response.status_code == 409
+    assert "1 referencias" in response.json()["detail"]
+
+    await client.delete(f"/api/banners/{banner_ids[1]}", headers=headers)
+    response = await client.delete(f"/api/uploads/image/{shared}", headers=headers)
+    assert response.status_code == 200
+
+
+async def test_gc_rechecks_references_before_deleting(db, upload_dir, monkeypatch):
+    name = await create_blob(db, upload_dir, b"asignada durante el GC")
+    scan = image_gc._blobs
+
+    async def scan_then_assign(cutoff):
+        # La imagen se asigna a un banner después del primer escaneo
+        result = await scan(cutoff)
+        db.add(Banner(title="Nuevo", image_url=f"/uploads/products/{name}"))
+        await db.commit()
+        return result
+    monkeypatch.setattr(image_gc, "_blobs", scan_then_assign)
+
+    report = await image_gc.collect(dry_run=False, min_age_hours=0)
+    assert report["local"]["orphans"] == 1
+    assert report["local"]["now_in_use"] == 1
+    assert report["local"]["deleted"] == 0
+    assert (upload_dir / name).exists()
+
+
+async def test_gc_scans_urls_for_untracked_files(client, db, upload_dir):
+    # Archivos subidos antes de image_blobs: se decide por las URLs guardadas
+    (admin,) = await create_users(db, 1, role=UserRole.ADMIN)
+    for name in ("legacy-usada.jpg", "legacy-huerfana.jpg"):
+        (upload_dir / name).write_bytes(b"x")
+        os.utime(upload_dir / name, (0, 0))
+    response = await client.post(
+        "/api/banners", json={"title": "Promo", "image_url": "/uploads/products/legacy-usada.jpg"},
+        headers=auth_headers(admin),
+    )
+    assert response.status_code == 201
+
+    report = await image_gc.collect(dry_run=True, min_age_hours=0)
+    assert [item["name"] for item in report["local"]["items"]] == ["legacy-huerfana.jpg"]
+
+
+async def test_only_one_worker_claims_each_gc_cycle(db):
+    # Los loops de los workers despiertan a la vez: solo uno corre el ciclo
+    claims = await asyncio.gather(*(image_gc._claim() for _ in range(4)))
+    assert sorted(claims) == [False, False, False, True]
+    assert not await image_gc._claim()
+
+    # Vencido el lease, el próximo ciclo lo toma otro
+    await db.execute(update(JobLease).values(locked_until=datetime.utcnow() - timedelta(seconds=1)))
+    await db.commit()
+    assert await image_gc._claim()
+
+
+# --- Recepción en streaming (image_ingest) ---
+
+JPEG = b"\xff\xd8\xff\xe0"
+
+
+@pytest.fixture
+def ingest_dirs(upload_dir, tmp_path_factory, monkeypatch):
+    """Destino local y temporales del ingest en directorios de prueba"""
+    tmp_dir = tmp_path_factory.mktemp("ingest")
+    monkeypatch.setattr(image_store, "upload_dir", upload_dir)
+    monkeypatch.setattr(image_ingest, "tmp_dir", tmp_dir)
+    return upload_dir, tmp_dir
+
+
+@pytest.fixture
+async def admin_headers(db):
+    (admin,) = await create_users(db, 1, role=UserRole.ADMIN)
+    return auth_headers(admin)
+
+
+def temp_files(tmp_dir) -> list:
+    return list(tmp_dir.glob("*.part")) if tmp_dir.exists() else []
+
+
+def multipart(files: list[tuple[str, str, bytes]], boundary: bytes = b"limite") -> tuple[bytes, dict]:
+    """Cuerpo multipart armado a mano, para poder enviarlo por bloques"""
+    body = b"".join(
+        b"--" + boundary + b"\r\nContent-Disposition: form-data; name=\"" + field.encode()
+        + b"\"; filename=\"" + filename.encode() + b"\"\r\nContent-Type: image/jpeg\r\n\r\n" + content + b"\r\n"
+        for field, filename, content in files
+    )
+    return body + b"--" + boundary + b"--\r\n", {"Content-Type": f"multipart/form-data; boundary={boundary.decode()}"}
+
+
+async def chunked(body: bytes, size: int = 64 * 1024):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+async def test_file_over_the_limit_stops_mid_stream(client, admin_headers, ingest_dirs, monkeypatch):
+    upload_dir, tmp_dir = ingest_dirs
+    monkeypatch.setattr(uploads, "MAX_FILE_SIZE", 1024 * 1024)
+    monkeypatch.setattr(image_ingest, "write_buffer", 64 * 1024)
+    body, headers = multipart([
+        ("files", "grande.jpg", JPEG + os.urandom(2 * 1024 * 1024)),
+        ("files", "chica.jpg", JPEG + os.urandom(1024)),
+    ])
+    written = []
+    discard = IngestedImage.discard
+
+    def record(image):
+        # Lo que llegó a escribirse del temporal antes de descartarlo
+        if image._file is not None:
+            written.append(image._file.tell())
+        discard(image)
+    monkeypatch.setattr(IngestedImage, "discard", record)
+
+    response = await client.post("/api/uploads/images", content=chunked(body), headers=headers | admin_headers)
+
+    assert response.status_code == 200
+    big, small = response.json()["results"]
+    assert not big["success"]
+    assert "demasiado grande" in big["error"]
+    assert small["success"]
+    # Se dejó de escribir al cruzar el máximo, no al terminar de recibirlo
+    assert 0 < written[0] <= 1024 * 1024
+    assert len(list(upload_dir.iterdir())) == 1
+    assert temp_files(tmp_dir) == []
+
+
+@pytest.mark.parametrize("content", [b"%PDF-1.7 no es una imagen", b"GIF8", b"\xff\xd8", b""])
+async def test_content_that_is_not_an_image_is_rejected(client, admin_headers, ingest_dirs, content):
+    upload_dir, tmp_dir = ingest_dirs
+    response = await client.post("/api/uploads/image", files={"file": ("foto.jpg", content, "image/jpeg")},
+                                 headers=admin_headers)
+
+    assert response.status_code == 400
+    assert "no es una imagen valida" in response.json()["detail"]
+    assert list(upload_dir.iterdir()) == []
+    assert temp_files(tmp_dir) == []
+
+
+async def test_file_shorter_than_the_sniff_window_is_accepted(client, admin_headers, ingest_dirs):
+    # Una firma completa pero más corta que los 12 bytes que se leen para detectar el formato
+    upload_dir, tmp_dir = ingest_dirs
+    content = b"\xff\xd8\xff"
+    response = await client.post("/api/uploads/image", files={"file": ("foto.jpg", content, "image/jpeg")},
+                                 headers=admin_headers)
+
+    assert response.status_code == 200
+    (stored,) = upload_dir.iterdir()
+    assert stored.read_bytes() == content
+    assert stored.name == f"{hashlib.sha256(content).hexdigest()}.jpg"
+    assert temp_files(tmp_dir) == []
+
+
+async def test_too_many_files_is_rejected(client, admin_headers, ingest_dirs, monkeypatch):
+    upload_dir, tmp_dir = ingest_dirs
+    monkeypatch.setattr(settings, "UPLOAD_MAX_FILES", 3)
+    files = [("files", (f"foto{n}.jpg", JPEG + os.urandom(1024), "image/jpeg")) for n in range(4)]
+
+    response = await client.post("/api/uploads/images", files=files, headers=admin_headers)
+
+    assert response.status_code == 400
+    assert "Demasiados archivos" in response.json()["detail"]
+    # Los que ya se estaban subiendo se cancelan sin dejar temporales
+    assert temp_files(tmp_dir) == []
+
+
+async def test_client_disconnect_leaves_no_temp_file(ingest_dirs):
+    _, tmp_dir = ingest_dirs
+    body, headers = multipart([("file", "foto.jpg", JPEG + os.urandom(2 * 1024 * 1024))])
+    messages = [
+        {"type": "http.request", "body": body[:512 * 1024], "more_body": True},
+        {"type": "http.request", "body": body[512 * 1024:1024 * 1024], "more_body": True},
+        {"type": "http.disconnect"},
+    ]
+    seen = []
+
+    async def receive():
+        seen.append(temp_files(tmp_dir))
+        return messages.pop(0)
+
+    request = Request({
+        "type": "http", "method": "POST", "path": "/api/uploads/image",
+        "headers": [(b"content-type", headers["Content-Type"].encode())],
+    }, receive)
+
+    with pytest.raises(ClientDisconnect):
+        async for _ in image_ingest.stream(request, {"file"}, 1, 5 * 1024 * 1024):
+            pass
+
+    # El temporal llegó a existir y se borró al cortarse el request
+    assert any(seen)
+    assert temp_files(tmp_dir) == []
@@ -0,0 +1,83 @@
+"""
+Creación de pedidos: los items salen de un INSERT multi-fila con RETURNING;
+la respuesta, las filas guardadas y los totales tienen que coincidir
+"""
+from decimal import Decimal
+import pytest
+from sqlalchemy import insert, select
+from app.models.cart import CartItem
+from app.models.category import Category
+from app.models.order import Order, OrderItem
+from app.models.product import Product
+from tests.conftest import auth_headers, create_users
+
+SHIPPING = {
+    "shipping_name": "Cliente Test",
+    "shipping_address": "Ruta 5 km 120",
+    "shipping_city": "Rosario",
+    "shipping_state": "Santa Fe",
+    "shipping_zip": "2000",
+    "shipping_phone": "0341555000",
+}
+
+
+@pytest.mark.parametrize("lines", [1, 10, 100])
+async def test_order_items_and_totals(client, db, lines):
+    category = Category(name="Frenos", slug="frenos")
+    db.add(category)
+    await db.flush()
+    products = [
+        Product(category_id=category.id, name=f"Repuesto {n}", code=f"R-{n:03d}", brand=f"Marca {n % 4}",
+                price=Decimal(f"{100 + n}.{n % 100:02d}"), stock=50)
+        for n in range(lines)
+    ]
+    db.add_all(products)
+    await db.commit()
+    (user,) = await create_users(db, 1)
+    quantities = {product.id: 1 + n % 3 for n, product in enumerate(products)}
+    await db.execute(insert(CartItem), [
+        {"user_id": user.id, "product_id": product_id, "quantity": quantity}
+        for product_id, quantity in quantities.items()
+    ])
+    await db.commit()
+
+    response = await client.post("/api/orders", json=SHIPPING, headers=auth_headers(user))
+    assert response.status_code == 201
+    order = response.json()
+
+    prices = {product.id: product.price for product in products}
+    subtotal = sum(prices[product_id] * quantity for product_id, quantity in quantities.items())
+    shipping = Decimal("0.00") if subtotal >= Decimal("100000") else Decimal("5000.00")
+    assert Decimal(order["subtotal"]) == subtotal
+    assert Decimal(order["shipping_cost"]) == shipping
+    assert Decimal(order["total"]) == subtotal + shipping
+
+    # Un item por línea del carrito, en orden, con los ids de las filas insertadas
+    assert [item["product_id"] for item in order["items"]] == [product.id for product in products]
+    saved = {
+        item.id: item
+        for item in (await db.execute(select(OrderItem).where(OrderItem.order_id == order["id"]))).scalars()
+    }
+    assert len(saved) == lines
+    for item in order["items"]:
+        row = saved[item["id"]]
+        assert row.product_id == item["product_id"]
+        assert row.product_name == item["product_name"]
+        assert row.product_code == item["product_code"]
+        assert row.quantity == item["quantity"] == quantities[item["product_id"]]
+        assert row.unit_price == Decimal(item["unit_price"]) == prices[item["product_id"]]
+        assert row.total_price == Decimal(item["total_price"]) == row.unit_price * row.quantity
+
+    stored = await db.get(Order, order["id"])
+    assert stored.total == subtotal + shipping
+
+    # El detalle (leído de la base) es igual a la respuesta de la creación
+    detail = await client.get(f"/api/orders/{order['id']}", headers=auth_headers(user))
+    assert sorted(detail.json()["items"], key=lambda item: item["id"]) == sorted(order["items"], key=lambda item: item["id"])
+
+    # Carrito vacío y stock reservado
+    assert (await db.execute(select(CartItem).where(CartItem.user_id == user.id))).first() is None
+    db.expire_all()
+    for product in products:
+        await db.refresh(product)
+        assert product.stock == 50 - quantities[product.id]
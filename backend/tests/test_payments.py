@@ -0,0 +1,185 @@
+"""
+Webhook de MercadoPago: cuerpos que no son una notificación de pago válida
+se ignoran (200) sin guardar nada.
+Cliente de MercadoPago contra fake_mercadopago.py: reintentos ante 5xx y
+timeouts con la misma X-Idempotency-Key, y validación de IDs de pago.
+"""
+from decimal import Decimal
+import httpx
+import pytest
+from sqlalchemy import select
+import fake_mercadopago
+from app.models.order import Order
+from app.models.payment_webhook import PaymentWebhook
+from app.services.mercadopago import MercadoPagoService, MercadoPagoError, is_payment_id
+from app.services.payment_inbox import payment_id_from_webhook
+
+
+@pytest.mark.parametrize("body", [
+    [], "x", 1, None,
+    {"type": "payment"},
+    {"type": "payment", "data": []},
+    {"type": "payment", "data": {"id": "../../v1/customers"}},
+    {"type": "payment", "data": {"id": "123?x=1"}},
+    {"type": "payment", "data": {"id": True}},
+    {"type": "merchant_order", "data": {"id": "123"}},
+])
+async def test_invalid_webhook_is_ignored(client, db, body):
+    response = await client.post("/api/payments/webhook", json=body)
+    assert response.status_code == 200
+    assert response.json() == {"status": "ignored"}
+    assert (await db.execute(select(PaymentWebhook))).first() is None
+
+
+async def test_payment_webhook_is_queued(client, db):
+    body = {"type": "payment", "data": {"id": 987654321}}
+    response = await client.post("/api/payments/webhook", json=body)
+    assert response.json() == {"status": "ok"}
+    webhook = (await db.execute(select(PaymentWebhook))).scalar_one()
+    assert webhook.payment_id == "987654321"
+
+
+def test_payment_id_from_webhook():
+    assert payment_id_from_webhook({"type": "payment", "data": {"id": "42"}}) == "42"
+    assert payment_id_from_webhook({"type": "payment", "data": {"id": "４２"}}) is None
+
+
+class FakeMercadoPago(httpx.AsyncBaseTransport):
+    """fake_mercadopago.py en proceso: registra los requests y puede cortar
+    los primeros por timeout"""
+
+    def __init__(self, timeouts: int = 0):
+        self.upstream = httpx.ASGITransport(app=fake_mercadopago.app)
+        self.requests: list[httpx.Request] = []
+        self.timeouts = timeouts
+
+    async def handle_async_request(self, request):
+        self.requests.append(request)
+        if self.timeouts:
+            self.timeouts -= 1
+            raise httpx.ReadTimeout("simulated timeout", request=request)
+        return await self.upstream.handle_async_request(request)
+
+
+class FailFirst:
+    """Reemplaza a random en fake_mercadopago: los primeros `count` requests fallan con 503"""
+
+    def __init__(self, count: int):
+        self.count = count
+
+    def random(self) -> float:
+        self.count -= 1
+        return 0.0 if self.count >= 0 else 1.0
+
+
+def service_with(transport: FakeMercadoPago, max_retries: int = 3) -> MercadoPagoService:
+    service = MercadoPagoService(access_token="TEST", base_url="http://fake-mp", timeout=1,
+                                 max_retries=max_retries, backoff_base=0)
+    service._client = httpx.AsyncClient(transport=transport, base_url=service.base_url,
+                                        headers={"Authorization": "Bearer TEST"})
+    return service
+
+
+def fail_first(monkeypatch, count: int) -> None:
+    monkeypatch.setattr(fake_mercadopago, "FAIL_RATE", 0.5)
+    monkeypatch.setattr(fake_mercadopago, "random", FailFirst(count))
+
+
+ORDER = Order(order_number="MR-TEST-1", shipping_name="Cliente", shipping_phone="099000000",
+              shipping_cost=Decimal("0"))
+ITEMS = [{"product_id": 1, "name": "Pulmón de freno", "brand": "Wabco", "code": "PF-1",
+          "quantity": 2, "price": Decimal("1000")}]
+
+
+async def test_retries_5xx_then_succeeds(monkeypatch):
+    fail_first(monkeypatch, 2)
+    transport = FakeMercadoPago()
+    service = service_with(transport)
+
+    preference = await service.create_preference(ORDER, ITEMS)
+
+    assert preference["external_reference"] == "MR-TEST-1"
+    assert len(transport.requests) == 3
+
+
+async def test_idempotency_key_is_reused_across_retries(monkeypatch):
+    fail_first(monkeypatch, 2)
+    transport = FakeMercadoPago()
+    service = service_with(transport)
+
+    preference = await service.create_preference(ORDER, ITEMS)
+
+    keys = {request.headers["X-Idempotency-Key"] for request in transport.requests}
+    assert len(keys) == 1
+    # El servidor guardó una sola preferencia para esa clave
+    assert fake_mercadopago._preferences_by_key[keys.pop()]["id"] == preference["id"]
+
+
+async def test_gives_up_after_max_retries(monkeypatch):
+    fail_first(monkeypatch, 10)
+    transport = FakeMercadoPago()
+    service = service_with(transport, max_retries=2)
+
+    with pytest.raises(MercadoPagoError) as error:
+        await service.create_preference(ORDER, ITEMS)
+
+    assert error.value.status_code == 503
+    assert len(transport.requests) == 3
+
+
+async def test_timeout_is_retried():
+    transport = FakeMercadoPago(timeouts=1)
+    service = service_with(transport)
+    registered = await service._request("POST", "/v1/payments", json={"external_reference": "MR-TEST-1"})
+
+    payment = await service.get_payment(str(registered["id"]))
+
+    assert payment["external_reference"] == "MR-TEST-1"
+    # POST cortado por timeout + su reintento (misma clave) + GET
+    assert len(transport.requests) == 3
+    first, retry = transport.requests[:2]
+    assert first.headers["X-Idempotency-Key"] == retry.headers["X-Idempotency-Key"]
+
+
+async def test_timeout_on_every_attempt_raises():
+    transport = FakeMercadoPago(timeouts=10)
+    service = service_with(transport, max_retries=1)
+
+    with pytest.raises(MercadoPagoError, match="no responde"):
+        await service.get_payment("123")
+    assert len(transport.requests) == 2
+
+
+async def test_client_errors_are_not_retried():
+    transport = FakeMercadoPago()
+    service = service_with(transport)
+
+    with pytest.raises(MercadoPagoError) as error:
+        await service.get_payment("999999")
+
+    assert error.value.status_code == 404
+    assert len(transport.requests) == 1
+
+
+@pytest.mark.parametrize("value, valid", [
+    ("123456789", True),
+    ("1" * 20, True),
+    ("1" * 21, False),
+    ("", False),
+    ("-1", False),
+    ("12a", False),
+    ("../1", False),
+    ("４２", False),
+    ("١٢", False),
+])
+def test_is_payment_id(value, valid):
+    assert is_payment_id(value) is valid
+
+
+async def test_invalid_payment_id_makes_no_request():
+    transport = FakeMercadoPago()
+    service = service_with(transport)
+
+    with pytest.raises(MercadoPagoError):
+        await service.get_payment("1/../../v1/customers")
+    assert transport.requests == []
@@ -0,0 +1,42 @@
+"""
+Clave de la cache de totales: solo se normalizan los filtros que la query
+compara sin distinguir mayúsculas
+"""
+from decimal import Decimal
+from app.models.category import Category
+from app.models.product import Product
+from app.services.product_count import filters_key
+
+
+def test_search_text_is_normalized():
+    assert filters_key("search", q="  Rodamiento SKF ") == filters_key("search", q="rodamiento skf")
+    assert filters_key("search", q="maza", codes="abc-1") == filters_key("search", codes="ABC-1", q="maza")
+
+
+def test_category_slug_keeps_its_case():
+    # "Frenos" no existe (sin filtro de categoría) y "frenos" sí: no comparten total
+    assert filters_key("list", category_slug="Frenos") != filters_key("list", category_slug="frenos")
+
+
+def test_empty_filters_are_ignored():
+    assert filters_key("list", brand=None, category_slug="", in_stock=True) == filters_key("list", in_stock=True)
+
+
+async def test_slug_case_does_not_share_cached_total(client, db):
+    brakes = Category(name="Frenos", slug="frenos")
+    lights = Category(name="Iluminación", slug="iluminacion")
+    db.add_all([brakes, lights])
+    await db.flush()
+    db.add_all(
+        Product(
+            category_id=brakes.id if n < 2 else lights.id,
+            name=f"Producto {n}", code=f"P-{n}", brand="SKF", price=Decimal(100),
+        )
+        for n in range(5)
+    )
+    await db.commit()
+
+    response = await client.get("/api/products", params={"category_slug": "frenos"})
+    assert response.json()["total"] == 2
+    response = await client.get("/api/products", params={"category_slug": "Frenos"})
+    assert response.json()["total"] == 5
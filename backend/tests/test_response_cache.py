@@ -0,0 +1,139 @@
+"""
+Cache de respuestas del catálogo: el ETag sale de la versión del namespace,
+un If-None-Match vigente se responde 304 antes de consultar la base y cada
+invalidación (o el TTL, en memoria) cambia el ETag
+"""
+from decimal import Decimal
+import pytest
+from sqlalchemy import event
+from app.database import engine
+from app.models.category import Category
+from app.models.product import Product
+from app.models.user import UserRole
+from app.services.response_cache import response_cache, MemoryBackend, CATALOG_PRODUCTS
+from tests.conftest import auth_headers, create_users
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    backend = MemoryBackend(maxsize=100)
+    monkeypatch.setattr(response_cache, "enabled", True)
+    monkeypatch.setattr(response_cache, "backend", backend)
+    return backend
+
+
+@pytest.fixture
+def statements():
+    """SQL ejecutado por la app durante el test"""
+    executed = []
+
+    def record(conn, cursor, statement, *args):
+        executed.append(statement)
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+async def product(db):
+    category = Category(name="Frenos", slug="frenos")
+    db.add(category)
+    await db.flush()
+    product = Product(category_id=category.id, name="Pulmón de freno", code="PF-001", brand="Wabco",
+                      price=Decimal("15990.00"), stock=3)
+    db.add(product)
+    await db.commit()
+    return product
+
+
+async def test_matching_etag_is_answered_before_the_query(client, cache, statements, product, monkeypatch):
+    url = f"/api/products/{product.id}"
+    first = await client.get(url)
+    assert first.status_code == 200
+    assert first.headers["X-Cache"] == "MISS"
+    etag = first.headers["ETag"]
+
+    second = await client.get(url)
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.headers["ETag"] == etag
+    assert second.content == first.content
+
+    # Ni la base ni la cache: alcanza con la versión del namespace
+    statements.clear()
+
+    async def no_read(*args):
+        raise AssertionError("no hacía falta leer la cache")
+    monkeypatch.setattr(cache, "get", no_read)
+    response = await client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+    assert statements == []
+    assert response_cache.stats()[CATALOG_PRODUCTS]["not_modified"] == 1
+
+
+async def test_etag_matches_even_after_the_entry_is_evicted(client, cache, statements, product):
+    url = f"/api/products/{product.id}"
+    etag = (await client.get(url)).headers["ETag"]
+    cache._namespaces[CATALOG_PRODUCTS].clear()
+    statements.clear()
+
+    response = await client.get(url, headers={"If-None-Match": f'W/{etag}, "otro"'})
+
+    assert response.status_code == 304
+    assert statements == []
+
+
+async def test_invalidation_changes_the_etag(client, db, cache, product):
+    (admin,) = await create_users(db, 1, role=UserRole.ADMIN)
+    url = f"/api/products/{product.id}"
+    etag = (await client.get(url)).headers["ETag"]
+
+    response = await client.put(f"/api/admin/products/{product.id}", json={"price": "17990.00"},
+                                headers=auth_headers(admin))
+    assert response.status_code == 200
+
+    response = await client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["X-Cache"] == "MISS"
+    assert response.headers["ETag"] != etag
+    assert response.json()["price"] == "17990.00"
+
+
+async def test_memory_version_expires_with_the_ttl(client, cache, product, monkeypatch):
+    url = f"/api/products/{product.id}"
+    etag = (await client.get(url)).headers["ETag"]
+
+    # Otro worker cambió el producto: este no recibe la invalidación, pero pasado el TTL no responde 304
+    version, started = cache._versions[CATALOG_PRODUCTS]
+    cache._versions[CATALOG_PRODUCTS] = (version, started - 61)
+
+    response = await client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["X-Cache"] == "MISS"
+    assert response.headers["ETag"] != etag
+
+
+async def test_entry_stored_under_an_older_version_is_not_served(client, cache, product):
+    url = f"/api/products/{product.id}"
+    etag = (await client.get(url)).headers["ETag"]
+    # Un request que leyó la versión anterior termina de guardar después de la invalidación
+    await response_cache.invalidate(CATALOG_PRODUCTS)
+    await cache.set(CATALOG_PRODUCTS, f"{url}?", etag.encode("ascii") + b'{"viejo": true}', 60)
+
+    response = await client.get(url)
+    assert response.headers["X-Cache"] == "MISS"
+    assert "viejo" not in response.text
+
+
+async def test_disabled_cache_uses_a_content_etag(client, product, statements):
+    url = f"/api/products/{product.id}"
+    etag = (await client.get(url)).headers["ETag"]
+    assert (await client.get(url)).headers["ETag"] == etag
+
+    statements.clear()
+    response = await client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    # Sin cache hay que consultar para saber si cambió
+    assert statements != []
@@ -0,0 +1,90 @@
+"""
+Reserva de stock: checkouts simultáneos sin sobreventa y cambios de estado
+de pedidos con productos eliminados
+"""
+import asyncio
+from decimal import Decimal
+from sqlalchemy import select, func, update
+from app.models.cart import CartItem
+from app.models.category import Category
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.product import Product
+from app.models.user import UserRole
+from app.services.stock import stock_service
+from tests.conftest import auth_headers, create_users
+
+SHIPPING = {
+    "shipping_name": "Juan Perez",
+    "shipping_address": "Ruta 3 km 120",
+    "shipping_city": "Maldonado",
+    "shipping_state": "Maldonado",
+    "shipping_zip": "20000",
+    "shipping_phone": "099123456",
+}
+
+
+async def create_product(db, stock: int, code: str = "ROD-001") -> Product:
+    category = Category(name=f"Categoria {code}", slug=f"categoria-{code.lower()}")
+    db.add(category)
+    await db.flush()
+    product = Product(
+        category_id=category.id, name=f"Rodamiento {code}", code=code, brand="SKF",
+        price=Decimal("1000.00"), stock=stock,
+    )
+    db.add(product)
+    await db.commit()
+    return product
+
+
+async def test_concurrent_checkouts_do_not_oversell(client, db):
+    product = await create_product(db, stock=50)
+    buyers = await create_users(db, 200)
+    db.add_all(CartItem(user_id=user.id, product_id=product.id, quantity=1) for user in buyers)
+    await db.commit()
+
+    responses = await asyncio.gather(*(
+        client.post("/api/orders", json=SHIPPING, headers=auth_headers(user))
+        for user in buyers
+    ))
+    statuses = [response.status_code for response in responses]
+
+    assert statuses.count(201) == 50
+    assert statuses.count(400) == 150
+    assert all("Stock insuficiente" in r.json()["detail"] for r in responses if r.status_code == 400)
+
+    await db.refresh(product)
+    assert product.stock == 0
+    sold = await db.scalar(select(func.sum(OrderItem.quantity)).where(OrderItem.product_id == product.id))
+    assert sold == 50
+
+
+async def test_cancel_and_restore_order_with_deleted_product(client, db):
+    kept = await create_product(db, stock=5, code="ROD-002")
+    removed = await create_product(db, stock=5, code="ROD-003")
+    (buyer,) = await create_users(db, 1)
+    (admin,) = await create_users(db, 1, role=UserRole.ADMIN)
+    db.add_all([
+        CartItem(user_id=buyer.id, product_id=kept.id, quantity=2),
+        CartItem(user_id=buyer.id, product_id=removed.id, quantity=1),
+    ])
+    await db.commit()
+
+    response = await client.post("/api/orders", json=SHIPPING, headers=auth_headers(buyer))
+    assert response.status_code == 201
+    order_id = response.json()["id"]
+
+    # Producto eliminado: el item queda con product_id NULL (historial)
+    await db.execute(update(OrderItem).where(OrderItem.product_id == removed.id).values(product_id=None))
+    await db.commit()
+
+    order = await db.get(Order, order_id)
+    assert await stock_service.set_order_status(db, order, OrderStatus.CANCELLED) == []
+    await db.commit()
+    await db.refresh(kept)
+    assert kept.stock == 5
+
+    assert await stock_service.set_order_status(db, order, OrderStatus.PENDING) == []
+    await db.commit()
+    await db.refresh(kept)
+    assert kept.stock == 3
+    assert order.status == OrderStatus.PENDING
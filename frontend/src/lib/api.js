@@ -338,6 +338,32 @@ class ApiClient {
 
     return response.json()
   }
+
+  // Varias imágenes en un request: devuelve el resultado de cada archivo
+  async uploadImages(files) {
+    const url = `${this.baseUrl}/uploads/images`
+    const token = this.getToken()
+
+    const formData = new FormData()
+    for (const file of files) {
+      formData.append('files', file)
+    }
+
+    const response = await fetch(url, {
+      method: 'POST',
+      headers: {
+        ...(token && { 'Authorization': `Bearer ${token}` }),
+      },
+      body: formData,
+    })
+
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({}))
+      throw new Error(error.detail || 'Error al subir las imágenes')
+    }
+
+    return response.json()
+  }
 }
 
 export const api = new ApiClient()
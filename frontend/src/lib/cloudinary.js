@@ -32,11 +32,36 @@ export const IMAGE_SIZES = {
   categoryThumb: { width: 200 },
 }
 
+/**
+ * Variantes que genera el backend para imágenes locales (lado máximo en px)
+ */
+const LOCAL_VARIANTS = [
+  [160, 'thumb'],
+  [400, 'card'],
+  [1200, 'detail'],
+]
+
+/**
+ * Imagen subida al backend (/uploads/products/...): usa la variante WebP más
+ * chica que cubra el ancho pedido en lugar del original
+ * @param {string} url
+ * @param {number} width - Ancho deseado en px
+ * @returns {string} URL de la variante
+ */
+export function localVariantUrl(url, width = 400) {
+  if (!url || !url.includes('/uploads/products/')) return url
+  const [, variant] = LOCAL_VARIANTS.find(([size]) => size >= width) || LOCAL_VARIANTS[LOCAL_VARIANTS.length - 1]
+  return url
+    .replace('/uploads/products/', `/uploads/variants/${variant}/`)
+    .replace(/\.[a-z0-9]+$/i, '.webp')
+}
+
 /**
  * Shorthand: optimiza URL con un preset predefinido
  * @param {string} url
  * @param {string} preset - Nombre del preset (cardGrid, productDetail, etc.)
  */
 export function optimizeImage(url, preset = 'cardGrid') {
-  return optimizeCloudinaryUrl(url, IMAGE_SIZES[preset] || IMAGE_SIZES.cardGrid)
+  const options = IMAGE_SIZES[preset] || IMAGE_SIZES.cardGrid
+  return localVariantUrl(optimizeCloudinaryUrl(url, options), options.width)
 }